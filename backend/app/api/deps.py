@@ -1,72 +1,149 @@
 """FastAPI 依赖项集合。"""
 
-from fastapi import Depends, HTTPException, status
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core import security
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.async_session import get_async_db, run_in_session
+from app.db.session import get_db
 from app.models.user import User
-from typing import Generator
+from app.services.principal_cache import load_principal, principal_cache
+from app.services.token_denylist import token_denylist
 
 
 # 定义安全模式为 HTTP Bearer
 reusable_oauth2 = HTTPBearer(
-    scheme_name="Authorization", 
+    scheme_name="Authorization",
     description="请输入 Token (格式: Bearer <token>)"
 )
 
+# 可选的 Bearer 认证（例如退出登录：没有 Token 时也返回成功）
+optional_oauth2 = HTTPBearer(scheme_name="Authorization", auto_error=False)
 
-def get_db() -> Generator:
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
 
+def _decode_claims(token: str) -> Dict[str, Any]:
+    """解码 JWT（命中缓存时跳过解码）。"""
 
-async def get_current_user(
-    token_auth: HTTPAuthorizationCredentials = Depends(reusable_oauth2), 
-    db: Session = Depends(get_db),
-) -> User:
-    """解析 JWT 并获取对应用户。"""
-    
-    # 手动提取 token 字符串
-    token = token_auth.credentials
-    
-    try:
-        # 修复：使用正确的配置属性
-        payload = jwt.decode(
-            token, 
-            settings.secret_key,  # ✅ 修复：使用小写的 secret_key
-            algorithms=[settings.jwt_algorithm]  # ✅ 修复：使用正确的算法
-        )
-        token_data = payload
-    except (JWTError, Exception):
+    token_data = principal_cache.get_claims(token) if settings.principal_cache_enabled else None
+    if token_data is None:
+        try:
+            token_data = jwt.decode(
+                token,
+                settings.secret_key,
+                algorithms=[settings.jwt_algorithm]
+            )
+        except (JWTError, Exception):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="凭证无效或已过期",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if settings.principal_cache_enabled:
+            principal_cache.set_claims(token, token_data)
+
+    # 已注销的 Token（缓存命中时同样需要检查）
+    jti = token_data.get("jti")
+    if jti is not None and token_denylist.is_revoked(jti):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="凭证无效或已过期",
+            detail="Token 已注销，请重新登录",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    return token_data
+
+
+def _resolve_username(token: str) -> str:
+    """从 token 中取出用户名。"""
+
+    token_data = _decode_claims(token)
+
     # 确保这里用的 key 和生成 token 时的一样，通常是 "sub"
-    username = token_data.get("sub") 
-    
+    username = token_data.get("sub")
+
     if not username:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, 
+            status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token 缺少用户信息"
         )
-    
-    user = db.query(User).filter(User.username == username).first()
+    return username
+
+
+def _cached_user(username: str) -> User | None:
+    # 命中缓存时跳过 users / electricity_accounts 查询
+    return principal_cache.get_user(username) if settings.principal_cache_enabled else None
+
+
+def _remember_user(user: User | None) -> User:
     if not user:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
+            status_code=status.HTTP_404_NOT_FOUND,
             detail="用户不存在"
         )
-    
+    if settings.principal_cache_enabled:
+        principal_cache.set_user(user)
     return user
 
 
+async def get_current_user(
+    token_auth: HTTPAuthorizationCredentials = Depends(reusable_oauth2),
+    db: Session = Depends(get_db),
+) -> User:
+    """解析 JWT 并获取对应用户。"""
+
+    username = _resolve_username(token_auth.credentials)
+    user = _cached_user(username)
+    if user is None:
+        user = _remember_user(load_principal(db, username))
+    return user
+
+
+async def get_current_user_async(
+    token_auth: HTTPAuthorizationCredentials = Depends(reusable_oauth2),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """异步模式下的 `get_current_user`，未命中缓存时通过 AsyncSession 查询。"""
+
+    username = _resolve_username(token_auth.credentials)
+    user = _cached_user(username)
+    if user is None:
+        user = _remember_user(await db.run_sync(load_principal, username))
+    return user
+
+
+async def load_stream_user(token: Optional[str]) -> User:
+    """长连接（SSE / WebSocket）的认证：不占用请求级会话，未命中缓存时用短会话查询。"""
+
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="未提供 Token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    username = _resolve_username(token)
+    user = _cached_user(username)
+    if user is None:
+        user = _remember_user(await run_in_session(load_principal, username))
+    return user
+
+
+async def get_stream_user(
+    token_auth: Optional[HTTPAuthorizationCredentials] = Depends(optional_oauth2),
+    token: Optional[str] = Query(None, description="EventSource 无法设置请求头时通过查询参数传入 Token"),
+) -> User:
+    """SSE 接口的用户依赖：优先使用 Authorization 头，其次使用 `token` 查询参数。"""
+
+    return await load_stream_user(token_auth.credentials if token_auth else token)
+
+
+def require_account(current_user: User, detail: str = "用户还没有用电账户"):
+    """返回当前用户的用电账户，没有账户时抛出 400。"""
+
+    if not current_user.electricity_account:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return current_user.electricity_account
@@ -1,66 +1,541 @@
 """电器管理相关接口。"""
 
-from typing import List
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user
+from app.api.deps import (
+    get_current_user,
+    get_current_user_async,
+    get_stream_user,
+    load_stream_user,
+    require_account,
+)
+from app.core.config import settings
+from app.db.async_session import get_async_db, run_in_session
 from app.db.session import get_db
-from app.models.appliance import Appliance
+from app.models.appliance import Appliance, ApplianceType
+from app.models.appliance_event import ApplianceEvent
+from app.models.appliance_scene import ApplianceScene, ApplianceSceneAction
+from app.models.electricity_account import ElectricityAccount
 from app.models.user import User
 from app.schemas.appliance import (
     ApplianceControl,
     ApplianceCreate,
+    ApplianceEventOut,
+    ApplianceHistory,
     ApplianceOut,
+    BatchControl,
+    BatchControlResponse,
+    BatchItemResult,
     ControlResponse,
+    SceneCreate,
+    SceneOut,
 )
-from app.services.mock_ai import analyze_appliance_action
+from app.services.appliance_events import appliance_event_log, usage_between
+from app.services.live_events import live_events, sse_stream
+from app.services.live_state import live_state
+from app.services.mock_ai import analyze_appliance_action, analyze_batch_actions
+from app.services.response_cache import response_cache
+from app.services.simulator import elapsed_seconds
 
 router = APIRouter()
+async_router = APIRouter()
 
 
-@router.post("/", response_model=ApplianceOut, status_code=status.HTTP_201_CREATED)
-def create_appliance(
-    item: ApplianceCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> ApplianceOut:
-    """添加新电器（用于初始化数据）。"""
-    # 检查用户是否有用电账户
-    if not current_user.electricity_account:
-        # 如果没有，抛出错误或自动创建（这里选择抛出错误）
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="用户还没有用电账户，请联系管理员"
-        )
-    
+def _current_power(db: Session, account_id: int) -> float:
+    total = (
+        db.query(func.coalesce(func.sum(Appliance.power_rating_kw), 0.0))
+        .filter(Appliance.account_id == account_id, Appliance.is_on.is_(True))
+        .scalar()
+    )
+    return round(float(total), 2)
+
+
+def _publish_toggle(
+    db: Session, account_id: int, appliance_id: int, name: str, is_on: bool, power: float, total_power: Optional[float] = None
+) -> None:
+    """提交后推送电器状态与新的总功率；账户没有推送连接时直接跳过。"""
+
+    if not live_events.has_subscribers(account_id):
+        return
+    live_events.publish(
+        account_id,
+        {
+            "type": "appliance",
+            "appliance_id": appliance_id,
+            "name": name,
+            "is_on": is_on,
+            "delta_kw": round(power if is_on else -power, 2),
+            "total_power_now": round(live_state.totals(db, account_id).on_power, 2) if total_power is None else total_power,
+        },
+    )
+
+
+def _publish_appliance_change(db: Session, appliance: Appliance, was_on: bool) -> None:
+    if was_on == bool(appliance.is_on):
+        return
+    power = float(appliance.power_rating_kw or 0)
+    _publish_toggle(db, appliance.account_id, appliance.id, appliance.name, bool(appliance.is_on), power)
+
+
+def _live_snapshot(db: Session, account: ElectricityAccount) -> Dict[str, Any]:
+    """推送连接建立时的初始状态。"""
+
+    appliances = _list_appliances(db, account)
+    return {
+        "appliances": [ApplianceOut.model_validate(item).model_dump(mode="json", by_alias=True) for item in appliances],
+        "total_power_now": round(sum(float(item.power_rating_kw) for item in appliances if item.is_on), 2),
+    }
+
+
+def _create_appliance(db: Session, account: ElectricityAccount, item: ApplianceCreate) -> Appliance:
     new_appliance = Appliance(
         name=item.name,
         type=item.type,
         power_rating_kw=item.power_rating,
-        account_id=current_user.electricity_account.id,  # ✅ 修改：使用 account_id
+        account_id=account.id,  # ✅ 修改：使用 account_id
     )
     db.add(new_appliance)
     db.commit()
     db.refresh(new_appliance)
+    live_state.invalidate(account.id)
+    _publish_appliance_change(db, new_appliance, was_on=False)
     return new_appliance
 
 
+def _list_appliances(db: Session, account: ElectricityAccount) -> List[Appliance]:
+    return db.query(Appliance).filter(Appliance.account_id == account.id).all()
+
+
+def _encode_cursor(appliance_id: int) -> str:
+    return base64.urlsafe_b64encode(str(appliance_id).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        value = ""
+    # 只接受 BIGINT 范围内的非负整数，超出范围的值传给数据库驱动会溢出
+    if not value.isdigit() or int(value) >= 2**63:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cursor 无效")
+    return int(value)
+
+
+def _page_appliances(
+    db: Session,
+    account: ElectricityAccount,
+    limit: Optional[int],
+    cursor: Optional[str] = None,
+    type: Optional[ApplianceType] = None,
+    is_on: Optional[bool] = None,
+    name_prefix: Optional[str] = None,
+) -> Tuple[List[Appliance], Optional[str], Dict[str, str]]:
+    """按 `(account_id, id)` 键集分页，返回 (本页电器, 下一页游标, 汇总响应头)。
+
+    筛选条件由 `idx_appliance_account_type` / `idx_appliance_account_on` / `idx_account_name` 覆盖；
+    汇总（匹配数、开启数、开启总功率）是一条聚合查询，不需要加载全部行。
+    `limit` 与 `cursor` 都未传时不分页，返回全部匹配的电器（兼容分页之前的调用方）；
+    只传 `cursor` 时每页 `appliance_page_size` 条。
+    """
+    conditions = [Appliance.account_id == account.id]
+    if type is not None:
+        conditions.append(Appliance.type == type)
+    if is_on is not None:
+        conditions.append(Appliance.is_on.is_(is_on))
+    if name_prefix:
+        conditions.append(Appliance.name.startswith(name_prefix, autoescape=True))
+
+    total, on_count, on_power = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(case((Appliance.is_on.is_(True), 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Appliance.is_on.is_(True), Appliance.power_rating_kw), else_=0.0)), 0.0),
+        ).where(*conditions)
+    ).one()
+    headers = {
+        "X-Total-Count": str(total),
+        "X-On-Count": str(on_count),
+        "X-On-Power-Kw": f"{float(on_power):.2f}",
+    }
+    if limit == 0:
+        return [], None, headers
+
+    query = select(Appliance).where(*conditions)
+    if limit is None and not cursor:
+        return list(db.scalars(query.order_by(Appliance.id))), None, headers
+    limit = settings.appliance_page_size if limit is None else limit
+    if cursor:
+        query = query.where(Appliance.id > _decode_cursor(cursor))
+    # 多取一行判断是否还有下一页
+    items = list(db.scalars(query.order_by(Appliance.id).limit(limit + 1)))
+    next_cursor = _encode_cursor(items[limit - 1].id) if len(items) > limit else None
+    return items[:limit], next_cursor, headers
+
+
+def _set_page_headers(response: Response, next_cursor: Optional[str], headers: Dict[str, str]) -> None:
+    response.headers.update(headers)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+
+def _control_appliance(
+    db: Session, account: ElectricityAccount, appliance_id: int, control: ApplianceControl
+) -> ControlResponse:
+    """一条条件 UPDATE 完成开关：只有状态需要变化（且版本号匹配）时才写入。
+
+    `UPDATE ... WHERE id AND account_id AND is_on != 目标 [AND version = expected] RETURNING`，
+    并发的两个请求不会互相覆盖；没有更新到行时再查一次，区分不存在（404）、
+    版本冲突（409）与已处于目标状态（不写数据库）。AI 建议在提交之后生成，不占用连接。
+    """
+    action = control.action  # 已由 schema 规范化为 "ON" / "OFF"
+    new_is_on = action == "ON"
+    table = Appliance.__table__
+    dialect = db.get_bind().dialect
+    now = datetime.now()
+    owned = (table.c.id == appliance_id, table.c.account_id == account.id)
+
+    conditions = [*owned, func.coalesce(table.c.is_on, False) != new_is_on]
+    if control.expected_version is not None:
+        conditions.append(table.c.version == control.expected_version)
+    # 开机记账规则同 app.services.simulator：开机记录时间，关机累加本次开机秒数
+    elapsed = func.coalesce(elapsed_seconds(dialect.name, table.c.on_since, now), 0.0)
+    statement = (
+        update(table)
+        .where(*conditions)
+        .values(
+            is_on=new_is_on,
+            version=table.c.version + 1,
+            on_since=now if new_is_on else None,
+            on_seconds=table.c.on_seconds if new_is_on else table.c.on_seconds + elapsed,
+        )
+    )
+    returned = (table.c.name, table.c.power_rating_kw, table.c.version)
+    if dialect.update_returning:
+        row = db.execute(statement.returning(*returned)).first()
+    else:  # MySQL 不支持 UPDATE ... RETURNING：同一事务内按主键读回
+        row = db.execute(select(*returned).where(*owned)).first() if db.execute(statement).rowcount else None
+
+    if row is None:
+        current = db.execute(select(table.c.name, table.c.is_on, table.c.version).where(*owned)).first()
+        db.rollback()
+        if current is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="电器不存在或不属于你")
+        if control.expected_version is not None and current.version != control.expected_version:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"电器状态已被其他操作修改（当前版本 {current.version}），请刷新后重试",
+            )
+        return ControlResponse(
+            success=True,
+            appliance_id=appliance_id,
+            new_status=new_is_on,
+            changed=False,
+            version=current.version,
+            ai_message=f"{current.name} 已处于{'开启' if new_is_on else '关闭'}状态，无需重复操作。",
+        )
+
+    db.commit()
+    # Core UPDATE 不触发会话事件，需显式递增账户版本号
+    response_cache.versions.bump_many([account.id])
+    power = float(row.power_rating_kw or 0)
+    live_state.set_on(account.id, appliance_id, new_is_on)
+    _publish_toggle(db, account.id, appliance_id, row.name, new_is_on, power)
+    appliance_event_log.record(appliance_id, account.id, new_is_on, power, "control", row.version, now)
+
+    return ControlResponse(
+        success=True,
+        appliance_id=appliance_id,
+        new_status=new_is_on,
+        changed=True,
+        version=row.version,
+        ai_message=analyze_appliance_action(row.name, action, power),
+    )
+
+
+def _appliance_history(
+    db: Session,
+    account: ElectricityAccount,
+    appliance_id: int,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    limit: int,
+) -> ApplianceHistory:
+    """电器在 `[start, end)` 内的开关事件与开机时长 / 耗电量（默认最近 24 小时）。
+
+    数据来自 `appliance_events`，并合并本进程尚未落库的事件；
+    窗口开始时的状态取窗口前最后一个事件，没有事件时视为关机。
+    """
+    exists = db.execute(
+        select(Appliance.id).where(Appliance.id == appliance_id, Appliance.account_id == account.id)
+    ).first()
+    if exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="电器不存在或不属于你")
+    now = datetime.now()
+    end = min(end or now, now)
+    start = start or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start 必须早于 end")
+
+    columns = (
+        ApplianceEvent.event_id,
+        ApplianceEvent.occurred_at,
+        ApplianceEvent.is_on,
+        ApplianceEvent.power_kw,
+        ApplianceEvent.source,
+        ApplianceEvent.version,
+    )
+    previous = db.execute(
+        select(*columns)
+        .where(ApplianceEvent.appliance_id == appliance_id, ApplianceEvent.occurred_at < start)
+        .order_by(ApplianceEvent.occurred_at.desc(), ApplianceEvent.id.desc())
+        .limit(1)
+    ).first()
+    stored = db.execute(
+        select(*columns)
+        .where(
+            ApplianceEvent.appliance_id == appliance_id,
+            ApplianceEvent.occurred_at >= start,
+            ApplianceEvent.occurred_at < end,
+        )
+        .order_by(ApplianceEvent.occurred_at, ApplianceEvent.id)
+    ).all()
+    events = {row.event_id: row._asdict() for row in stored}
+    for event in appliance_event_log.pending(appliance_id):
+        if event["occurred_at"] < start:
+            if previous is None or event["occurred_at"] >= previous.occurred_at:
+                previous = ApplianceEventOut(**event)
+        elif event["occurred_at"] < end:
+            events.setdefault(event["event_id"], event)
+    ordered = sorted(events.values(), key=lambda event: event["occurred_at"])
+
+    initial = (bool(previous.is_on), float(previous.power_kw)) if previous is not None else None
+    on_seconds, energy = usage_between(
+        [(event["occurred_at"], bool(event["is_on"]), float(event["power_kw"])) for event in ordered],
+        initial,
+        start,
+        end,
+    )
+    return ApplianceHistory(
+        appliance_id=appliance_id,
+        start=start,
+        end=end,
+        on_seconds=round(on_seconds, 1),
+        energy_kwh=round(energy, 3),
+        switches=len(ordered),
+        events=[ApplianceEventOut(**event) for event in reversed(ordered[-limit:])] if limit else [],
+    )
+
+
+def _apply_actions(
+    db: Session,
+    account: ElectricityAccount,
+    actions: Dict[int, str],
+    all_action: Optional[str] = None,
+    scene_id: Optional[int] = None,
+) -> BatchControlResponse:
+    """在一个事务内执行多个开关动作：一次 SELECT 读取归属，每个目标状态一条条件 UPDATE，一次提交。
+
+    UPDATE 直接写入目标状态，并带上与 `_control_appliance` 相同的条件 `is_on != 目标`，
+    是否变化以 UPDATE 实际更新到的行为准（SQLite 的 `FOR UPDATE` 不加锁，先读到的状态不可信）。
+    `all_action` 不为空时对账户下的全部电器执行该动作。
+    """
+    query = select(Appliance.id, Appliance.name, Appliance.power_rating_kw, Appliance.version).where(
+        Appliance.account_id == account.id
+    )
+    if all_action is None:
+        query = query.where(Appliance.id.in_(list(actions)))
+    rows = {row.id: row for row in db.execute(query.order_by(Appliance.id).with_for_update())}
+    targets = {appliance_id: all_action for appliance_id in rows} if all_action is not None else actions
+
+    table = Appliance.__table__
+    dialect = db.get_bind().dialect
+    now = datetime.now()
+    # 开机记账规则同 app.services.simulator：开机记录时间，关机累加本次开机秒数
+    elapsed = func.coalesce(elapsed_seconds(dialect.name, table.c.on_since, now), 0.0)
+    changed: Dict[int, int] = {}  # 电器ID -> 更新后的版本号
+    for action in ("ON", "OFF"):
+        new_is_on = action == "ON"
+        ids = [appliance_id for appliance_id, target in targets.items() if target == action and appliance_id in rows]
+        if not ids:
+            continue
+        conditions = (
+            table.c.id.in_(ids),
+            table.c.account_id == account.id,
+            func.coalesce(table.c.is_on, False) != new_is_on,
+        )
+        statement = (
+            update(table)
+            .where(*conditions)
+            .values(
+                is_on=new_is_on,
+                version=table.c.version + 1,
+                on_since=now if new_is_on else None,
+                on_seconds=table.c.on_seconds if new_is_on else table.c.on_seconds + elapsed,
+            )
+        )
+        if dialect.update_returning:
+            changed.update((row.id, row.version) for row in db.execute(statement.returning(table.c.id, table.c.version)))
+        else:
+            # MySQL 不支持 UPDATE ... RETURNING；上面的 SELECT ... FOR UPDATE 已锁住这些行，
+            # 事务内按目标状态读回本次更新到的行（条件 UPDATE 之后 is_on 必为目标值）
+            before = {row.id: row.version for row in rows.values() if row.id in ids}
+            if db.execute(statement).rowcount:
+                current = db.execute(
+                    select(table.c.id, table.c.version).where(table.c.id.in_(ids), table.c.is_on == new_is_on)
+                )
+                changed.update((row.id, row.version) for row in current if row.version != before[row.id])
+
+    results: List[BatchItemResult] = []
+    changes = []  # (行, 动作)
+    for appliance_id, action in targets.items():
+        row = rows.get(appliance_id)
+        if row is None:
+            results.append(
+                BatchItemResult(appliance_id=appliance_id, action=action, success=False, error="电器不存在或不属于你")
+            )
+            continue
+        if appliance_id in changed:
+            changes.append((row, action))
+        results.append(
+            BatchItemResult(
+                appliance_id=appliance_id,
+                action=action,
+                success=True,
+                changed=appliance_id in changed,
+                new_status=action == "ON",
+            )
+        )
+
+    power_delta = sum(float(row.power_rating_kw or 0) * (1 if action == "ON" else -1) for row, action in changes)
+    total_power = _current_power(db, account.id)
+    db.commit()
+
+    if changes:
+        # Core UPDATE 不触发会话事件，需显式递增账户版本号
+        response_cache.versions.bump_many([account.id])
+        source = "scene" if scene_id is not None else "batch"
+        for row, action in changes:
+            power = float(row.power_rating_kw or 0)
+            live_state.set_on(account.id, row.id, action == "ON")
+            _publish_toggle(db, account.id, row.id, row.name, action == "ON", power, total_power)
+            appliance_event_log.record(row.id, account.id, action == "ON", power, source, changed[row.id], now)
+
+    advice = analyze_batch_actions(
+        [(row.name, action, float(row.power_rating_kw or 0)) for row, action in changes], power_delta, total_power
+    )
+    return BatchControlResponse(
+        success=all(item.success for item in results),
+        scene_id=scene_id,
+        results=results,
+        changed_count=len(changes),
+        power_delta_kw=round(power_delta, 2),
+        total_power_now=total_power,
+        ai_message=advice,
+    )
+
+
+def _batch_control(db: Session, account: ElectricityAccount, control: BatchControl) -> BatchControlResponse:
+    actions = {item.appliance_id: item.action for item in control.actions}
+    return _apply_actions(db, account, actions, control.all_action)
+
+
+def _list_scenes(db: Session, account: ElectricityAccount) -> List[ApplianceScene]:
+    return db.query(ApplianceScene).filter(ApplianceScene.account_id == account.id).order_by(ApplianceScene.id).all()
+
+
+def _get_scene(db: Session, account: ElectricityAccount, scene_id: int) -> ApplianceScene:
+    scene = (
+        db.query(ApplianceScene)
+        .filter(ApplianceScene.id == scene_id, ApplianceScene.account_id == account.id)
+        .first()
+    )
+    if scene is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="场景不存在")
+    return scene
+
+
+def _create_scene(db: Session, account: ElectricityAccount, item: SceneCreate) -> ApplianceScene:
+    requested = {action.appliance_id for action in item.actions}
+    owned = set(
+        db.scalars(select(Appliance.id).where(Appliance.account_id == account.id, Appliance.id.in_(requested)))
+    )
+    if requested - owned:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"电器不存在或不属于你: {sorted(requested - owned)}",
+        )
+    scene = ApplianceScene(
+        account_id=account.id,
+        name=item.name,
+        actions=[ApplianceSceneAction(appliance_id=action.appliance_id, action=action.action) for action in item.actions],
+    )
+    db.add(scene)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"场景 {item.name} 已存在")
+    db.refresh(scene)
+    return scene
+
+
+def _delete_scene(db: Session, account: ElectricityAccount, scene_id: int) -> None:
+    db.delete(_get_scene(db, account, scene_id))
+    db.commit()
+
+
+def _apply_scene(db: Session, account: ElectricityAccount, scene_id: int) -> BatchControlResponse:
+    scene = _get_scene(db, account, scene_id)
+    actions = {item.appliance_id: item.action for item in scene.actions}
+    return _apply_actions(db, account, actions, scene_id=scene.id)
+
+
+@router.post("/", response_model=ApplianceOut, status_code=status.HTTP_201_CREATED)
+def create_appliance(
+    item: ApplianceCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ApplianceOut:
+    """添加新电器（用于初始化数据）。"""
+    # 检查用户是否有用电账户（没有时抛出错误）
+    account = require_account(current_user, "用户还没有用电账户，请联系管理员")
+    return _create_appliance(db, account, item)
+
+
 @router.get("/", response_model=List[ApplianceOut])
 def read_appliances(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=0, le=settings.appliance_page_max_size, description="每页数量，0 只返回汇总响应头；不传 limit 与 cursor 时返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    type: Optional[ApplianceType] = Query(None, description="按类型筛选"),
+    is_on: Optional[bool] = Query(None, description="按开关状态筛选"),
+    name_prefix: Optional[str] = Query(None, max_length=100, description="按名称前缀筛选"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> List[ApplianceOut]:
-    """获取当前用户的电器列表。"""
+    """获取当前用户的电器列表（键集分页 + 筛选）。
+
+    响应头：`X-Total-Count` 匹配数、`X-On-Count` 开启数、`X-On-Power-Kw` 开启总功率，
+    还有下一页时带 `X-Next-Cursor`。
+    """
     # 通过 electricity_account 关联查询电器
     if not current_user.electricity_account:
         return []  # 如果没有账户，返回空列表
-    
-    appliances = db.query(Appliance).filter(
-        Appliance.account_id == current_user.electricity_account.id
-    ).all()
-    return appliances
+    items, next_cursor, headers = _page_appliances(
+        db, current_user.electricity_account, limit, cursor, type, is_on, name_prefix
+    )
+    _set_page_headers(response, next_cursor, headers)
+    return items
 
 
 @router.post("/{appliance_id}/control", response_model=ControlResponse)
@@ -71,39 +546,250 @@ def control_appliance(
     current_user: User = Depends(get_current_user),
 ) -> ControlResponse:
     """控制电器开关（AI 介入）。"""
+    account = require_account(current_user)
+    return _control_appliance(db, account, appliance_id, control)
+
+
+@router.get("/{appliance_id}/history", response_model=ApplianceHistory)
+def read_appliance_history(
+    appliance_id: int,
+    start: Optional[datetime] = Query(None, description="窗口开始时间（默认 end 前 24 小时）"),
+    end: Optional[datetime] = Query(None, description="窗口结束时间（默认当前时间）"),
+    limit: int = Query(100, ge=0, le=1000, description="返回的事件数（新的在前），不影响时长与耗电量统计"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ApplianceHistory:
+    """电器的开关记录，以及窗口内的开机时长与耗电量。"""
+    account = require_account(current_user)
+    return _appliance_history(db, account, appliance_id, start, end, limit)
+
+
+@router.post("/batch", response_model=BatchControlResponse)
+def batch_control_appliances(
+    control: BatchControl,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BatchControlResponse:
+    """批量控制电器开关：一个事务、一条 UPDATE，返回逐个结果与一条汇总建议。"""
+    account = require_account(current_user)
+    return _batch_control(db, account, control)
+
+
+@router.get("/scenes", response_model=List[SceneOut])
+def read_scenes(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> List[SceneOut]:
+    """获取当前账户的场景列表。"""
+    account = require_account(current_user)
+    return _list_scenes(db, account)
+
+
+@router.post("/scenes", response_model=SceneOut, status_code=status.HTTP_201_CREATED)
+def create_scene(
+    item: SceneCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> SceneOut:
+    """保存场景（一组电器开关动作，如"离家模式"）。"""
+    account = require_account(current_user)
+    return _create_scene(db, account, item)
+
+
+@router.delete("/scenes/{scene_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_scene(
+    scene_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """删除场景。"""
+    account = require_account(current_user)
+    _delete_scene(db, account, scene_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/scenes/{scene_id}/apply", response_model=BatchControlResponse)
+def apply_scene(
+    scene_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BatchControlResponse:
+    """执行场景：与批量控制相同，一个事务内完成全部动作。"""
+    account = require_account(current_user)
+    return _apply_scene(db, account, scene_id)
+
+
+# ---------------------------------------------------------------------------
+# 异步版本（settings.async_db_enabled 为 True 时挂载）
+# ---------------------------------------------------------------------------
+
+
+@async_router.post("/", response_model=ApplianceOut, status_code=status.HTTP_201_CREATED)
+async def create_appliance_async(
+    item: ApplianceCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> ApplianceOut:
+    """添加新电器（用于初始化数据）。"""
+    account = require_account(current_user, "用户还没有用电账户，请联系管理员")
+    return await db.run_sync(_create_appliance, account, item)
+
+
+@async_router.get("/", response_model=List[ApplianceOut])
+async def read_appliances_async(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=0, le=settings.appliance_page_max_size, description="每页数量，0 只返回汇总响应头；不传 limit 与 cursor 时返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    type: Optional[ApplianceType] = Query(None, description="按类型筛选"),
+    is_on: Optional[bool] = Query(None, description="按开关状态筛选"),
+    name_prefix: Optional[str] = Query(None, max_length=100, description="按名称前缀筛选"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> List[ApplianceOut]:
+    """获取当前用户的电器列表（键集分页 + 筛选，响应头同同步版本）。"""
     if not current_user.electricity_account:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="用户还没有用电账户"
-        )
-     # 1. 查询电器 - 通过 account_id 关联
-    appliance = (
-        db.query(Appliance)
-        .filter(
-            Appliance.id == appliance_id, 
-            Appliance.account_id == current_user.electricity_account.id
-        )
-        .first()
+        return []
+    items, next_cursor, headers = await db.run_sync(
+        _page_appliances, current_user.electricity_account, limit, cursor, type, is_on, name_prefix
     )
+    _set_page_headers(response, next_cursor, headers)
+    return items
 
-    if not appliance:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="电器不存在或不属于你")
 
-    # 2. 更新状态
-    action = control.action.upper()  # 转大写 "ON" / "OFF"
-    new_is_on = True if action == "ON" else False
-    appliance.is_on = new_is_on
+@async_router.post("/{appliance_id}/control", response_model=ControlResponse)
+async def control_appliance_async(
+    appliance_id: int,
+    control: ApplianceControl,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> ControlResponse:
+    """控制电器开关（AI 介入）。"""
+    account = require_account(current_user)
+    return await db.run_sync(_control_appliance, account, appliance_id, control)
 
-    # 3. 调用 AI 分析（模拟）
-    ai_message = analyze_appliance_action(appliance.name, action, appliance.power_rating_kw)
 
-    # 4. 保存数据库
-    db.commit()
+@async_router.get("/{appliance_id}/history", response_model=ApplianceHistory)
+async def read_appliance_history_async(
+    appliance_id: int,
+    start: Optional[datetime] = Query(None, description="窗口开始时间（默认 end 前 24 小时）"),
+    end: Optional[datetime] = Query(None, description="窗口结束时间（默认当前时间）"),
+    limit: int = Query(100, ge=0, le=1000, description="返回的事件数（新的在前），不影响时长与耗电量统计"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> ApplianceHistory:
+    """电器的开关记录，以及窗口内的开机时长与耗电量。"""
+    account = require_account(current_user)
+    return await db.run_sync(_appliance_history, account, appliance_id, start, end, limit)
 
-    return ControlResponse(
-        success=True,
-        appliance_id=appliance.id,
-        new_status=new_is_on,
-        ai_message=ai_message,
+
+@async_router.post("/batch", response_model=BatchControlResponse)
+async def batch_control_appliances_async(
+    control: BatchControl,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> BatchControlResponse:
+    """批量控制电器开关：一个事务、一条 UPDATE，返回逐个结果与一条汇总建议。"""
+    account = require_account(current_user)
+    return await db.run_sync(_batch_control, account, control)
+
+
+@async_router.get("/scenes", response_model=List[SceneOut])
+async def read_scenes_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> List[SceneOut]:
+    """获取当前账户的场景列表。"""
+    account = require_account(current_user)
+    return await db.run_sync(_list_scenes, account)
+
+
+@async_router.post("/scenes", response_model=SceneOut, status_code=status.HTTP_201_CREATED)
+async def create_scene_async(
+    item: SceneCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> SceneOut:
+    """保存场景（一组电器开关动作，如"离家模式"）。"""
+    account = require_account(current_user)
+    return await db.run_sync(_create_scene, account, item)
+
+
+@async_router.delete("/scenes/{scene_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_scene_async(
+    scene_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> Response:
+    """删除场景。"""
+    account = require_account(current_user)
+    await db.run_sync(_delete_scene, account, scene_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@async_router.post("/scenes/{scene_id}/apply", response_model=BatchControlResponse)
+async def apply_scene_async(
+    scene_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> BatchControlResponse:
+    """执行场景：与批量控制相同，一个事务内完成全部动作。"""
+    account = require_account(current_user)
+    return await db.run_sync(_apply_scene, account, scene_id)
+
+
+# ---------------------------------------------------------------------------
+# 实时推送（同步 / 异步模式共用，连接期间不持有数据库会话）
+# ---------------------------------------------------------------------------
+
+
+@router.get("/events")
+@async_router.get("/events")
+async def stream_appliance_events(current_user: User = Depends(get_stream_user)) -> StreamingResponse:
+    """SSE：推送电器开关变化与总功率；先发送 `snapshot`，之后为 `appliance` 事件。"""
+    account = require_account(current_user)
+    # 先订阅再读取快照，期间发生的变化会排在快照之后推送
+    subscription = live_events.subscribe(account.id)
+    try:
+        snapshot = await run_in_session(_live_snapshot, account)
+    except Exception:
+        subscription.close()
+        raise
+    return StreamingResponse(
+        sse_stream(subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
+
+def _websocket_token(websocket: WebSocket) -> Optional[str]:
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    return websocket.query_params.get("token")
+
+
+@router.websocket("/ws")
+@async_router.websocket("/ws")
+async def appliance_events_ws(websocket: WebSocket) -> None:
+    """WebSocket 版本：消息内容与 SSE 相同（JSON，`type` 字段区分事件）。"""
+    try:
+        account = require_account(await load_stream_user(_websocket_token(websocket)))
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = live_events.subscribe(account.id)
+    try:
+        await websocket.send_json({"type": "snapshot", **await run_in_session(_live_snapshot, account)})
+        while True:
+            if subscription.overflowed:
+                await websocket.send_json({"type": "resync", "reason": "客户端消费过慢，请重新连接"})
+                await websocket.close()
+                return
+            event = await subscription.next_event(settings.live_events_heartbeat_seconds)
+            await websocket.send_json(event or {"type": "heartbeat"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
@@ -1,38 +1,61 @@
 """身份认证相关接口。"""
 
+from contextlib import contextmanager
 from datetime import timedelta
+from typing import Iterator, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_current_user_async, optional_oauth2
 from app.core.config import settings
+from app.core.passwords import HashingBusyError
 from app.core.security import (
     MAX_PASSWORD_LENGTH,
+    TokenDecodeError,
     create_access_token,
-    get_password_hash,
-    verify_password,
+    decode_access_token,
+    password_needs_rehash,
+    password_pool,
 )
+from app.db.async_session import get_async_db
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import LoginRequest, Token, UserCreate, UserRead
 from app.models.electricity_account import ElectricityAccount
+from app.services.principal_cache import principal_cache
+from app.services.token_denylist import token_denylist
 
 router = APIRouter()
+async_router = APIRouter()
 
 
-@router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(user_in: UserCreate, db: Session = Depends(get_db)) -> UserRead:
-    """创建新用户账户。"""
+@contextmanager
+def _hashing_slot() -> Iterator[None]:
+    """哈希工作池排队已满时返回 503，而不是继续占用请求线程。"""
+
+    try:
+        yield
+    except HashingBusyError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+
+
+def _check_password_length(password: str) -> None:
+    if len(password) > MAX_PASSWORD_LENGTH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="密码长度不能超过 30 个字符")
 
-    existing_user = db.query(User).filter(User.username == user_in.username).first()
+
+def _ensure_username_available(db: Session, username: str) -> None:
+    existing_user = db.query(User).filter(User.username == username).first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="用户名已存在")
 
-    try:
-        hashed_password = get_password_hash(user_in.password)
-    except ValueError as exc:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+def _create_user(db: Session, user_in: UserCreate, hashed_password: str) -> User:
+    """创建用户并自动开通用电账户（同步 / 异步路由共用）。"""
 
     new_user = User(username=user_in.username, address=user_in.address, password=hashed_password)
     db.add(new_user)
@@ -47,29 +70,81 @@ def register_user(user_in: UserCreate, db: Session = Depends(get_db)) -> UserRea
         valley_rate=0.3   # 默认谷值电价
     )
     db.add(electricity_account)
-    
+
     # 3. 提交事务
     db.commit()
     db.refresh(new_user)  # 刷新用户数据（包含关系）
     return new_user
 
 
-@router.post("/token", response_model=Token)
-def login(login_req: LoginRequest, db: Session = Depends(get_db)) -> Token:
-    """验证用户凭证并返回访问令牌。"""
+def _find_user(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
 
-    if len(login_req.password) > MAX_PASSWORD_LENGTH:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="密码长度不能超过 30 个字符")
 
-    user = db.query(User).filter(User.username == login_req.username).first()
-    if user is None or not verify_password(login_req.password, user.password):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户名或密码错误")
+def _upgrade_password_hash(db: Session, user: User, new_hash: str) -> None:
+    """登录成功后把旧格式 / 旧参数的哈希升级为当前算法。"""
 
+    user.password = new_hash
+    db.commit()
+
+
+def _issue_token(user: User) -> Token:
     expires = timedelta(minutes=settings.access_token_expire_minutes)
     token = create_access_token(subject=user.username, expires_delta=expires)
     return Token(access_token=token, expires_in=int(expires.total_seconds()))
 
 
+def _revoke_token(db: Session, token: str) -> None:
+    """把 Token 的 jti 写入注销名单；无效或过期的 Token 直接忽略。"""
+
+    try:
+        claims = decode_access_token(token)
+    except TokenDecodeError:
+        return
+    if claims.get("jti") and claims.get("exp"):
+        user = _find_user(db, claims.get("sub", ""))
+        token_denylist.revoke(db, claims["jti"], float(claims["exp"]), user.id if user else None)
+    principal_cache.claims.pop(principal_cache.token_key(token))
+
+
+_LOGOUT_MESSAGE = {"message": "已退出登录，Token 已失效"}
+
+
+def _invalid_credentials() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户名或密码错误")
+
+
+# 注册与登录即使在同步模式下也使用 async 处理函数：数据库操作放进线程池，
+# 慢哈希在哈希工作池中 await，等待哈希结果时不占用 Starlette 线程池的线程。
+
+
+@router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+async def register_user(user_in: UserCreate, db: Session = Depends(get_db)) -> UserRead:
+    """创建新用户账户。"""
+
+    _check_password_length(user_in.password)
+    await run_in_threadpool(_ensure_username_available, db, user_in.username)
+    with _hashing_slot():
+        hashed_password = await password_pool.hash_async(user_in.password)
+    return await run_in_threadpool(_create_user, db, user_in, hashed_password)
+
+
+@router.post("/token", response_model=Token)
+async def login(login_req: LoginRequest, db: Session = Depends(get_db)) -> Token:
+    """验证用户凭证并返回访问令牌。"""
+
+    _check_password_length(login_req.password)
+    user = await run_in_threadpool(_find_user, db, login_req.username)
+    with _hashing_slot():
+        # 用户不存在时也校验一次（假哈希），响应耗时不泄露用户名是否存在
+        if not await password_pool.verify_async(login_req.password, user.password if user else None):
+            raise _invalid_credentials()
+        if password_needs_rehash(user.password):
+            new_hash = await password_pool.hash_async(login_req.password)
+            await run_in_threadpool(_upgrade_password_hash, db, user, new_hash)
+    return _issue_token(user)
+
+
 @router.get("/me", response_model=UserRead)
 def read_current_user(current_user: User = Depends(get_current_user)) -> UserRead:
     """获取当前登录用户信息。"""
@@ -78,8 +153,64 @@ def read_current_user(current_user: User = Depends(get_current_user)) -> UserRea
 
 
 @router.post("/logout")
-def logout() -> dict[str, str]:
-    """简单返回前端可用的提示信息。"""
+def logout(
+    token_auth: Optional[HTTPAuthorizationCredentials] = Depends(optional_oauth2),
+    db: Session = Depends(get_db),
+) -> dict[str, str]:
+    """退出登录：服务端注销当前 Token（未携带 Token 时直接返回）。"""
+
+    if token_auth is not None:
+        _revoke_token(db, token_auth.credentials)
+    return _LOGOUT_MESSAGE
+
+
+# ---------------------------------------------------------------------------
+# 异步版本（settings.async_db_enabled 为 True 时挂载）
+# ---------------------------------------------------------------------------
+
+
+@async_router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+async def register_user_async(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)) -> UserRead:
+    """创建新用户账户。"""
+
+    _check_password_length(user_in.password)
+    await db.run_sync(_ensure_username_available, user_in.username)
+    # 慢哈希在工作池中执行，不阻塞事件循环
+    with _hashing_slot():
+        hashed_password = await password_pool.hash_async(user_in.password)
+    return await db.run_sync(_create_user, user_in, hashed_password)
+
+
+@async_router.post("/token", response_model=Token)
+async def login_async(login_req: LoginRequest, db: AsyncSession = Depends(get_async_db)) -> Token:
+    """验证用户凭证并返回访问令牌。"""
+
+    _check_password_length(login_req.password)
+    user = await db.run_sync(_find_user, login_req.username)
+    with _hashing_slot():
+        # 用户不存在时也校验一次（假哈希），响应耗时不泄露用户名是否存在
+        if not await password_pool.verify_async(login_req.password, user.password if user else None):
+            raise _invalid_credentials()
+        if password_needs_rehash(user.password):
+            new_hash = await password_pool.hash_async(login_req.password)
+            await db.run_sync(_upgrade_password_hash, user, new_hash)
+    return _issue_token(user)
+
+
+@async_router.get("/me", response_model=UserRead)
+async def read_current_user_async(current_user: User = Depends(get_current_user_async)) -> UserRead:
+    """获取当前登录用户信息。"""
+
+    return current_user
+
 
-    return {"message": "已退出登录（前端请删除 Token）"}
+@async_router.post("/logout")
+async def logout_async(
+    token_auth: Optional[HTTPAuthorizationCredentials] = Depends(optional_oauth2),
+    db: AsyncSession = Depends(get_async_db),
+) -> dict[str, str]:
+    """退出登录：服务端注销当前 Token（未携带 Token 时直接返回）。"""
 
+    if token_auth is not None:
+        await db.run_sync(_revoke_token, token_auth.credentials)
+    return _LOGOUT_MESSAGE
@@ -0,0 +1,71 @@
+"""AI 用电顾问对话接口。"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user, get_current_user_async
+from app.db.async_session import run_in_session
+from app.models.user import User
+from app.schemas.chat import ChatReply, ChatRequest
+from app.services.chat import chat_service
+from app.services.live_state import live_state
+from app.services.tariffs import load_holidays, tariff_for
+
+router = APIRouter()
+async_router = APIRouter()
+
+
+def _chat_context(db: Session, user: User) -> Dict[str, Any]:
+    """模型上下文：账户的实时功率汇总（内存）与当前电价时段；没有用电账户时为空。"""
+
+    account = user.electricity_account
+    if account is None:
+        return {}
+    power = live_state.totals(db, account.id)
+    return {
+        "on_power": round(power.on_power, 2),
+        "active_count": power.active_count,
+        "climate_on": power.climate_on,
+        "period": tariff_for(db, account).period_at(datetime.now(), load_holidays(db)),
+    }
+
+
+async def _completions(request: Request, body: ChatRequest, user: User) -> Union[StreamingResponse, ChatReply]:
+    # 只在组装上下文时借用连接，流式输出期间不持有会话
+    context = await run_in_session(_chat_context, user)
+    if not body.stream:
+        try:
+            reply, metrics = await chat_service.complete(user.id, body, context)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="模型响应超时，请稍后重试")
+        return ChatReply(reply=reply, metrics=metrics.as_model())
+    return StreamingResponse(
+        chat_service.sse(user.id, body, context, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/completions", response_model=ChatReply)
+async def chat_completions(
+    request: Request,
+    body: ChatRequest,
+    current_user: User = Depends(get_current_user),
+) -> Union[StreamingResponse, ChatReply]:
+    """发送对话消息：默认以 SSE 逐 token 返回（`token` 事件，最后为带指标的 `done`），`stream=false` 时返回 JSON。"""
+    return await _completions(request, body, current_user)
+
+
+@async_router.post("/completions", response_model=ChatReply)
+async def chat_completions_async(
+    request: Request,
+    body: ChatRequest,
+    current_user: User = Depends(get_current_user_async),
+) -> Union[StreamingResponse, ChatReply]:
+    """发送对话消息：默认以 SSE 逐 token 返回（`token` 事件，最后为带指标的 `done`），`stream=false` 时返回 JSON。"""
+    return await _completions(request, body, current_user)
@@ -1,287 +1,241 @@
 """仪表盘数据相关接口。"""
 
-import math
-from datetime import datetime, timedelta
-from typing import List, Optional
-
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, and_
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import FrozenSet, List, Literal, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from decimal import Decimal
 
-from app.api.deps import get_current_user
-from app.db.session import get_db
+from app.api.deps import get_current_user, get_current_user_async, require_account
+from app.db.async_session import get_async_db, get_async_sessionmaker
+from app.db.session import SessionLocal, get_db
 from app.models.appliance import Appliance
-from app.models.consumption_data import ConsumptionData
+from app.models.electricity_account import ElectricityAccount
 from app.models.user import User
 from app.schemas.dashboard import (
     ChartDataPoint,
     ConsumptionFactors,
     ConsumptionFactor,
+    ConsumptionForecast,
     ConsumptionTrend,
+    DashboardSnapshot,
     DashboardSummary,
+    ForecastPoint,
     Weather,
     ElectricityRate,
 )
+from app.services.anomalies import recent_anomalies
+from app.services.bucketing import (
+    DAY_SECONDS,
+    MIN_BUCKET_SECONDS,
+    align_start,
+    choose_bucket_seconds,
+)
+from app.services.export import EXPORT_MEDIA_TYPES, accepts_gzip, aiter_export, iter_export
+from app.services.forecasting import MODEL_NAME, PROJECTION_NAME, forecast_cost, forecast_slots, forecast_store
+from app.services.live_state import AccountPower, live_state
+from app.services.response_cache import conditional_response, response_cache
+from app.services.rollups import trend_buckets, usage_between
+from app.services.synthetic import SLOT_HOURS, SyntheticAppliance, expected_slot_kwh
+from app.services.tariffs import (
+    Bill,
+    CompiledTariff,
+    bill_between,
+    floor_slot,
+    load_holidays,
+    projected_cost,
+    slot_prices,
+    tariff_for,
+)
+from app.services.weather import Observation, WeatherUnavailable, region_of, weather_service
 
 router = APIRouter()
+async_router = APIRouter()
 
 
-def _calculate_current_power(appliances: List[Appliance]) -> float:
-    """计算当前总功率（基于开启的电器）。"""
-    return sum(
-        float(appliance.power_rating_kw) for appliance in appliances if appliance.is_on
+def _load_appliances(db: Session, account: ElectricityAccount) -> List[Appliance]:
+    return (
+        db.query(Appliance)
+        .filter(Appliance.account_id == account.id)
+        .all()
     )
 
 
-def _estimate_daily_cost(
-    appliances: List[Appliance], peak_rate: Decimal, valley_rate: Decimal
-) -> float:
-    """估算今日电费（基于当前开启的电器和平均使用时长）。"""
-    # 简单估算：假设开启的电器平均每天使用8小时，使用平均电价
-    avg_rate = (float(peak_rate) + float(valley_rate)) / 2
-    total_power = _calculate_current_power(appliances)
-    # 假设当前开启的电器会持续使用，按8小时估算
-    estimated_hours = 8.0
-    return total_power * estimated_hours * avg_rate
+@dataclass
+class _DashboardData:
+    """各组件共用的数据：快照一次加载后传给每个组件，单独的接口按需加载自己那一份。"""
 
+    now: datetime
+    tariff: CompiledTariff
+    holidays: FrozenSet[date]
+    power: AccountPower
+    bill: Optional[Bill] = None  # 从某一时刻到 now 的逐时段用电量与单价
 
-def _get_month_usage(db: Session, account_id: int) -> float:
-    """获取本月累计用电量（kWh）。"""
-    now = datetime.now()
-    month_start = datetime(now.year, now.month, 1)
-    
-    result = (
-        db.query(func.sum(ConsumptionData.total_kwh))
-        .filter(
-            and_(
-                ConsumptionData.account_id == account_id,
-                ConsumptionData.timestamp >= month_start,
-            )
-        )
-        .scalar()
-    )
-    return float(result) if result else 0.0
+    def usage_since(self, db: Session, account: ElectricityAccount, start: datetime) -> float:
+        """`start` 到现在的用电量：已加载的逐时段用电量覆盖该区间时直接求和，否则读汇总表。"""
+        if self.bill is not None and self.bill.start <= start:
+            # 与 usage_between 一致：只计记录时间不早于 start 的时段
+            first = floor_slot(start)
+            return self.bill.kwh(since=first if first == start else first + timedelta(seconds=MIN_BUCKET_SECONDS))
+        return usage_between(db, account.id, start, self.now)
 
 
-@router.get("/summary", response_model=DashboardSummary)
-def get_dashboard_summary(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> DashboardSummary:
-    """获取今日概览（KPI Cards）。"""
-    if not current_user.electricity_account:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="用户还没有用电账户",
-        )
+def _month_start(now: datetime) -> datetime:
+    return datetime(now.year, now.month, 1)
 
-    account = current_user.electricity_account
-    appliances = (
-        db.query(Appliance)
-        .filter(Appliance.account_id == account.id)
-        .all()
-    )
 
-    # 计算当前总功率
-    total_power_now = _calculate_current_power(appliances)
+def _load_dashboard_data(
+    db: Session, account: ElectricityAccount, usage_start: Optional[datetime] = None
+) -> _DashboardData:
+    """加载电价方案、节假日、实时功率，以及（`usage_start` 给定时）从该时刻起的逐时段账单。"""
+    now = datetime.now()
+    tariff = tariff_for(db, account)
+    holidays = load_holidays(db)
+    # 当前总功率与开启数量：读取内存中的实时汇总，不查询电器表
+    data = _DashboardData(now, tariff, holidays, live_state.totals(db, account.id))
+    if usage_start is not None:
+        # 整天读逐时段日汇总表，只有今天查原始数据（见 app.services.tariffs）
+        data.bill = bill_between(db, account, usage_start, now, tariff, holidays)
+    return data
 
-    # 估算今日电费
-    daily_cost_estimate = _estimate_daily_cost(
-        appliances, account.peak_rate, account.valley_rate
-    )
 
-    # 获取本月累计用电
-    month_usage_kwh = _get_month_usage(db, account.id)
+def _build_summary(db: Session, account: ElectricityAccount, data: Optional[_DashboardData] = None) -> DashboardSummary:
+    """计算今日概览（同步 / 异步路由共用）。"""
+    if data is None:
+        data = _load_dashboard_data(db, account, _month_start(datetime.now()))
+    now, tariff, holidays = data.now, data.tariff, data.holidays
+    total_power_now = data.power.on_power
 
-    # 统计开启的电器数量
-    active_appliances_count = sum(1 for app in appliances if app.is_on)
+    # 本月逐时段账单（分时电价查表 + 一次点积），今日电费取其中今天的部分
+    month_start = _month_start(now)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today_cost = data.bill.cost(since=today)
+
+    # 今日预计电费：已用部分按实际计费；剩余时间优先使用负荷预测模型，
+    # 没有模型、模型没有训练数据或已陈旧时假设当前开启的电器持续运行
+    model = forecast_store.get(db, account.id)
+    if model is not None and model.usable(now):
+        remaining_cost = forecast_cost(model, tariff, now, today + timedelta(days=1), holidays)
+    else:
+        remaining_cost = projected_cost(tariff, total_power_now, now, today + timedelta(days=1), holidays)
+    daily_cost_estimate = today_cost + remaining_cost
 
     return DashboardSummary(
         total_power_now=round(total_power_now, 2),
         daily_cost_estimate=round(daily_cost_estimate, 2),
-        month_usage_kwh=round(month_usage_kwh, 2),
-        active_appliances_count=active_appliances_count,
-    )
-
-
-def _generate_mock_trend_data(
-    range_type: str, account_id: int, db: Session, appliances: List[Appliance]
-) -> List[ChartDataPoint]:
-    """生成模拟趋势数据（当数据库中没有真实数据时）。返回格式匹配前端期望。"""
-    now = datetime.now()
-    data = []
-
-    # 计算基础用电量（基于开启的电器）
-    base_power_w = sum(
-        float(app.power_rating_kw) * 1000  # 转换为瓦特
-        for app in appliances
-        if app.is_on
+        today_cost=round(today_cost, 2),
+        month_cost=round(data.bill.cost(since=month_start), 2),
+        month_usage_kwh=round(data.bill.kwh(since=month_start), 2),
+        active_appliances_count=data.power.active_count,
     )
 
-    if range_type == "24h":
-        # 生成过去24小时的数据，每30分钟一个点（48个点）
-        for i in range(48, 0, -1):
-            timestamp = now - timedelta(minutes=30 * i)
-            time_str = timestamp.strftime("%H:%M")
-            
-            # 模拟数据：白天高，夜间低，加上基础用电
-            hour = timestamp.hour
-            if hour >= 7 and hour <= 9:
-                # 早晨高峰
-                usage = base_power_w + 150 + (i % 5) * 50
-            elif hour >= 18 and hour <= 22:
-                # 晚上高峰
-                usage = base_power_w + 300 + (i % 5) * 100
-            elif hour >= 12 and hour <= 14:
-                # 中午
-                usage = base_power_w + 100 + (i % 3) * 30
-            else:
-                # 其他时间（基础待机）
-                usage = base_power_w + 50 + (i % 3) * 20
-            
-            data.append(ChartDataPoint(
-                time=time_str,
-                usage=round(max(100, usage), 0)  # 最小100W，单位：瓦特
-            ))
-    elif range_type == "week":
-        # 生成过去7天的数据，每天一个点
-        for i in range(7, 0, -1):
-            date = now.date() - timedelta(days=i)
-            time_str = date.strftime("%m/%d")
-            # 模拟数据：工作日稍高
-            weekday_factor = 1.2 if date.weekday() < 5 else 1.0
-            usage = (base_power_w * 24 * weekday_factor) + (i % 3) * 2000  # 每天的总用电量（W）
-            data.append(ChartDataPoint(
-                time=time_str,
-                usage=round(usage, 0)
-            ))
-    else:  # month
-        # 生成过去30天的数据，每3天一个点
-        for i in range(30, 0, -3):
-            date = now.date() - timedelta(days=i)
-            time_str = date.strftime("%m/%d")
-            usage = (base_power_w * 24 * 3) + (i % 10) * 3000  # 每3天的总用电量（W）
-            data.append(ChartDataPoint(
-                time=time_str,
-                usage=round(usage, 0)
-            ))
-
-    return data
-
-
-@router.get("/consumption/trend", response_model=ConsumptionTrend)
-def get_consumption_trend(
-    range: str = Query("24h", description="时间范围: 24h, week, month"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> ConsumptionTrend:
-    """获取用电趋势（折线图数据），返回格式匹配前端期望。"""
-    if not current_user.electricity_account:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="用户还没有用电账户",
-        )
 
+def _validate_range(range: str) -> None:
     if range not in ["24h", "week", "month"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="range 参数必须是 24h, week 或 month",
         )
 
-    account = current_user.electricity_account
-    appliances = (
-        db.query(Appliance)
-        .filter(Appliance.account_id == account.id)
-        .all()
-    )
-    
-    now = datetime.now()
 
-    # 根据时间范围确定查询的起始时间
-    if range == "24h":
-        start_time = now - timedelta(hours=24)
-        time_format = "%H:%M"
-    elif range == "week":
-        start_time = now - timedelta(days=7)
-        time_format = "%m/%d"
-    else:  # month
-        start_time = now - timedelta(days=30)
-        time_format = "%m/%d"
-
-    # 查询数据库中的真实数据
-    records = (
-        db.query(ConsumptionData)
-        .filter(
-            and_(
-                ConsumptionData.account_id == account.id,
-                ConsumptionData.timestamp >= start_time,
-            )
-        )
-        .order_by(ConsumptionData.timestamp)
-        .all()
-    )
+# 各时间范围的跨度与默认桶大小（秒）
+_TREND_RANGES = {
+    "24h": (timedelta(hours=24), 1800),
+    "week": (timedelta(days=7), DAY_SECONDS),
+    "month": (timedelta(days=30), DAY_SECONDS),
+}
 
-    if records:
-        # 有真实数据，转换为前端期望的格式（kWh -> W）
-        data = []
-        for record in records:
-            # 将 kWh 转换为 W（假设是30分钟内的用电量）
-            usage_w = float(record.total_kwh) * 1000 * 2  # 转换为瓦特，并假设是30分钟内的功率
-            data.append(ChartDataPoint(
-                time=record.timestamp.strftime(time_format),
-                usage=round(usage_w, 0)
-            ))
-    else:
-        # 没有真实数据，生成模拟数据
-        data = _generate_mock_trend_data(range, account.id, db, appliances)
 
-    return ConsumptionTrend(data=data)
+def _generate_mock_trend_data(
+    start_time: datetime, now: datetime, bucket_seconds: int, time_format: str, appliances: List[Appliance]
+) -> List[ChartDataPoint]:
+    """没有真实数据时的示意曲线：按账户电器类型的典型负荷曲线计算（不含随机波动，结果可复现）。"""
+    slots = int((now - start_time) // timedelta(seconds=MIN_BUCKET_SECONDS))
+    per_bucket = bucket_seconds // MIN_BUCKET_SECONDS
+    synthetic = [
+        SyntheticAppliance(app.type, app.name, float(app.power_rating_kw or 0)) for app in appliances
+    ]
+    kwh = expected_slot_kwh(synthetic, start_time, slots)
+    data = []
+    for index in range(0, slots, per_bucket):
+        bucket = kwh[index:index + per_bucket]
+        data.append(ChartDataPoint(
+            time=(start_time + timedelta(seconds=MIN_BUCKET_SECONDS * index)).strftime(time_format),
+            usage=round(float(bucket.mean()) * 1000 / SLOT_HOURS, 0),  # 平均功率 (W)
+        ))
+    return data
 
 
-@router.get("/consumption/factors", response_model=ConsumptionFactors)
-def get_consumption_factors(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> ConsumptionFactors:
-    """获取用电影响因素（AI 分析数据）。"""
-    if not current_user.electricity_account:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="用户还没有用电账户",
-        )
+def _build_trend(
+    db: Session,
+    account: ElectricityAccount,
+    range: str,
+    points: Optional[int] = None,
+    bucket_minutes: Optional[int] = None,
+    data: Optional[_DashboardData] = None,
+) -> ConsumptionTrend:
+    """查询用电趋势（同步 / 异步路由共用）。
+
+    在数据库中按时间桶聚合，只返回每个桶一行；桶大小由 `bucket_minutes`
+    或目标点数 `points` 决定，均未指定时使用各时间范围的默认值。
+    """
+    span, bucket_seconds = _TREND_RANGES[range]
+    if bucket_minutes:
+        bucket_seconds = max(MIN_BUCKET_SECONDS, bucket_minutes * 60)
+    elif points:
+        bucket_seconds = choose_bucket_seconds(span, points)
+
+    now = data.now if data is not None else datetime.now()
+    start_time = align_start(now - span, bucket_seconds)
+    time_format = "%H:%M" if bucket_seconds < DAY_SECONDS else "%m/%d"
+
+    # 已结束的整小时 / 整天读汇总表，只有当前未结束的部分扫描原始数据
+    buckets = trend_buckets(db, account.id, start_time, bucket_seconds, now=now)
+
+    if buckets:
+        # kWh -> 平均功率 (W)：按桶内实际采样时长（每条 30 分钟）折算，
+        # 当前未结束的桶不会被低估
+        sample_hours = MIN_BUCKET_SECONDS / 3600
+        chart = [
+            ChartDataPoint(
+                time=bucket.start.strftime(time_format),
+                usage=round(bucket.total_kwh * 1000 / (bucket.samples * sample_hours), 0),
+            )
+            for bucket in buckets
+        ]
+    else:
+        # 没有真实数据，生成模拟数据（只有这种情况才读取电器表）
+        chart = _generate_mock_trend_data(start_time, now, bucket_seconds, time_format, _load_appliances(db, account))
 
-    account = current_user.electricity_account
-    appliances = (
-        db.query(Appliance)
-        .filter(Appliance.account_id == account.id)
-        .all()
-    )
+    return ConsumptionTrend(data=chart)
 
-    # 分析当前电器状态，生成影响因素
-    total_power = sum(float(app.power_rating_kw) for app in appliances)
-    active_power = sum(
-        float(app.power_rating_kw) for app in appliances if app.is_on
-    )
+
+def _build_factors(
+    db: Session, account: ElectricityAccount, data: Optional[_DashboardData] = None
+) -> ConsumptionFactors:
+    """分析用电影响因素（同步 / 异步路由共用）。"""
+    if data is None:
+        data = _load_dashboard_data(db, account)
+    # 分析当前电器状态（内存中的实时汇总），生成影响因素
+    power = data.power
+    total_power = power.total_power
 
     # 计算各因素权重（模拟AI分析）
     factors = []
 
     # 天气因素（如果有空调或暖气开启）
-    ac_heater_on = any(
-        app.is_on and app.type in ["ac", "heater"] for app in appliances
-    )
+    ac_heater_on = power.climate_on > 0
     weather_factor = 40.0 if ac_heater_on else 10.0
     factors.append(
         ConsumptionFactor(name="天气因素 (制冷/制热)", value=weather_factor)
     )
 
     # 大功率电器使用
-    large_appliances_power = sum(
-        float(app.power_rating_kw)
-        for app in appliances
-        if app.is_on and float(app.power_rating_kw) > 1.0
-    )
+    large_appliances_power = power.large_on_power
     large_app_factor = min(50.0, (large_appliances_power / total_power * 100) if total_power > 0 else 0)
     factors.append(
         ConsumptionFactor(name="大功率电器使用", value=round(large_app_factor, 1))
@@ -291,12 +245,20 @@ def get_consumption_factors(
     standby_factor = 15.0
     factors.append(ConsumptionFactor(name="基础待机", value=standby_factor))
 
-    # 峰时用电（根据当前时间判断）
-    current_hour = datetime.now().hour
-    is_peak_time = 8 <= current_hour <= 22
+    # 峰时用电（按账户电价方案判断当前时段）
+    is_peak_time = data.tariff.period_at(data.now, data.holidays) == "peak"
     peak_factor = 20.0 if is_peak_time else 5.0
     factors.append(ConsumptionFactor(name="峰时用电", value=peak_factor))
 
+    # 异常用电：读取后台批量检测的结果，按最近 7 天超出基线的电量占比计权
+    week_ago = data.now - timedelta(days=7)
+    anomaly_count, excess_kwh = recent_anomalies(db, account.id, week_ago)
+    anomaly_factor = 0.0
+    if anomaly_count:
+        week_usage = data.usage_since(db, account, week_ago)
+        anomaly_factor = min(50.0, excess_kwh / week_usage * 100) if week_usage > 0 else 0.0
+    factors.append(ConsumptionFactor(name="异常用电", value=round(anomaly_factor, 1)))
+
     # 归一化因子值，使总和为100
     total_value = sum(f.value for f in factors)
     if total_value > 0:
@@ -309,7 +271,12 @@ def get_consumption_factors(
         factors = normalized_factors
 
     # 生成AI建议
-    if ac_heater_on:
+    if anomaly_count:
+        suggestion = (
+            f"最近 7 天检测到 {anomaly_count} 个异常用电时段，比平时多用约 {excess_kwh:.1f} kWh，"
+            "建议检查是否有电器忘记关闭。"
+        )
+    elif ac_heater_on:
         suggestion = "检测到空调/暖气正在运行，建议适当调整温度设置以平衡舒适度和节能。"
     elif large_app_factor > 30:
         suggestion = "当前大功率电器使用较多，建议错峰使用以降低电费成本。"
@@ -317,59 +284,397 @@ def get_consumption_factors(
         suggestion = "当前用电情况良好，继续保持节能习惯！"
 
     return ConsumptionFactors(
-        updated_at=datetime.now(),
+        updated_at=data.now,
         factors=factors,
         suggestion=suggestion,
     )
 
 
+def _weather_response(observation: Observation) -> Weather:
+    return Weather(
+        temperatureC=observation.temperature_c,
+        condition=observation.condition,
+        humidity=observation.humidity,
+        region=observation.region,
+        observedAt=observation.observed_at,
+    )
+
+
+def _build_weather(region: str) -> Weather:
+    """用户所在地区的天气（按地区共享缓存，见 `app.services.weather`）。"""
+    try:
+        return _weather_response(weather_service.get(region))
+    except WeatherUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+
+
+async def _build_weather_async(region: str) -> Weather:
+    try:
+        return _weather_response(await weather_service.aget(region))
+    except WeatherUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+
+
+def _build_forecast(db: Session, account: ElectricityAccount, hours: int) -> ConsumptionForecast:
+    """未来 `hours` 小时的逐时段预测：系数来自缓存（由后台定时任务拟合），
+    账户还没有模型时按当前功率恒定运行投影，请求中不做拟合。"""
+    now = datetime.now()
+    model = forecast_store.get(db, account.id)
+    holidays = load_holidays(db)
+    start, slots = forecast_slots(now, hours)
+    if model is not None and model.samples > 0:
+        mean, low, high = model.predict(start, slots, holidays)
+    else:
+        model = None
+        mean = np.full(slots, live_state.totals(db, account.id).on_power * SLOT_HOURS)
+        low = high = mean
+    prices = slot_prices(tariff_for(db, account), start, slots, holidays)
+    stamps = [start + timedelta(minutes=30 * index) for index in range(slots)]
+    return ConsumptionForecast(
+        points=[
+            ForecastPoint(time=stamp, kwh=round(kwh, 3), low=round(lo, 3), high=round(hi, 3))
+            for stamp, kwh, lo, hi in zip(stamps, mean.tolist(), low.tolist(), high.tolist())
+        ],
+        total_kwh=round(float(mean.sum()), 3),
+        expected_cost=round(float(np.dot(mean, prices)), 2),
+        model=MODEL_NAME if model else PROJECTION_NAME,
+        fitted_at=model.fitted_at if model else None,
+        data_until=model.data_until if model else None,
+        age_seconds=round(model.age_seconds(now), 1) if model else None,
+        stale=model.is_stale(now) if model else False,
+    )
+
+
+# 电价时段 -> (ElectricityRate.rate, 文本)；平段沿用前端的 "normal"
+_RATE_LABELS = {"peak": ("peak", "峰值电价"), "flat": ("normal", "平值电价"), "valley": ("valley", "谷值电价")}
+
+
+def _build_electricity_rate(
+    db: Session, account: ElectricityAccount, data: Optional[_DashboardData] = None
+) -> ElectricityRate:
+    """当前电价时段与单价（按账户的分时电价方案）。"""
+    if data is None:
+        tariff, holidays, now = tariff_for(db, account), load_holidays(db), datetime.now()
+    else:
+        tariff, holidays, now = data.tariff, data.holidays, data.now
+    rate, rate_text = _RATE_LABELS[tariff.period_at(now, holidays)]
+    return ElectricityRate(rate=rate, rateText=rate_text, price=round(tariff.price_at(now, holidays), 4))
+
+
+# 快照可选的组件
+SNAPSHOT_SECTIONS = ("summary", "trend", "factors", "weather", "rate")
+
+
+def _parse_sections(sections: str) -> tuple[str, ...]:
+    requested = tuple(dict.fromkeys(item.strip() for item in sections.split(",") if item.strip()))
+    unknown = [item for item in requested if item not in SNAPSHOT_SECTIONS]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sections 只能包含: {', '.join(SNAPSHOT_SECTIONS)}",
+        )
+    return requested
+
+
+def _build_snapshot(
+    db: Session,
+    account: ElectricityAccount,
+    sections: tuple[str, ...],
+    range: str,
+    points: Optional[int] = None,
+    weather: Optional[Weather] = None,
+) -> DashboardSnapshot:
+    """一次性计算多个组件。
+
+    电价方案、节假日、实时功率与逐时段账单只加载一次，再传给各组件：
+    概览与影响因素共用同一份逐时段用电量（从本月初或 7 天前中较早者起），
+    影响因素与电价状态共用同一时刻与电价方案；电器表只在趋势图需要模拟数据时读取。
+    `weather` 由调用方按用户地区预先获取（异步路由不能在 run_sync 中等待拉取）。
+    """
+    now = datetime.now()
+    usage_start = None
+    if "summary" in sections:
+        usage_start = _month_start(now)
+        if "factors" in sections:
+            usage_start = min(usage_start, now - timedelta(days=7))
+    data = _load_dashboard_data(db, account, usage_start)
+
+    snapshot = DashboardSnapshot()
+    if "summary" in sections:
+        snapshot.summary = _build_summary(db, account, data)
+    if "trend" in sections:
+        snapshot.trend = _build_trend(db, account, range, points, data=data)
+    if "factors" in sections:
+        snapshot.factors = _build_factors(db, account, data)
+    if "weather" in sections:
+        snapshot.weather = weather
+    if "rate" in sections:
+        snapshot.electricity_rate = _build_electricity_rate(db, account, data)
+    return snapshot
+
+
+def _snapshot_weather(region: str) -> Optional[Weather]:
+    """快照中的天气组件：天气不可用时留空，不影响其他组件。"""
+    try:
+        return _weather_response(weather_service.get(region))
+    except WeatherUnavailable:
+        return None
+
+
+async def _snapshot_weather_async(region: str) -> Optional[Weather]:
+    try:
+        return _weather_response(await weather_service.aget(region))
+    except WeatherUnavailable:
+        return None
+
+
+def _export_window(start: datetime, end: Optional[datetime]) -> tuple[datetime, datetime]:
+    end = end or datetime.now()
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start 必须早于 end")
+    return start, end
+
+
+def _export_response(body, fmt: str, start: datetime, end: datetime, compress: bool) -> StreamingResponse:
+    filename = f"consumption_{start:%Y%m%d}_{end:%Y%m%d}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[fmt], headers=headers)
+
+
+@router.get("/summary", response_model=DashboardSummary)
+def get_dashboard_summary(
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """获取今日概览（KPI Cards）。"""
+    account = require_account(current_user)
+    key = response_cache.key(account.id, "summary")
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = response_cache.store(key, _build_summary(db, account))
+    return conditional_response(entry, if_none_match)
+
+
+@router.get("/consumption/trend", response_model=ConsumptionTrend)
+def get_consumption_trend(
+    range: str = Query("24h", description="时间范围: 24h, week, month"),
+    points: Optional[int] = Query(None, ge=2, le=1000, description="目标数据点数（自动选择桶大小）"),
+    bucket_minutes: Optional[int] = Query(None, ge=30, description="桶大小（分钟），优先于 points"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """获取用电趋势（折线图数据），返回格式匹配前端期望。"""
+    account = require_account(current_user)
+    _validate_range(range)
+    key = response_cache.key(account.id, "trend", range, points, bucket_minutes)
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = response_cache.store(key, _build_trend(db, account, range, points, bucket_minutes))
+    return conditional_response(entry, if_none_match)
+
+
+@router.get("/consumption/factors", response_model=ConsumptionFactors)
+def get_consumption_factors(
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """获取用电影响因素（AI 分析数据）。"""
+    account = require_account(current_user)
+    key = response_cache.key(account.id, "factors")
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = response_cache.store(key, _build_factors(db, account))
+    return conditional_response(entry, if_none_match)
+
+
+@router.get("/snapshot", response_model=DashboardSnapshot)
+def get_dashboard_snapshot(
+    sections: str = Query(",".join(SNAPSHOT_SECTIONS), description="逗号分隔: summary, trend, factors, weather, rate"),
+    range: str = Query("24h", description="趋势时间范围: 24h, week, month"),
+    points: Optional[int] = Query(None, ge=2, le=1000, description="趋势目标数据点数"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """首页快照：一次请求返回所选组件，替代分别请求各个接口。"""
+    account = require_account(current_user)
+    requested = _parse_sections(sections)
+    _validate_range(range)
+    key = response_cache.key(account.id, "snapshot", requested, range, points)
+    entry = response_cache.get(key)
+    if entry is None:
+        weather = _snapshot_weather(region_of(current_user.address)) if "weather" in requested else None
+        entry = response_cache.store(key, _build_snapshot(db, account, requested, range, points, weather))
+    return conditional_response(entry, if_none_match)
+
+
+@router.get("/consumption/forecast", response_model=ConsumptionForecast)
+def get_consumption_forecast(
+    hours: int = Query(24, ge=1, le=48, description="预测时长（小时）"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ConsumptionForecast:
+    """未来用电预测（逐 30 分钟时段，含预测区间与预计电费）。"""
+    account = require_account(current_user)
+    return _build_forecast(db, account, hours)
+
+
+@router.get("/consumption/export")
+def export_consumption(
+    start: datetime = Query(..., description="起始时间（含）"),
+    end: Optional[datetime] = Query(None, description="结束时间（不含），默认当前时间"),
+    format: Literal["csv", "ndjson"] = Query("csv", description="导出格式: csv, ndjson"),
+    accept_encoding: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """流式导出原始用电记录；客户端接受 gzip 时边读边压缩。"""
+    account = require_account(current_user)
+    start, end = _export_window(start, end)
+    compress = accepts_gzip(accept_encoding)
+    body = iter_export(SessionLocal, account.id, start, end, format, compress)
+    return _export_response(body, format, start, end, compress)
+
+
 @router.get("/weather", response_model=Weather)
 def get_weather(
     current_user: User = Depends(get_current_user),
 ) -> Weather:
-    """获取天气数据（模拟数据，后续可接入真实天气API）。"""
-    now = datetime.now()
-    hour = now.hour
-
-    # 模拟天气数据（类似前端demo的逻辑）
-    def get_condition(h: int) -> str:
-        if h > 18 or h < 6:
-            return "晴朗"
-        if h > 10 and h < 16:
-            return "炎热"
-        return "多云"
-
-    # 模拟温度变化（类似前端demo）
-    temperature_c = 22 + math.sin(hour / 12 * math.pi) * 8
-    
-    condition = get_condition(hour)
-    humidity = 60 + math.cos(hour / 12 * math.pi) * 15
-
-    return Weather(
-        temperatureC=round(temperature_c, 1),
-        condition=condition,
-        humidity=round(humidity, 0),
-    )
+    """获取用户所在地区的天气数据。"""
+    return _build_weather(region_of(current_user.address))
 
 
 @router.get("/electricity-rate", response_model=ElectricityRate)
 def get_electricity_rate(
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> ElectricityRate:
-    """获取当前电价状态（根据时间判断）。"""
-    now = datetime.now()
-    hour = now.hour
-
-    # 根据时间判断电价（匹配前端demo的逻辑）
-    if hour >= 18 and hour < 22:
-        rate = "peak"
-        rate_text = "峰值电价"
-    elif hour >= 0 and hour < 7:
-        rate = "valley"
-        rate_text = "谷值电价"
-    else:
-        rate = "normal"
-        rate_text = "平值电价"
+    """获取当前电价时段与单价（按账户的分时电价方案）。"""
+    account = require_account(current_user)
+    return _build_electricity_rate(db, account)
+
 
-    return ElectricityRate(rate=rate, rateText=rate_text)
+# ---------------------------------------------------------------------------
+# 异步版本（settings.async_db_enabled 为 True 时挂载）
+# ---------------------------------------------------------------------------
 
+
+@async_router.get("/summary", response_model=DashboardSummary)
+async def get_dashboard_summary_async(
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> Response:
+    """获取今日概览（KPI Cards）。"""
+    account = require_account(current_user)
+    key = response_cache.key(account.id, "summary")
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = response_cache.store(key, await db.run_sync(_build_summary, account))
+    return conditional_response(entry, if_none_match)
+
+
+@async_router.get("/consumption/trend", response_model=ConsumptionTrend)
+async def get_consumption_trend_async(
+    range: str = Query("24h", description="时间范围: 24h, week, month"),
+    points: Optional[int] = Query(None, ge=2, le=1000, description="目标数据点数（自动选择桶大小）"),
+    bucket_minutes: Optional[int] = Query(None, ge=30, description="桶大小（分钟），优先于 points"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> Response:
+    """获取用电趋势（折线图数据），返回格式匹配前端期望。"""
+    account = require_account(current_user)
+    _validate_range(range)
+    key = response_cache.key(account.id, "trend", range, points, bucket_minutes)
+    entry = response_cache.get(key)
+    if entry is None:
+        trend = await db.run_sync(_build_trend, account, range, points, bucket_minutes)
+        entry = response_cache.store(key, trend)
+    return conditional_response(entry, if_none_match)
+
+
+@async_router.get("/consumption/factors", response_model=ConsumptionFactors)
+async def get_consumption_factors_async(
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> Response:
+    """获取用电影响因素（AI 分析数据）。"""
+    account = require_account(current_user)
+    key = response_cache.key(account.id, "factors")
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = response_cache.store(key, await db.run_sync(_build_factors, account))
+    return conditional_response(entry, if_none_match)
+
+
+@async_router.get("/snapshot", response_model=DashboardSnapshot)
+async def get_dashboard_snapshot_async(
+    sections: str = Query(",".join(SNAPSHOT_SECTIONS), description="逗号分隔: summary, trend, factors, weather, rate"),
+    range: str = Query("24h", description="趋势时间范围: 24h, week, month"),
+    points: Optional[int] = Query(None, ge=2, le=1000, description="趋势目标数据点数"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> Response:
+    """首页快照：一次请求返回所选组件，替代分别请求各个接口。"""
+    account = require_account(current_user)
+    requested = _parse_sections(sections)
+    _validate_range(range)
+    key = response_cache.key(account.id, "snapshot", requested, range, points)
+    entry = response_cache.get(key)
+    if entry is None:
+        weather = await _snapshot_weather_async(region_of(current_user.address)) if "weather" in requested else None
+        snapshot = await db.run_sync(_build_snapshot, account, requested, range, points, weather)
+        entry = response_cache.store(key, snapshot)
+    return conditional_response(entry, if_none_match)
+
+
+@async_router.get("/consumption/forecast", response_model=ConsumptionForecast)
+async def get_consumption_forecast_async(
+    hours: int = Query(24, ge=1, le=48, description="预测时长（小时）"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> ConsumptionForecast:
+    """未来用电预测（逐 30 分钟时段，含预测区间与预计电费）。"""
+    account = require_account(current_user)
+    return await db.run_sync(_build_forecast, account, hours)
+
+
+@async_router.get("/consumption/export")
+async def export_consumption_async(
+    start: datetime = Query(..., description="起始时间（含）"),
+    end: Optional[datetime] = Query(None, description="结束时间（不含），默认当前时间"),
+    format: Literal["csv", "ndjson"] = Query("csv", description="导出格式: csv, ndjson"),
+    accept_encoding: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user_async),
+) -> StreamingResponse:
+    """流式导出原始用电记录；客户端接受 gzip 时边读边压缩。"""
+    account = require_account(current_user)
+    start, end = _export_window(start, end)
+    compress = accepts_gzip(accept_encoding)
+    body = aiter_export(get_async_sessionmaker(), account.id, start, end, format, compress)
+    return _export_response(body, format, start, end, compress)
+
+
+@async_router.get("/weather", response_model=Weather)
+async def get_weather_async(
+    current_user: User = Depends(get_current_user_async),
+) -> Weather:
+    """获取用户所在地区的天气数据。"""
+    return await _build_weather_async(region_of(current_user.address))
+
+
+@async_router.get("/electricity-rate", response_model=ElectricityRate)
+async def get_electricity_rate_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> ElectricityRate:
+    """获取当前电价时段与单价（按账户的分时电价方案）。"""
+    account = require_account(current_user)
+    return await db.run_sync(_build_electricity_rate, account)
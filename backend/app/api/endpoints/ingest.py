@@ -0,0 +1,111 @@
+"""用电数据批量写入接口（供采集程序 / 模拟器调用）。
+
+请求体可以是：
+- `application/json`：记录数组，整体读入后校验写入（受 `INGEST_MAX_ROWS` 限制）；
+- `application/x-ndjson`：每行一条记录，边读边按批写入，不受行数限制。
+
+每条记录为 `{"account_id": 1, "timestamp": "2024-01-01T10:00:00", "total_kwh": 0.52}`
+或三元数组 `[1, "2024-01-01T10:00:00", 0.52]`。
+"""
+
+import hmac
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.async_session import get_async_db
+from app.db.session import get_db
+from app.schemas.ingest import IngestResult
+from app.services.ingest import ingest_records, parse_json_array, parse_ndjson_line
+
+router = APIRouter()
+async_router = APIRouter()
+
+_NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def require_ingest_key(x_ingest_key: Optional[str] = Header(None)) -> None:
+    """校验 `X-Ingest-Key` 请求头；未配置密钥时接口关闭。"""
+
+    if not settings.ingest_api_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="批量写入接口未启用（未配置 INGEST_API_KEY）",
+        )
+    if not x_ingest_key or not hmac.compare_digest(x_ingest_key, settings.ingest_api_key):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="写入密钥无效")
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+async def _request_batches(request: Request) -> AsyncIterator[Tuple[int, List[Any]]]:
+    """按批产出 `(起始序号, 记录列表)`。"""
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in _NDJSON_TYPES:
+        batch: List[Any] = []
+        offset = 0
+        async for line in _ndjson_lines(request):
+            record = parse_ndjson_line(line)
+            if record is None:
+                continue
+            batch.append(record)
+            if len(batch) >= settings.ingest_chunk_rows:
+                yield offset, batch
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield offset, batch
+        return
+
+    try:
+        records = parse_json_array(await request.body())
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    if len(records) > settings.ingest_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"单次最多写入 {settings.ingest_max_rows} 行，请改用 NDJSON 流式写入",
+        )
+    yield 0, records
+
+
+@router.post("/consumption", response_model=IngestResult, dependencies=[Depends(require_ingest_key)])
+async def ingest_consumption(request: Request, db: Session = Depends(get_db)) -> IngestResult:
+    """批量写入用电数据（按 account_id + timestamp 去重，重试幂等）。
+
+    请求体需要异步读取，校验与写库放在线程池中执行。
+    """
+
+    result = IngestResult()
+    async for offset, records in _request_batches(request):
+        await run_in_threadpool(ingest_records, db, records, result, offset)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# 异步版本（settings.async_db_enabled 为 True 时挂载）
+# ---------------------------------------------------------------------------
+
+
+@async_router.post("/consumption", response_model=IngestResult, dependencies=[Depends(require_ingest_key)])
+async def ingest_consumption_async(request: Request, db: AsyncSession = Depends(get_async_db)) -> IngestResult:
+    """批量写入用电数据（按 account_id + timestamp 去重，重试幂等）。"""
+
+    result = IngestResult()
+    async for offset, records in _request_batches(request):
+        await db.run_sync(ingest_records, records, result, offset)
+    return result
@@ -0,0 +1,98 @@
+"""内部运维接口：连接池与缓存统计，用于根据真实数据调整连接池大小。
+
+默认不挂载（`INTERNAL_ENDPOINTS_ENABLED`），挂载后所有接口都要求 `X-Internal-Key` 请求头。
+"""
+
+import hmac
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.pool_stats import pool_report
+from app.db.session import get_db
+from app.services.appliance_events import appliance_event_log
+from app.services.chat import chat_service
+from app.services.forecasting import forecast_store
+from app.services.live_events import live_events
+from app.services.live_state import live_state
+from app.services.principal_cache import principal_cache
+from app.services.response_cache import response_cache
+from app.services.scheduler import scheduler
+from app.services.weather import weather_service
+
+
+def require_internal_key(x_internal_key: Optional[str] = Header(None)) -> None:
+    """校验 `X-Internal-Key` 请求头；未配置密钥时接口关闭。"""
+
+    if not settings.internal_api_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="内部运维接口未启用（未配置 INTERNAL_API_KEY）",
+        )
+    if not x_internal_key or not hmac.compare_digest(x_internal_key, settings.internal_api_key):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="运维密钥无效")
+
+
+router = APIRouter(dependencies=[Depends(require_internal_key)])
+
+
+@router.get("/db/pool")
+async def get_pool_stats() -> Dict[str, Any]:
+    """连接池遥测：签出次数、溢出连接、等待时间、连接存活时长。"""
+
+    return {"profile": settings.db_engine_profile, "engines": pool_report()}
+
+
+@router.get("/cache")
+async def get_cache_stats() -> Dict[str, Any]:
+    """进程内缓存命中率统计。"""
+
+    return {
+        "principal": principal_cache.stats(),
+        "responses": response_cache.stats(),
+        "forecast_models": forecast_store.stats(),
+        "weather": weather_service.stats(),
+    }
+
+
+@router.get("/live")
+async def get_live_stats() -> Dict[str, Any]:
+    """实时推送连接数与慢消费者断开次数。"""
+
+    return live_events.stats()
+
+
+@router.get("/scheduler")
+async def get_scheduler_stats() -> Dict[str, Any]:
+    """后台定时任务：是否为主节点，以及各任务的执行耗时与触发延迟。"""
+
+    return scheduler.stats()
+
+
+@router.get("/appliance-events")
+async def get_appliance_event_stats() -> Dict[str, Any]:
+    """电器事件日志：缓冲中的事件数、落库批次与失败、待重放的暂存分段。"""
+
+    return appliance_event_log.stats()
+
+
+@router.get("/live-state")
+def get_live_state_stats(
+    check: bool = Query(False, description="与数据库比对已缓存账户的开启功率 / 开启数量"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """实时功率状态：缓存的账户数、增量更新与对账次数、内存占用（含每 10 万台电器的估算）。"""
+
+    stats = live_state.stats()
+    if check:
+        stats["check"] = live_state.check(db)
+    return stats
+
+
+@router.get("/chat")
+async def get_chat_stats() -> Dict[str, Any]:
+    """AI 对话：各状态的请求数、最近 1000 次的首 token 延迟分位数与生成速率、聊天记录写入情况。"""
+
+    return chat_service.stats()
@@ -0,0 +1,103 @@
+"""分时电价方案接口：查看可选方案、当前账户的价格表，以及切换方案。"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user, get_current_user_async, require_account
+from app.db.async_session import get_async_db
+from app.db.session import get_db
+from app.models.electricity_account import ElectricityAccount
+from app.models.tariff import TariffSchedule
+from app.models.user import User
+from app.schemas.tariff import TariffScheduleOut, TariffSelect, TariffTable
+from app.services.tariffs import tariff_for
+
+router = APIRouter()
+async_router = APIRouter()
+
+
+def _list_schedules(db: Session) -> List[TariffSchedule]:
+    return list(db.execute(select(TariffSchedule).order_by(TariffSchedule.id)).scalars())
+
+
+def _current_table(db: Session, account: ElectricityAccount) -> TariffTable:
+    return tariff_for(db, account).table()
+
+
+def _select_schedule(db: Session, account: ElectricityAccount, schedule_id: Optional[int]) -> TariffTable:
+    if schedule_id is not None and db.get(TariffSchedule, schedule_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="电价方案不存在")
+    # 认证得到的账户是脱离会话的缓存快照，需在当前会话中重新加载后修改
+    target = db.get(ElectricityAccount, account.id)
+    target.tariff_schedule_id = schedule_id
+    db.commit()
+    return tariff_for(db, target).table()
+
+
+@router.get("/", response_model=List[TariffScheduleOut])
+def list_schedules(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> List[TariffSchedule]:
+    """列出所有可选的电价方案。"""
+    return _list_schedules(db)
+
+
+@router.get("/current", response_model=TariffTable)
+def get_current_tariff(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> TariffTable:
+    """当前账户的价格表（每天 48 个半小时时段）。"""
+    account = require_account(current_user)
+    return _current_table(db, account)
+
+
+@router.put("/current", response_model=TariffTable)
+def select_tariff(
+    body: TariffSelect,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> TariffTable:
+    """为当前账户切换电价方案；`schedule_id` 为空时恢复默认峰谷电价。"""
+    account = require_account(current_user)
+    return _select_schedule(db, account, body.schedule_id)
+
+
+# ---------------------------------------------------------------------------
+# 异步版本（settings.async_db_enabled 为 True 时挂载）
+# ---------------------------------------------------------------------------
+
+
+@async_router.get("/", response_model=List[TariffScheduleOut])
+async def list_schedules_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> List[TariffSchedule]:
+    """列出所有可选的电价方案。"""
+    return await db.run_sync(_list_schedules)
+
+
+@async_router.get("/current", response_model=TariffTable)
+async def get_current_tariff_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> TariffTable:
+    """当前账户的价格表（每天 48 个半小时时段）。"""
+    account = require_account(current_user)
+    return await db.run_sync(_current_table, account)
+
+
+@async_router.put("/current", response_model=TariffTable)
+async def select_tariff_async(
+    body: TariffSelect,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> TariffTable:
+    """为当前账户切换电价方案；`schedule_id` 为空时恢复默认峰谷电价。"""
+    account = require_account(current_user)
+    return await db.run_sync(_select_schedule, account, body.schedule_id)
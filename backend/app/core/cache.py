@@ -0,0 +1,99 @@
+"""进程内缓存工具：带 TTL 的有界 LRU 缓存。"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """线程安全的 TTL + LRU 缓存。
+
+    - 超过 `maxsize` 时淘汰最久未使用的条目；
+    - 每个条目都有过期时间，过期后视为未命中并被移除；
+    - 记录命中 / 未命中 / 淘汰次数，便于观察缓存效果；
+    - `on_remove(key, value)` 在条目因淘汰或过期被移除时调用（在锁外调用），
+      调用方可据此清理自己维护的关联数据；`pop` / `clear` 不触发。
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: float, on_remove: Optional[Callable[[Hashable, V], None]] = None
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize 必须大于 0")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_remove = on_remove
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """读取缓存，未命中或已过期时返回 None。"""
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+            self.misses += 1
+        if self.on_remove is not None:
+            self.on_remove(key, value)
+        return None
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        """写入缓存；`ttl` 可覆盖默认过期时间（秒）。"""
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        evicted: List[Tuple[Hashable, V]] = []
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                old_key, (_, old_value) = self._data.popitem(last=False)
+                evicted.append((old_key, old_value))
+                self.evictions += 1
+        if self.on_remove is not None:
+            for old_key, old_value in evicted:
+                self.on_remove(old_key, old_value)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """移除并返回指定条目（不存在时返回 None）。"""
+
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        """清空缓存（计数器保留）。"""
+
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中率等统计信息。"""
+
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,228 @@
+"""密码哈希：可插拔的 KDF 实现与有界的哈希工作池。
+
+存储格式统一为 `<算法>$<参数>$<salt>$<hash>`，算法与参数随哈希一起保存，
+以后调整参数或更换算法时，旧哈希仍可校验，并在登录成功后自动升级。
+早期版本使用截断的 SHA-256（30 位十六进制，无前缀），仅用于校验。
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class PasswordHasher:
+    """哈希算法接口。"""
+
+    algorithm: str = ""
+
+    def hash(self, password: str) -> str:
+        raise NotImplementedError
+
+    def verify(self, password: str, encoded: str) -> bool:
+        raise NotImplementedError
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """参数与当前配置不一致时返回 True。"""
+
+        return True
+
+
+class ScryptHasher(PasswordHasher):
+    """基于 `hashlib.scrypt` 的内存困难型 KDF（默认）。"""
+
+    algorithm = "scrypt"
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, dklen: int = 32, salt_size: int = 16) -> None:
+        self.n, self.r, self.p, self.dklen, self.salt_size = n, r, p, dklen, salt_size
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode("utf-8"), salt=salt, n=n, r=r, p=p, dklen=dklen,
+            maxmem=128 * n * r * p + 1024 * 1024,
+        )
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(self.salt_size)
+        digest = self._derive(password, salt, self.n, self.r, self.p, self.dklen)
+        return f"scrypt$n={self.n},r={self.r},p={self.p}${_b64encode(salt)}${_b64encode(digest)}"
+
+    @staticmethod
+    def _parse(encoded: str):
+        _, params, salt, digest = encoded.split("$")
+        values = dict(item.split("=") for item in params.split(","))
+        return int(values["n"]), int(values["r"]), int(values["p"]), _b64decode(salt), _b64decode(digest)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        n, r, p, salt, digest = self._parse(encoded)
+        return hmac.compare_digest(self._derive(password, salt, n, r, p, len(digest)), digest)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        n, r, p, _, digest = self._parse(encoded)
+        return (n, r, p, len(digest)) != (self.n, self.r, self.p, self.dklen)
+
+
+class Pbkdf2Hasher(PasswordHasher):
+    """基于 `hashlib.pbkdf2_hmac` 的 PBKDF2-SHA256。"""
+
+    algorithm = "pbkdf2_sha256"
+
+    def __init__(self, iterations: int = 600_000, salt_size: int = 16) -> None:
+        self.iterations, self.salt_size = iterations, salt_size
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(self.salt_size)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, self.iterations)
+        return f"pbkdf2_sha256${self.iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, iterations, salt, digest = encoded.split("$")
+        expected = _b64decode(digest)
+        actual = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _b64decode(salt), int(iterations))
+        return hmac.compare_digest(actual, expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return int(encoded.split("$")[1]) != self.iterations
+
+
+class LegacySha256Hasher(PasswordHasher):
+    """旧版截断 SHA-256（30 位十六进制），只用于校验存量用户。"""
+
+    algorithm = "legacy_sha256"
+    _pattern = re.compile(r"^[0-9a-f]{30}$")
+
+    def matches(self, encoded: str) -> bool:
+        return bool(self._pattern.match(encoded))
+
+    def hash(self, password: str) -> str:
+        return hashlib.sha256(password.encode("utf-8")).hexdigest()[:30]
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(self.hash(password), encoded)
+
+
+_legacy = LegacySha256Hasher()
+
+
+class PasswordContext:
+    """根据存储格式选择算法：新哈希用 `default`，校验时按前缀识别。"""
+
+    def __init__(self, default: PasswordHasher, others: Optional[Dict[str, PasswordHasher]] = None) -> None:
+        self.default = default
+        self.hashers: Dict[str, PasswordHasher] = {default.algorithm: default, **(others or {})}
+        self._dummy: Optional[str] = None
+
+    def identify(self, encoded: str) -> Optional[PasswordHasher]:
+        if _legacy.matches(encoded):
+            return _legacy
+        return self.hashers.get(encoded.split("$", 1)[0])
+
+    def hash(self, password: str) -> str:
+        return self.default.hash(password)
+
+    @property
+    def dummy_hash(self) -> str:
+        """随机密码的哈希（默认算法与参数），首次使用时生成。"""
+
+        if self._dummy is None:
+            self._dummy = self.default.hash(os.urandom(16).hex())
+        return self._dummy
+
+    def verify(self, password: str, encoded: Optional[str]) -> bool:
+        """`encoded` 为 None（用户不存在）时照常校验一个假哈希并返回 False，
+        使响应耗时与用户存在时一致，不泄露用户名是否注册。"""
+
+        if encoded is None:
+            self.verify(password, self.dummy_hash)
+            return False
+        hasher = self.identify(encoded)
+        if hasher is None:
+            return False
+        try:
+            return hasher.verify(password, encoded)
+        except (ValueError, KeyError):
+            return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        hasher = self.identify(encoded)
+        return hasher is not self.default or hasher.needs_rehash(encoded)
+
+
+class HashingBusyError(RuntimeError):
+    """哈希工作池排队已满（登录风暴），调用方应返回 503。"""
+
+
+class PasswordHashPool:
+    """有界的哈希工作池。
+
+    慢哈希在独立的线程 / 进程池中执行（`hashlib.scrypt` / `pbkdf2_hmac`
+    计算期间会释放 GIL），并通过信号量限制"执行中 + 排队"的总数，
+    超出时立即失败，避免登录风暴占满 Starlette 线程池、拖慢仪表盘请求。
+    """
+
+    def __init__(self, context: PasswordContext, workers: int, queue_limit: int, use_processes: bool = False) -> None:
+        self.context = context
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self._use_processes:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+            return self._executor
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError("登录请求过多，请稍后重试")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        return self._submit(self.context.hash, password).result()
+
+    def verify(self, password: str, encoded: Optional[str]) -> bool:
+        return self._submit(self.context.verify, password, encoded).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(self.context.hash, password))
+
+    async def verify_async(self, password: str, encoded: Optional[str]) -> bool:
+        return await asyncio.wrap_future(self._submit(self.context.verify, password, encoded))
+
+    def warm_up(self) -> None:
+        """预先生成假哈希（启动时调用），第一次不存在用户的登录不会多算一次哈希。
+
+        进程池模式下假哈希随 `context` 一起传给工作进程。
+        """
+
+        self.context.dummy_hash
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -1,12 +1,14 @@
 """安全相关工具函数：密码哈希与 JWT。"""
 
 from datetime import datetime, timedelta, timezone
-import hashlib
+import os
+import uuid
 from typing import Any, Dict
 
 from jose import JWTError, jwt
 
 from app.core.config import settings
+from app.core.passwords import PasswordContext, PasswordHashPool, Pbkdf2Hasher, ScryptHasher
 
 MAX_PASSWORD_LENGTH = 30
 
@@ -19,28 +21,48 @@ def _ensure_length(password: str) -> str:
     return password
 
 
-def _digest(password: str) -> str:
-    """对密码进行 SHA-256 哈希，并截取前 30 个字符用于存储。"""
+def _build_context() -> PasswordContext:
+    """根据配置构造哈希上下文：默认算法用于新哈希，其余算法仅用于校验。"""
 
-    sha_hex = hashlib.sha256(password.encode("utf-8")).hexdigest()
-    return sha_hex[:MAX_PASSWORD_LENGTH]
+    hashers = {
+        ScryptHasher.algorithm: ScryptHasher(
+            n=settings.scrypt_n, r=settings.scrypt_r, p=settings.scrypt_p
+        ),
+        Pbkdf2Hasher.algorithm: Pbkdf2Hasher(iterations=settings.pbkdf2_iterations),
+    }
+    if settings.password_hasher not in hashers:
+        raise ValueError(f"未知的密码哈希算法: {settings.password_hasher}")
+    return PasswordContext(hashers[settings.password_hasher], hashers)
+
+
+pwd_context = _build_context()
+
+password_pool = PasswordHashPool(
+    pwd_context,
+    workers=settings.password_hash_workers or os.cpu_count() or 1,
+    queue_limit=settings.password_hash_queue_limit,
+    use_processes=settings.password_hash_use_processes,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """校验明文密码与哈希值是否匹配。"""
+    """校验明文密码与哈希值是否匹配（同步执行，热路径请使用 `password_pool`）。"""
 
-    try:
-        expected = get_password_hash(plain_password)
-    except ValueError:
+    if len(plain_password) > MAX_PASSWORD_LENGTH:
         return False
-    return expected == hashed_password
+    return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """生成密码哈希（最终长度不超过 30 个字符）。"""
+    """生成密码哈希（同步执行，热路径请使用 `password_pool`）。"""
+
+    return pwd_context.hash(_ensure_length(password))
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """旧格式或参数过期的哈希需要在登录成功后重新生成。"""
 
-    normalized = _ensure_length(password)
-    return _digest(normalized)
+    return pwd_context.needs_rehash(hashed_password)
 
 
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
@@ -49,7 +71,8 @@ def create_access_token(subject: str, expires_delta: timedelta | None = None) ->
     expire = datetime.now(timezone.utc) + (
         expires_delta or timedelta(minutes=settings.access_token_expire_minutes)
     )
-    to_encode: Dict[str, Any] = {"sub": subject, "exp": expire}
+    # jti 用于服务端注销（见 app.services.token_denylist）
+    to_encode: Dict[str, Any] = {"sub": subject, "exp": expire, "jti": uuid.uuid4().hex}
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.jwt_algorithm)
 
 
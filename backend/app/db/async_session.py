@@ -0,0 +1,79 @@
+"""异步数据库引擎与会话（可选）。
+
+通过 `ASYNC_DB_ENABLED=true` 开启后，路由改用 `async def` 处理函数，
+数据库 IO 不再占用 Starlette 线程池。同步代码复用通过
+`AsyncSession.run_sync` 完成，因此业务逻辑只维护一份。
+"""
+
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Callable, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.db.pool_stats import PoolStats
+from app.db.session import SessionLocal, build_pool_kwargs, configure_engine
+
+T = TypeVar("T")
+
+# 同步驱动 -> 异步驱动
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+
+def to_async_url(database_url: str) -> str:
+    """把同步连接串转换为对应的异步驱动连接串。"""
+
+    scheme, sep, rest = database_url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    """惰性创建异步引擎，未开启异步模式时不会导入异步驱动。"""
+
+    url = settings.async_database_url or to_async_url(settings.database_url)
+    stats = PoolStats("async")
+    async_engine = create_async_engine(url, echo=False, **build_pool_kwargs(url, stats, async_engine=True))
+    configure_engine(async_engine.sync_engine, url, stats)
+    return async_engine
+
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    # expire_on_commit=False：提交后仍可在 await 之外安全读取属性
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI 依赖项：提供一个异步数据库会话。"""
+
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def run_in_session(fn: Callable[..., T], *args: Any) -> T:
+    """在一个短生命周期会话中执行 `fn(db, *args)`。
+
+    用于 SSE / WebSocket 等长连接：只在需要时借用连接，不在整个连接期间持有会话。
+    按 `async_db_enabled` 选择 AsyncSession.run_sync 或线程池中的同步会话。
+    """
+
+    if settings.async_db_enabled:
+        async with get_async_sessionmaker()() as db:
+            return await db.run_sync(fn, *args)
+
+    def _call() -> T:
+        db = SessionLocal()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(_call)
@@ -1,7 +1,14 @@
 """SQLAlchemy Base 定义。"""
 
+from sqlalchemy import BIGINT
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
 
+@compiles(BIGINT, "sqlite")
+def _compile_bigint_sqlite(type_, compiler, **kw) -> str:
+    """SQLite 只有 INTEGER PRIMARY KEY 才会自增，BIGINT 主键在 SQLite 下按 INTEGER 建表。"""
+
+    return "INTEGER"
@@ -0,0 +1,136 @@
+"""连接池遥测：统计签出次数、溢出连接、等待时间与连接存活时长。
+
+`timed_pool_class()` 为每个引擎生成一个带统计对象的 QueuePool 子类，
+在 `_do_get` 外层计时，从而得到真实的"等待连接"耗时；其余指标通过
+SQLAlchemy 连接池事件采集。
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolStats:
+    """单个连接池的累计统计。"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        # 连接记录 id -> 建立时间（monotonic）
+        self._born: Dict[int, float] = {}
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+            self._born[id(connection_record)] = time.monotonic()
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def on_close(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self._born.pop(id(connection_record), None)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+            self._born.pop(id(connection_record), None)
+
+    def snapshot(self, pool: Optional[Pool] = None) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - born for born in self._born.values()]
+            data: Dict[str, Any] = {
+                "name": self.name,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "wait_count": self.wait_count,
+                "wait_avg_ms": round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "timeouts": self.timeouts,
+                "live_connections": len(ages),
+                "connection_age_avg_s": round(sum(ages) / len(ages), 1) if ages else 0.0,
+                "connection_age_max_s": round(max(ages), 1) if ages else 0.0,
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                pool_class=type(pool).__name__,
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        elif pool is not None:
+            data["pool_class"] = type(pool).__name__
+        return data
+
+
+class _TimedPoolMixin:
+    """在获取连接外层计时；`stats` 由 `timed_pool_class` 注入为类属性。"""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def timed_pool_class(stats: PoolStats, async_engine: bool = False) -> Type[QueuePool]:
+    """生成绑定了 `stats` 的连接池类（`engine.dispose()` 重建连接池时统计不丢失）。"""
+
+    base = AsyncAdaptedQueuePool if async_engine else QueuePool
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"stats": stats})
+
+
+_registry: Dict[str, "tuple[PoolStats, Engine]"] = {}
+
+
+def instrument_engine(engine: Engine, stats: PoolStats) -> None:
+    """注册连接池事件，并登记到全局表供内部接口读取。"""
+
+    event.listen(engine, "connect", stats.on_connect)
+    event.listen(engine, "checkout", stats.on_checkout)
+    event.listen(engine, "checkin", stats.on_checkin)
+    event.listen(engine, "close", stats.on_close)
+    event.listen(engine, "invalidate", stats.on_invalidate)
+    _registry[stats.name] = (stats, engine)
+
+
+def pool_report() -> Dict[str, Any]:
+    """返回所有已登记引擎的连接池统计。"""
+
+    return {name: stats.snapshot(engine.pool) for name, (stats, engine) in _registry.items()}
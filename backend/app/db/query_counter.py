@@ -0,0 +1,115 @@
+"""SQL 查询计数：用于约束每个请求的查询次数。
+
+用法：
+- 代码 / 测试中：`with count_queries() as counter: ...`，或
+  `with assert_max_queries(2): ...` 超出上限时抛出 AssertionError；
+- HTTP 层：开启 `settings.query_count_header` 后，每个响应都会带上
+  `X-Query-Count` 头，测试可以直接对该头做断言。
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 每个计数器最多保留的语句文本条数（只用于断言失败时的提示，计数不受影响）
+MAX_RECORDED_STATEMENTS = 50
+
+
+class QueryCounter:
+    """记录当前上下文中执行过的 SQL 语句数量。"""
+
+    def __init__(self, parent: Optional["QueryCounter"] = None) -> None:
+        self.parent = parent
+        self.count = 0
+        self.statements: List[str] = []
+
+    def record(self, statement: str) -> None:
+        counter: Optional[QueryCounter] = self
+        while counter is not None:
+            counter.count += 1
+            if len(counter.statements) < MAX_RECORDED_STATEMENTS:
+                counter.statements.append(statement)
+            counter = counter.parent
+
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """在上下文内统计 SQL 执行次数，支持嵌套。"""
+
+    counter = QueryCounter(parent=_current_counter.get())
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryCounter]:
+    """断言上下文内的查询次数不超过 `limit`。"""
+
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        omitted = counter.count - len(counter.statements)
+        raise AssertionError(
+            f"执行了 {counter.count} 条 SQL，超过上限 {limit}：\n" + "\n".join(counter.statements)
+            + (f"\n……（另有 {omitted} 条未记录）" if omitted else "")
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.record(statement)
+
+
+def install_query_counter(engine: Engine) -> None:
+    """在引擎上注册计数钩子（重复调用是安全的）。"""
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+class QueryCountMiddleware:
+    """ASGI 中间件：统计每个请求的 SQL 数量。
+
+    `header` 为真时写入 `X-Query-Count` 响应头；`limit` 不为空时，
+    超出上限的请求会记录一条告警日志。
+    """
+
+    def __init__(self, app, header: bool = True, limit: Optional[int] = None) -> None:
+        self.app = app
+        self.header = header
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+
+            async def send_with_count(message) -> None:
+                if self.header and message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(counter.count).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
+
+        if self.limit is not None and counter.count > self.limit:
+            logger.warning(
+                "%s %s 执行了 %d 条 SQL（上限 %d）",
+                scope.get("method"), scope.get("path"), counter.count, self.limit,
+            )
@@ -3,11 +3,13 @@
 from pathlib import Path
 from typing import Generator, Optional, Dict, Any
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.core.config import settings
+from app.db.pool_stats import PoolStats, instrument_engine, timed_pool_class
+from app.db.query_counter import install_query_counter
 
 
 def _build_connect_args(database_url: str) -> Optional[Dict[str, Any]]:
@@ -19,18 +21,61 @@ def _build_connect_args(database_url: str) -> Optional[Dict[str, Any]]:
     return None
 
 
+def _is_sqlite_memory(database_url: str) -> bool:
+    return database_url.startswith("sqlite") and (
+        database_url.rstrip("/").endswith(":") or ":memory:" in database_url or "mode=memory" in database_url
+    )
+
+
+def build_pool_kwargs(database_url: str, stats: PoolStats, async_engine: bool = False) -> Dict[str, Any]:
+    """根据配置档生成连接池参数；内存 SQLite 沿用 SQLAlchemy 默认的单连接池。"""
+
+    if _is_sqlite_memory(database_url):
+        return {}
+    return {**settings.engine_options(), "poolclass": timed_pool_class(stats, async_engine)}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """每个新连接建立时设置 SQLite PRAGMA（WAL 让读请求不再被写事务阻塞）。"""
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.close()
+
+
+def configure_engine(engine: Engine, database_url: str, stats: PoolStats) -> None:
+    """为引擎注册 SQLite PRAGMA、连接池遥测与查询计数钩子。"""
+
+    if database_url.startswith("sqlite"):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine, stats)
+    install_query_counter(engine)
+
+
+_pool_stats = PoolStats("sync")
+
 engine: Engine = create_engine(
     settings.database_url,
     echo=False,
     future=True,
     connect_args=_build_connect_args(settings.database_url) or {},
+    **build_pool_kwargs(settings.database_url, _pool_stats),
 )
 
+configure_engine(engine, settings.database_url, _pool_stats)
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
 def get_db() -> Generator[Session, None, None]:
-    """FastAPI 依赖项：提供一个数据库会话，并在请求结束时自动关闭。"""
+    """FastAPI 依赖项：提供一个数据库会话，并在请求结束时自动关闭。
+
+    FastAPI 会在同一请求内缓存依赖结果，因此认证依赖与路由函数共享
+    同一个会话（同一个连接池连接）。
+    """
 
     db = SessionLocal()
     try:
@@ -1,18 +1,64 @@
 """FastAPI 入口文件。"""
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.endpoints import appliances as appliances_router
 from app.api.endpoints import auth as auth_router
+from app.api.endpoints import chat as chat_router
 from app.api.endpoints import dashboard as dashboard_router
+from app.api.endpoints import ingest as ingest_router
+from app.api.endpoints import internal as internal_router
+from app.api.endpoints import tariffs as tariffs_router
 from app.core.config import settings
+from app.core.security import password_pool
 from app.db.base import Base
-from app.db.session import engine
+from app.db.query_counter import QueryCountMiddleware
+from app.db.session import SessionLocal, engine
+from app.services.anomalies import detection_job
+from app.services.appliance_events import appliance_event_log
+from app.services.chat import chat_history_writer
+from app.services.forecasting import refit_job
+from app.services.live_state import live_state
+from app.services.scheduler import scheduler
+from app.services.simulator import SLOT_SECONDS, simulate_slot
+from app.services.token_denylist import token_denylist
+from app.services.weather import weather_service
 
 Base.metadata.create_all(bind=engine)
+weather_service.bind(SessionLocal)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动后台任务，退出时取消。"""
+
+    await asyncio.to_thread(password_pool.warm_up)
+    tasks = [
+        asyncio.create_task(
+            token_denylist.run_sync_loop(SessionLocal, settings.token_denylist_sync_seconds)
+        ),
+        asyncio.create_task(appliance_event_log.run(SessionLocal)),
+        asyncio.create_task(live_state.run_reconcile_loop(SessionLocal, settings.live_state_reconcile_seconds)),
+        asyncio.create_task(chat_history_writer.run(SessionLocal)),
+    ]
+    if settings.anomaly_interval_seconds:
+        scheduler.add_job("anomaly_detection", settings.anomaly_interval_seconds, detection_job)
+    if settings.forecast_refit_interval_seconds:
+        scheduler.add_job("forecast_refit", settings.forecast_refit_interval_seconds, refit_job)
+    if settings.simulator_enabled:
+        scheduler.add_job("simulator", SLOT_SECONDS, simulate_slot, delay=settings.simulator_delay_seconds)
+    if scheduler.jobs:
+        tasks.append(asyncio.create_task(scheduler.run(SessionLocal)))
+    yield
+    for task in tasks:
+        task.cancel()
 
-app = FastAPI(title=settings.project_name)
+
+app = FastAPI(title=settings.project_name, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,15 +66,42 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
     allow_credentials=True,
+    # 电器列表的分页 / 汇总信息在响应头中
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-On-Count", "X-On-Power-Kw"],
 )
 
-app.include_router(auth_router.router, prefix=f"{settings.api_prefix}/auth", tags=["auth"])
+if settings.query_count_header or settings.max_queries_per_request is not None:
+    app.add_middleware(
+        QueryCountMiddleware, header=settings.query_count_header, limit=settings.max_queries_per_request
+    )
+
+
+def _router(module):
+    """按配置选择同步或异步版本的路由。"""
+
+    return module.async_router if settings.async_db_enabled else module.router
+
+
+app.include_router(_router(auth_router), prefix=f"{settings.api_prefix}/auth", tags=["auth"])
+app.include_router(
+    _router(appliances_router), prefix=f"{settings.api_prefix}/appliances", tags=["Appliances"]
+)
+app.include_router(
+    _router(dashboard_router), prefix=f"{settings.api_prefix}/data", tags=["Dashboard"]
+)
+app.include_router(
+    _router(ingest_router), prefix=f"{settings.api_prefix}/ingest", tags=["Ingest"]
+)
 app.include_router(
-    appliances_router.router, prefix=f"{settings.api_prefix}/appliances", tags=["Appliances"]
+    _router(tariffs_router), prefix=f"{settings.api_prefix}/tariffs", tags=["Tariffs"]
 )
 app.include_router(
-    dashboard_router.router, prefix=f"{settings.api_prefix}/data", tags=["Dashboard"]
+    _router(chat_router), prefix=f"{settings.api_prefix}/chat", tags=["Chat"]
 )
+if settings.internal_endpoints_enabled:
+    app.include_router(
+        internal_router.router, prefix=f"{settings.api_prefix}/internal", tags=["Internal"]
+    )
 
 
 @app.get("/healthz")
@@ -6,3 +6,13 @@ from .electricity_account import ElectricityAccount  # noqa: F401
 from .user import User  # noqa: F401
 
 
+from .revoked_token import RevokedToken  # noqa: F401
+from .consumption_rollup import ConsumptionDaily, ConsumptionDailySlots, ConsumptionHourly, ConsumptionMonthly  # noqa: F401
+from .consumption_anomaly import ConsumptionAnomaly  # noqa: F401
+from .tariff import TariffHoliday, TariffSchedule  # noqa: F401
+from .consumption_forecast import ConsumptionForecastModel  # noqa: F401
+from .scheduler_lease import SchedulerLease  # noqa: F401
+from .weather_data import WeatherData  # noqa: F401
+from .appliance_scene import ApplianceScene, ApplianceSceneAction  # noqa: F401
+from .appliance_event import ApplianceEvent  # noqa: F401
+from .chat_history import ChatHistory  # noqa: F401
@@ -3,7 +3,7 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import BIGINT,Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, String, func
+from sqlalchemy import BIGINT,Boolean, Column, DateTime, Enum, Float, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -24,6 +24,13 @@ class Appliance(Base):
     """对应 `appliances` 表的实体。"""
 
     __tablename__ = "appliances"
+    __table_args__ = (
+        # 与 db/schema.sql 保持一致：电器列表按 (account_id, id) 键集分页，筛选条件各有对应的复合索引
+        Index("idx_appliance_account_id", "account_id", "id"),
+        Index("idx_appliance_account_type", "account_id", "type", "id"),
+        Index("idx_appliance_account_on", "account_id", "is_on", "id"),
+        Index("idx_account_name", "account_id", "name"),
+    )
 
     id = Column(BIGINT, primary_key=True, index=True)
     account_id = Column(BIGINT, ForeignKey("electricity_accounts.id"), nullable=False, comment="所属用电账户ID")
@@ -31,6 +38,11 @@ class Appliance(Base):
     type = Column(Enum(ApplianceType), nullable=False, comment="电器类型")
     is_on = Column(Boolean, default=False, comment="当前开关状态")
     power_rating_kw = Column(Float, default=0.0, comment="额定功率(kW)")
+    # 开机时长记账（由 app.services.simulator 维护）：本次开机时间，以及上次模拟器结算后已关机部分的累计秒数
+    on_since = Column(DateTime, nullable=True, comment="本次开机时间，关机时为空")
+    on_seconds = Column(Float, nullable=False, default=0.0, server_default="0", comment="未结算的已关机开机秒数")
+    # 乐观并发控制：每次开关状态变化加 1，控制请求可带 expected_version，不一致时返回 409
+    version = Column(Integer, nullable=False, default=0, server_default="0", comment="状态版本号")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
    # 注意：appliances 表通过 electricity_accounts 中间表关联到用户
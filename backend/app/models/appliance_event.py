@@ -0,0 +1,32 @@
+"""电器状态变化事件 ORM 模型（只追加）。"""
+
+from sqlalchemy import BIGINT, Boolean, Column, DateTime, DECIMAL, Index, Integer, String
+
+from app.db.base import Base
+
+
+class ApplianceEvent(Base):
+    """对应 `appliance_events` 表：每次开关一条，由 `app.services.appliance_events` 批量写入。
+
+    写入是异步的（先进本地暂存文件与内存缓冲），电器可能在事件落库前被删除，因此不加外键；
+    `event_id` 唯一，重放暂存文件时重复的事件会被忽略。
+    """
+
+    __tablename__ = "appliance_events"
+    __table_args__ = (
+        Index("idx_appliance_event_id", "event_id", unique=True),
+        Index("idx_appliance_event_time", "appliance_id", "occurred_at"),
+    )
+
+    id = Column(BIGINT, primary_key=True)
+    event_id = Column(String(32), nullable=False, comment="事件ID (生成时分配，用于重放去重)")
+    appliance_id = Column(BIGINT, nullable=False, comment="电器ID")
+    account_id = Column(BIGINT, nullable=False, comment="所属用电账户ID")
+    occurred_at = Column(DateTime, nullable=False, comment="状态变化时间")
+    is_on = Column(Boolean, nullable=False, comment="变化后的开关状态")
+    power_kw = Column(DECIMAL(10, 3), nullable=False, comment="变化时的额定功率 (kW)，用于能耗归因")
+    version = Column(Integer, comment="变化后的电器状态版本号")
+    source = Column(String(16), nullable=False, comment="来源: control / batch / scene")
+
+    def __repr__(self) -> str:
+        return f"<ApplianceEvent appliance_id={self.appliance_id} occurred_at={self.occurred_at} is_on={self.is_on}>"
@@ -0,0 +1,42 @@
+"""电器场景 ORM 模型：保存的一组电器开关动作（如"离家模式"）。"""
+
+from sqlalchemy import BIGINT, Column, DateTime, ForeignKey, Index, String, func
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+
+class ApplianceScene(Base):
+    """对应 `appliance_scenes` 表：同一账户下场景名称唯一。"""
+
+    __tablename__ = "appliance_scenes"
+    __table_args__ = (Index("idx_scene_account_name", "account_id", "name", unique=True),)
+
+    id = Column(BIGINT, primary_key=True)
+    account_id = Column(BIGINT, ForeignKey("electricity_accounts.id"), nullable=False, comment="所属用电账户ID")
+    name = Column(String(50), nullable=False, comment="场景名称")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    actions = relationship(
+        "ApplianceSceneAction",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by="ApplianceSceneAction.id",
+    )
+
+    def __repr__(self) -> str:
+        return f"<ApplianceScene account_id={self.account_id} name={self.name}>"
+
+
+class ApplianceSceneAction(Base):
+    """对应 `appliance_scene_actions` 表：场景中的一个 (电器, 动作)。"""
+
+    __tablename__ = "appliance_scene_actions"
+
+    id = Column(BIGINT, primary_key=True)
+    scene_id = Column(BIGINT, ForeignKey("appliance_scenes.id", ondelete="CASCADE"), nullable=False, index=True)
+    appliance_id = Column(BIGINT, ForeignKey("appliances.id"), nullable=False, comment="电器ID")
+    action = Column(String(3), nullable=False, comment="动作: ON / OFF")
+
+    def __repr__(self) -> str:
+        return f"<ApplianceSceneAction appliance_id={self.appliance_id} action={self.action}>"
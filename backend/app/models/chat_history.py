@@ -0,0 +1,20 @@
+"""聊天记录 ORM 模型。"""
+
+from sqlalchemy import BIGINT, Column, DateTime, Enum, ForeignKey, Text, func
+
+from app.db.base import Base
+
+
+class ChatHistory(Base):
+    """对应 `chat_history` 表：每条消息一行，由 `app.services.chat` 在回复结束后批量写入。"""
+
+    __tablename__ = "chat_history"
+
+    id = Column(BIGINT, primary_key=True)
+    user_id = Column(BIGINT, ForeignKey("users.id"), nullable=False, index=True, comment="用户ID")
+    role = Column(Enum("user", "assistant", name="chat_role"), nullable=False, comment="消息发送方")
+    message = Column(Text, nullable=False, comment="聊天消息内容")
+    timestamp = Column(DateTime, server_default=func.now(), nullable=False, comment="消息时间")
+
+    def __repr__(self) -> str:
+        return f"<ChatHistory user_id={self.user_id} role={self.role} timestamp={self.timestamp}>"
@@ -0,0 +1,23 @@
+"""用电异常 ORM 模型：批量异常检测的结果。"""
+
+from sqlalchemy import BIGINT, Column, DateTime, DECIMAL, Float, ForeignKey, Index, func
+
+from app.db.base import Base
+
+
+class ConsumptionAnomaly(Base):
+    """对应 `consumption_anomalies` 表：每行是一个被判定为异常的 30 分钟时段。"""
+
+    __tablename__ = "consumption_anomalies"
+    __table_args__ = (Index("idx_anomaly_account_time", "account_id", "timestamp", unique=True),)
+
+    id = Column(BIGINT, primary_key=True)
+    account_id = Column(BIGINT, ForeignKey("electricity_accounts.id"), nullable=False, comment="关联的用电账户ID")
+    timestamp = Column(DateTime, nullable=False, comment="异常时段起点")
+    observed_kwh = Column(DECIMAL(10, 3), nullable=False, comment="实际用电量 (kWh)")
+    expected_kwh = Column(DECIMAL(10, 3), nullable=False, comment="基线用电量 (kWh)：同星期同时段的滚动中位数")
+    score = Column(Float, nullable=False, comment="稳健 z 分数：(实际 - 中位数) / (1.4826 * MAD)")
+    detected_at = Column(DateTime, server_default=func.now(), nullable=False, comment="检测时间")
+
+    def __repr__(self) -> str:
+        return f"<ConsumptionAnomaly account_id={self.account_id} timestamp={self.timestamp} score={self.score:.2f}>"
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import BIGINT, Column, DateTime, DECIMAL, ForeignKey, func
+from sqlalchemy import BIGINT, Column, DateTime, DECIMAL, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -12,6 +12,11 @@ class ConsumptionData(Base):
     """对应 `consumption_data` 表的实体。"""
 
     __tablename__ = "consumption_data"
+    __table_args__ = (
+        # 与 db/schema.sql 保持一致：趋势 / 汇总查询按账户 + 时间范围过滤；
+        # 同一账户同一时间点只保留一条，批量写入据此去重（重试幂等）
+        Index("idx_account_time", "account_id", "timestamp", unique=True),
+    )
 
     id = Column(BIGINT, primary_key=True, index=True)
     account_id = Column(BIGINT, ForeignKey("electricity_accounts.id"), nullable=False, comment="关联的用电账户ID")
@@ -0,0 +1,25 @@
+"""负荷预测模型 ORM：每个账户一行，保存拟合得到的系数数组。"""
+
+from sqlalchemy import BIGINT, Column, DateTime, ForeignKey, Integer, LargeBinary, String
+
+from app.db.base import Base
+
+
+class ConsumptionForecastModel(Base):
+    """对应 `consumption_forecast_models` 表：批量拟合任务写入，预测接口只读。
+
+    `coefficients` 为 float32 数组的原始字节（布局见 `app.services.forecasting`），
+    每个账户约 600 字节。
+    """
+
+    __tablename__ = "consumption_forecast_models"
+
+    account_id = Column(BIGINT, ForeignKey("electricity_accounts.id"), primary_key=True, comment="关联的用电账户ID")
+    model = Column(String(20), nullable=False, comment="模型类型")
+    coefficients = Column(LargeBinary, nullable=False, comment="模型系数（float32 字节）")
+    samples = Column(Integer, nullable=False, comment="参与拟合的 30 分钟时段数")
+    data_until = Column(DateTime, nullable=False, comment="训练数据截止时间")
+    fitted_at = Column(DateTime, nullable=False, comment="拟合时间")
+
+    def __repr__(self) -> str:
+        return f"<ConsumptionForecastModel account_id={self.account_id} fitted_at={self.fitted_at}>"
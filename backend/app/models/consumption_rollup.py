@@ -0,0 +1,55 @@
+"""用电量汇总（rollup）ORM 模型：按小时 / 天 / 月预聚合的 consumption_data。"""
+
+from sqlalchemy import BIGINT, Column, DateTime, DECIMAL, ForeignKey, Integer, LargeBinary, UniqueConstraint
+from sqlalchemy.orm import declared_attr
+
+from app.db.base import Base
+
+
+class _RollupMixin:
+    """三张汇总表结构相同，只是时间桶粒度不同。"""
+
+    id = Column(BIGINT, primary_key=True)
+    bucket_start = Column(DateTime, nullable=False, comment="时间桶起点")
+    total_kwh = Column(DECIMAL(14, 3), nullable=False, default=0, comment="桶内总耗电量 (kWh)")
+    samples = Column(Integer, nullable=False, default=0, comment="桶内原始记录条数")
+
+    @declared_attr
+    def account_id(cls):
+        return Column(BIGINT, ForeignKey("electricity_accounts.id"), nullable=False, comment="关联的用电账户ID")
+
+    @declared_attr
+    def __table_args__(cls):
+        return (UniqueConstraint("account_id", "bucket_start", name=f"uq_{cls.__tablename__}_account_bucket"),)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} account_id={self.account_id} bucket_start={self.bucket_start} total_kwh={self.total_kwh}>"
+
+
+class ConsumptionHourly(_RollupMixin, Base):
+    """对应 `consumption_hourly` 表。"""
+
+    __tablename__ = "consumption_hourly"
+
+
+class ConsumptionDaily(_RollupMixin, Base):
+    """对应 `consumption_daily` 表。"""
+
+    __tablename__ = "consumption_daily"
+
+
+class ConsumptionDailySlots(_RollupMixin, Base):
+    """对应 `consumption_daily_slots` 表：每天一行，保留当天 48 个 30 分钟时段的用电量，供分时计费使用。
+
+    `slot_kwh` 为 48 个 float64 的原始字节（384 字节），不依赖电价方案，方案变更后无需重算。
+    """
+
+    __tablename__ = "consumption_daily_slots"
+
+    slot_kwh = Column(LargeBinary, nullable=False, comment="当天 48 个 30 分钟时段的耗电量（float64 字节）")
+
+
+class ConsumptionMonthly(_RollupMixin, Base):
+    """对应 `consumption_monthly` 表。"""
+
+    __tablename__ = "consumption_monthly"
@@ -11,6 +11,8 @@ class ElectricityAccount(Base):
     account_number = Column(String(50), unique=True, comment="账户编号")
     peak_rate = Column(DECIMAL(10, 4), default=0.8, comment="峰值电价")
     valley_rate = Column(DECIMAL(10, 4), default=0.3, comment="谷值电价")
+    # 为空时按 peak_rate / valley_rate 与默认时段计费（见 app.services.tariffs）
+    tariff_schedule_id = Column(BIGINT, ForeignKey("tariff_schedules.id"), nullable=True, comment="分时电价方案ID")
 
     # 关系定义
     user = relationship("User", back_populates="electricity_account")
@@ -0,0 +1,21 @@
+"""已注销 Token ORM 模型。"""
+
+from sqlalchemy import BIGINT, Column, DateTime, ForeignKey, String, func
+
+from app.db.base import Base
+
+
+class RevokedToken(Base):
+    """对应 `revoked_tokens` 表：退出登录后仍在有效期内的 Token。"""
+
+    __tablename__ = "revoked_tokens"
+
+    id = Column(BIGINT, primary_key=True, index=True)
+    jti = Column(String(64), unique=True, nullable=False, comment="Token 唯一标识 (JWT jti)")
+    user_id = Column(BIGINT, ForeignKey("users.id"), nullable=True, comment="Token 所属用户ID")
+    expires_at = Column(DateTime, nullable=False, index=True, comment="Token 过期时间 (UTC)，过期后可清理")
+    # 各 worker 按注销时间增量同步
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken jti={self.jti} expires_at={self.expires_at}>"
@@ -0,0 +1,18 @@
+"""后台任务租约 ORM 模型。"""
+
+from sqlalchemy import Column, DateTime, String
+
+from app.db.base import Base
+
+
+class SchedulerLease(Base):
+    """对应 `scheduler_leases` 表：多个 worker 竞争同一租约，持有者负责执行后台定时任务。"""
+
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(64), primary_key=True, comment="租约名称")
+    holder = Column(String(128), nullable=False, comment="当前持有者 (主机名:进程号:随机串)")
+    expires_at = Column(DateTime, nullable=False, comment="租约到期时间，过期后其他 worker 可接管")
+
+    def __repr__(self) -> str:
+        return f"<SchedulerLease name={self.name} holder={self.holder} expires_at={self.expires_at}>"
@@ -0,0 +1,40 @@
+"""分时电价 ORM 模型：电价方案与节假日。"""
+
+from sqlalchemy import BIGINT, JSON, Column, Date, DateTime, DECIMAL, String, func
+
+from app.db.base import Base
+
+
+class TariffSchedule(Base):
+    """对应 `tariff_schedules` 表：峰 / 平 / 谷三档电价及其时段。
+
+    时段以 `{"peak": ["18:00-22:00"], "valley": ["00:00-07:00"]}` 形式存储，
+    未覆盖的时段按平段计费；`holiday_windows` 为空时节假日与工作日相同。
+    """
+
+    __tablename__ = "tariff_schedules"
+
+    id = Column(BIGINT, primary_key=True)
+    name = Column(String(100), unique=True, nullable=False, comment="方案名称")
+    peak_rate = Column(DECIMAL(10, 4), nullable=False, comment="峰段电价 (元/kWh)")
+    flat_rate = Column(DECIMAL(10, 4), nullable=False, comment="平段电价 (元/kWh)")
+    valley_rate = Column(DECIMAL(10, 4), nullable=False, comment="谷段电价 (元/kWh)")
+    weekday_windows = Column(JSON, nullable=False, comment="工作日峰 / 谷时段")
+    holiday_windows = Column(JSON, nullable=True, comment="周末及节假日峰 / 谷时段")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<TariffSchedule name={self.name}>"
+
+
+class TariffHoliday(Base):
+    """对应 `tariff_holidays` 表：按节假日时段计费的日期（周末无需登记）。"""
+
+    __tablename__ = "tariff_holidays"
+
+    id = Column(BIGINT, primary_key=True)
+    day = Column(Date, unique=True, nullable=False, comment="日期")
+    name = Column(String(50), nullable=True, comment="节日名称")
+
+    def __repr__(self) -> str:
+        return f"<TariffHoliday day={self.day} name={self.name}>"
@@ -15,7 +15,8 @@ class User(Base):
 
     id = Column(BIGINT, primary_key=True, index=True)
     username = Column(String(50), unique=True, nullable=False, index=True)
-    password = Column(String(30), nullable=False)
+    # 存储格式 `<算法>$<参数>$<salt>$<hash>`，旧版截断 SHA-256 为 30 位十六进制
+    password = Column(String(255), nullable=False)
     address = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(
@@ -0,0 +1,23 @@
+"""天气观测 ORM 模型。"""
+
+from sqlalchemy import BIGINT, Column, DateTime, DECIMAL, Index, String
+
+from app.db.base import Base
+
+
+class WeatherData(Base):
+    """对应 `weather_data` 表：按地区保存天气服务拉取到的观测数据。"""
+
+    __tablename__ = "weather_data"
+    __table_args__ = (Index("idx_weather_region_time", "region", "timestamp", unique=True),)
+
+    id = Column(BIGINT, primary_key=True)
+    region = Column(String(64), nullable=False, comment="地区 (由用户地址归一化，如: 杭州市)")
+    timestamp = Column(DateTime, nullable=False, comment="观测时间")
+    temperature_c = Column(DECIMAL(5, 2), comment="温度 (°C)")
+    condition = Column(String(50), comment="天气状况 (如: 晴, 多云)")
+    humidity = Column(DECIMAL(5, 2), comment="湿度 (%)")
+    fetched_at = Column(DateTime, nullable=False, comment="最近一次从数据源拉取到该观测的时间，用于判断是否过期")
+
+    def __repr__(self) -> str:
+        return f"<WeatherData region={self.region} timestamp={self.timestamp} temperature_c={self.temperature_c}>"
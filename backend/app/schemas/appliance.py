@@ -1,9 +1,9 @@
 """电器相关的 Pydantic 模型。"""
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class ApplianceCreate(BaseModel):
@@ -23,6 +23,7 @@ class ApplianceOut(BaseModel):
     type: str
     isOn: bool = Field(..., alias="is_on", description="电器开关状态")
     power_rating_kw: float
+    version: int = Field(0, description="状态版本号，控制时可作为 expected_version")
     created_at: datetime
 
     class Config:
@@ -30,10 +31,22 @@ class ApplianceOut(BaseModel):
         populate_by_name = True  # 允许使用原始字段名或别名
 
 
+def _normalize_action(value: str) -> str:
+    action = value.strip().upper()
+    if action not in ("ON", "OFF"):
+        raise ValueError("action 只能是 ON 或 OFF")
+    return action
+
+
 class ApplianceControl(BaseModel):
     """控制电器开关时的参数。"""
 
     action: str = Field(..., description="操作: ON 或 OFF")
+    expected_version: Optional[int] = Field(
+        None, ge=0, description="客户端看到的状态版本号；提供时若电器已被其他请求修改则返回 409"
+    )
+
+    _check_action = field_validator("action")(_normalize_action)
 
 
 class ControlResponse(BaseModel):
@@ -42,5 +55,111 @@ class ControlResponse(BaseModel):
     success: bool
     appliance_id: int
     new_status: bool
+    changed: bool = Field(True, description="状态是否发生变化（已处于目标状态时为 False，不写数据库）")
+    version: Optional[int] = Field(None, description="操作后的状态版本号")
     ai_message: str  # AI 的建议
 
+
+def _unique_appliances(actions: List["ApplianceAction"]) -> List["ApplianceAction"]:
+    ids = [item.appliance_id for item in actions]
+    if len(ids) != len(set(ids)):
+        raise ValueError("同一电器只能出现一次")
+    return actions
+
+
+class ApplianceAction(BaseModel):
+    """批量控制 / 场景中的一个动作。"""
+
+    appliance_id: int
+    action: str = Field(..., description="操作: ON 或 OFF")
+
+    _check_action = field_validator("action")(_normalize_action)
+
+    class Config:
+        from_attributes = True
+
+
+class BatchControl(BaseModel):
+    """批量控制参数：逐个指定动作，或用 `all_action` 对账户下全部电器执行同一动作。"""
+
+    actions: List[ApplianceAction] = Field(default_factory=list, max_length=500)
+    all_action: Optional[str] = Field(None, description="对全部电器执行: ON 或 OFF（与 actions 二选一）")
+
+    _check_actions = field_validator("actions")(_unique_appliances)
+
+    @field_validator("all_action")
+    @classmethod
+    def _check_all_action(cls, value: Optional[str]) -> Optional[str]:
+        return _normalize_action(value) if value is not None else None
+
+    @model_validator(mode="after")
+    def _one_of(self) -> "BatchControl":
+        if bool(self.actions) == (self.all_action is not None):
+            raise ValueError("actions 与 all_action 必须且只能提供一个")
+        return self
+
+
+class BatchItemResult(BaseModel):
+    """批量控制中单个电器的结果。"""
+
+    appliance_id: int
+    action: str
+    success: bool
+    changed: bool = Field(False, description="状态是否发生变化（已处于目标状态时为 False）")
+    new_status: Optional[bool] = None
+    error: Optional[str] = None
+
+
+class BatchControlResponse(BaseModel):
+    """批量控制 / 场景执行的结果。"""
+
+    success: bool = Field(..., description="全部电器均执行成功")
+    scene_id: Optional[int] = None
+    results: List[BatchItemResult]
+    changed_count: int
+    power_delta_kw: float = Field(..., description="总功率变化 (kW)，负数为减少")
+    total_power_now: float = Field(..., description="执行后的总功率 (kW)")
+    ai_message: str
+
+
+class SceneCreate(BaseModel):
+    """创建场景的参数。"""
+
+    name: str = Field(..., min_length=1, max_length=50, description="场景名称，如: 离家模式")
+    actions: List[ApplianceAction] = Field(..., min_length=1, max_length=500)
+
+    _check_actions = field_validator("actions")(_unique_appliances)
+
+
+class SceneOut(BaseModel):
+    """场景信息。"""
+
+    id: int
+    name: str
+    actions: List[ApplianceAction]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ApplianceEventOut(BaseModel):
+    """一次开关事件。"""
+
+    occurred_at: datetime
+    is_on: bool
+    power_kw: float
+    source: str = Field(..., description="来源: control / batch / scene")
+    version: Optional[int] = None
+
+
+class ApplianceHistory(BaseModel):
+    """电器在时间窗口内的开关记录与能耗归因。"""
+
+    appliance_id: int
+    start: datetime
+    end: datetime
+    on_seconds: float = Field(..., description="窗口内开机总时长（秒）")
+    energy_kwh: float = Field(..., description="窗口内耗电量（按事件记录的功率归因）")
+    switches: int = Field(..., description="窗口内的开关次数")
+    events: List[ApplianceEventOut] = Field(..., description="窗口内最近的事件（新的在前）")
@@ -0,0 +1,37 @@
+"""AI 对话相关的 Pydantic 模型。"""
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ChatMessage(BaseModel):
+    """上下文中的一条消息。"""
+
+    role: Literal["user", "assistant"]
+    content: str = Field(..., max_length=4000)
+
+
+class ChatRequest(BaseModel):
+    """对话请求。"""
+
+    message: str = Field(..., min_length=1, max_length=4000, description="用户消息")
+    history: List[ChatMessage] = Field(default_factory=list, max_length=50, description="可选，附带的上下文")
+    stream: bool = Field(True, description="是否以 SSE 逐 token 返回；为 False 时返回完整 JSON")
+
+
+class ChatMetrics(BaseModel):
+    """单次回复的性能指标。"""
+
+    status: str = Field(..., description="completed / cancelled / timeout / failed")
+    tokens: int
+    ttft_ms: Optional[float] = Field(None, description="首 token 延迟（毫秒）")
+    tokens_per_second: Optional[float] = Field(None, description="首 token 之后的生成速率")
+    duration_ms: float
+
+
+class ChatReply(BaseModel):
+    """非流式对话响应。"""
+
+    reply: str
+    metrics: ChatMetrics
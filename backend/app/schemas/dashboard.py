@@ -1,7 +1,7 @@
 """仪表盘相关的 Pydantic 模型。"""
 
 from datetime import datetime
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -10,7 +10,9 @@ class DashboardSummary(BaseModel):
     """今日概览（KPI Cards）响应模型。"""
 
     total_power_now: float = Field(..., description="当前总功率 (kW)")
-    daily_cost_estimate: float = Field(..., description="今日预计电费 (元)")
+    daily_cost_estimate: float = Field(..., description="今日预计电费 (元)：已产生电费 + 按当前功率估算的剩余时段")
+    today_cost: float = Field(..., description="今日已产生电费 (元)")
+    month_cost: float = Field(..., description="本月累计电费 (元)")
     month_usage_kwh: float = Field(..., description="本月累计用电 (kWh)")
     active_appliances_count: int = Field(..., description="开启的电器数量")
 
@@ -28,6 +30,28 @@ class ConsumptionTrend(BaseModel):
     data: List[ChartDataPoint] = Field(..., description="用电趋势数据点列表")
 
 
+class ForecastPoint(BaseModel):
+    """预测数据点（一个 30 分钟时段）。"""
+
+    time: datetime = Field(..., description="时段起点")
+    kwh: float = Field(..., description="预测用电量 (kWh)")
+    low: float = Field(..., description="预测区间下限 (kWh)")
+    high: float = Field(..., description="预测区间上限 (kWh)")
+
+
+class ConsumptionForecast(BaseModel):
+    """未来用电预测响应模型。"""
+
+    points: List[ForecastPoint] = Field(..., description="逐时段预测")
+    total_kwh: float = Field(..., description="预测总用电量 (kWh)")
+    expected_cost: float = Field(..., description="按分时电价计算的预计电费 (元)")
+    model: str = Field(..., description="模型类型；账户还没有模型时为 projection（按当前功率恒定运行）")
+    fitted_at: Optional[datetime] = Field(None, description="模型拟合时间")
+    data_until: Optional[datetime] = Field(None, description="训练数据截止时间")
+    age_seconds: Optional[float] = Field(None, description="模型已使用的时间 (秒)")
+    stale: bool = Field(..., description="模型是否超过 FORECAST_MAX_AGE_SECONDS 未重新拟合")
+
+
 class ConsumptionFactor(BaseModel):
     """用电影响因素项。"""
 
@@ -49,6 +73,8 @@ class Weather(BaseModel):
     temperatureC: float = Field(..., description="温度 (°C)")
     condition: str = Field(..., description="天气状况")
     humidity: float = Field(..., description="湿度 (%)")
+    region: Optional[str] = Field(None, description="地区（由用户地址识别）")
+    observedAt: Optional[datetime] = Field(None, description="观测时间")
 
 
 class ElectricityRate(BaseModel):
@@ -56,4 +82,15 @@ class ElectricityRate(BaseModel):
 
     rate: Literal["peak", "normal", "valley"] = Field(..., description="电价类型")
     rateText: str = Field(..., description="电价文本描述")
+    price: float = Field(..., description="当前单价 (元/kWh)")
+
+
+
+class DashboardSnapshot(BaseModel):
+    """首页快照：一次请求返回多个组件的数据，未请求的部分为 null。"""
 
+    summary: Optional[DashboardSummary] = Field(None, description="今日概览")
+    trend: Optional[ConsumptionTrend] = Field(None, description="用电趋势")
+    factors: Optional[ConsumptionFactors] = Field(None, description="用电影响因素")
+    weather: Optional[Weather] = Field(None, description="天气数据")
+    electricity_rate: Optional[ElectricityRate] = Field(None, description="当前电价状态")
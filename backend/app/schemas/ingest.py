@@ -0,0 +1,31 @@
+"""用电数据批量写入相关的 Pydantic 模型。"""
+
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class RejectedRow(BaseModel):
+    """被拒绝的一行数据。"""
+
+    index: int = Field(..., description="该行在请求中的序号（从 0 开始）")
+    reason: str = Field(..., description="拒绝原因")
+
+
+class IngestBatchStat(BaseModel):
+    """一个写入批次（一个事务）的统计。"""
+
+    rows: int = Field(..., description="本批写入行数")
+    seconds: float = Field(..., description="本批耗时（秒）")
+    rows_per_sec: float = Field(..., description="本批写入速率（行/秒）")
+
+
+class IngestResult(BaseModel):
+    """批量写入结果。"""
+
+    received: int = Field(0, description="收到的行数")
+    written: int = Field(0, description="写入（新增或覆盖）的行数")
+    duplicates: int = Field(0, description="请求内重复的行数（同一账户同一时间点只保留最后一条）")
+    rejected: int = Field(0, description="被拒绝的行数")
+    rejected_rows: List[RejectedRow] = Field(default_factory=list, description="被拒绝的行（最多列出前 100 条）")
+    batches: List[IngestBatchStat] = Field(default_factory=list, description="各批次统计")
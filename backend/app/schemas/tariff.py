@@ -0,0 +1,80 @@
+"""分时电价相关的 Pydantic 模型。"""
+
+import re
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+_WINDOW_PATTERN = re.compile(r"^(\d{2}):(\d{2})-(\d{2}):(\d{2})$")
+
+TariffPeriod = Literal["peak", "flat", "valley"]
+
+
+def parse_window(window: str) -> tuple[int, int]:
+    """`"HH:MM-HH:MM"` -> (起始时段, 结束时段)，时段为半小时序号（0~48）。
+
+    结束早于起始表示跨零点（如 `22:00-06:00`）。
+    """
+
+    match = _WINDOW_PATTERN.match(window)
+    if not match:
+        raise ValueError(f"时段格式应为 HH:MM-HH:MM: {window}")
+    start_h, start_m, end_h, end_m = (int(part) for part in match.groups())
+    if start_m not in (0, 30) or end_m not in (0, 30):
+        raise ValueError(f"时段必须以半小时为单位: {window}")
+    start, end = start_h * 2 + start_m // 30, end_h * 2 + end_m // 30
+    if start > 47 or end > 48 or start == end:
+        raise ValueError(f"时段无效: {window}")
+    return start, end
+
+
+class TariffWindows(BaseModel):
+    """一类日期（工作日 / 节假日）的峰谷时段，其余为平段。"""
+
+    peak: List[str] = Field(default_factory=list, description="峰段，如 18:00-22:00")
+    valley: List[str] = Field(default_factory=list, description="谷段，如 00:00-07:00")
+
+    @field_validator("peak", "valley")
+    @classmethod
+    def _check_windows(cls, windows: List[str]) -> List[str]:
+        for window in windows:
+            parse_window(window)
+        return windows
+
+
+class TariffScheduleCreate(BaseModel):
+    """创建电价方案的参数。"""
+
+    name: str = Field(..., min_length=1, max_length=100, description="方案名称")
+    peak_rate: float = Field(..., ge=0, description="峰段电价 (元/kWh)")
+    flat_rate: float = Field(..., ge=0, description="平段电价 (元/kWh)")
+    valley_rate: float = Field(..., ge=0, description="谷段电价 (元/kWh)")
+    weekday_windows: TariffWindows
+    holiday_windows: Optional[TariffWindows] = Field(None, description="周末及节假日时段，为空时同工作日")
+
+
+class TariffScheduleOut(TariffScheduleCreate):
+    """电价方案。"""
+
+    id: int
+
+    class Config:
+        from_attributes = True
+
+
+class TariffSelect(BaseModel):
+    """为当前账户选择电价方案。"""
+
+    schedule_id: Optional[int] = Field(None, description="方案ID，为空时恢复默认峰谷电价")
+
+
+class TariffTable(BaseModel):
+    """编译后的价格表：每天 48 个半小时时段。"""
+
+    schedule_id: Optional[int] = Field(None, description="方案ID，默认方案为空")
+    name: str
+    workday: List[float] = Field(..., description="工作日各时段电价 (元/kWh)")
+    holiday: List[float] = Field(..., description="周末及节假日各时段电价 (元/kWh)")
+    workday_periods: List[TariffPeriod]
+    holiday_periods: List[TariffPeriod]
+    rates: Dict[TariffPeriod, float]
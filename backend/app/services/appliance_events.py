@@ -0,0 +1,410 @@
+"""电器事件日志：开关事件先写本地、后批量落库（write-behind）。
+
+- 开关提交后调用 `appliance_event_log.record`：事件追加一行 JSON 到本进程的暂存文件
+  （`APPLIANCE_EVENT_SPOOL_DIR`，只是本地追加写，不访问数据库），再放入内存环形缓冲，请求随即返回；
+- 缓冲达到 `appliance_event_batch_size` 条，或距上次落库超过 `appliance_event_flush_seconds` 秒时，
+  后台任务以多行 INSERT 把缓冲中的事件写入 `appliance_events`，成功后删除对应的暂存分段；
+- 暂存分段按每次启动随机生成的 `boot_id` 命名，进程存活期间持有同名 `.lock` 文件的独占锁；
+  崩溃后锁由操作系统释放，任何 worker 启动时都会接管并重放锁未被持有的分段（与 PID 无关，
+  容器内以相同 PID 重启也不会误认成自己的分段；`event_id` 唯一，重复写入被忽略）；
+  落库失败的分段留在磁盘上，下次落库时重试；
+- 缓冲写满时改为从暂存分段读取本批事件，不丢失；未配置暂存目录时丢弃最旧的事件并计数；
+- `usage_between` 按事件序列计算电器在时间窗口内的开机时长与耗电量（按事件记录的功率归因）。
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import IO, Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.appliance_event import ApplianceEvent
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_PATTERN = "events-*-*.spool"
+_LOCK_PATTERN = "events-*.lock"
+
+
+def _insert_ignore_statement(dialect_name: str):
+    """多行 INSERT，`event_id` 已存在时跳过（重放暂存文件是幂等的）。"""
+
+    table = ApplianceEvent.__table__
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+
+        return insert(table).on_conflict_do_nothing(index_elements=["event_id"])
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        return insert(table).on_conflict_do_nothing(index_elements=["event_id"])
+    if dialect_name in ("mysql", "mariadb"):
+        from sqlalchemy import insert
+
+        return insert(table).prefix_with("IGNORE")
+    raise NotImplementedError(f"不支持的数据库方言: {dialect_name}")
+
+
+def _encode(event: Dict[str, Any]) -> str:
+    return json.dumps({**event, "occurred_at": event["occurred_at"].isoformat()}, ensure_ascii=False)
+
+
+def _decode(line: str) -> Dict[str, Any]:
+    event = json.loads(line)
+    event["occurred_at"] = datetime.fromisoformat(event["occurred_at"])
+    return event
+
+
+def _read_segment(path: str) -> List[Dict[str, Any]]:
+    """读取暂存分段；崩溃时写了一半的最后一行会被跳过。"""
+
+    events = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                events.append(_decode(line))
+            except (ValueError, KeyError):
+                logger.warning("跳过损坏的电器事件暂存行: %s", path)
+    return events
+
+
+def _try_lock(path: str) -> Optional[IO[str]]:
+    """非阻塞地获取 `path` 的独占锁，成功时返回需保持打开的文件句柄；锁在进程退出（包括崩溃）时释放。"""
+
+    handle = open(path, "a", encoding="utf-8")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:  # pragma: no cover - Windows
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def _segment_order(path: str) -> Tuple[str, int]:
+    """`events-{boot_id}-{seq}.spool` -> (boot_id, seq)；不符合命名的文件抛出 ValueError。"""
+
+    boot_id, seq = os.path.basename(path)[len("events-"):-len(".spool")].rsplit("-", 1)
+    return boot_id, int(seq)
+
+
+class ApplianceEventLog:
+    """进程内的事件缓冲与暂存文件；`run` 在后台按条数 / 时间触发落库。"""
+
+    def __init__(
+        self,
+        spool_dir: Optional[str],
+        buffer_size: int,
+        batch_size: int,
+        flush_interval: float,
+        fsync: bool = False,
+    ) -> None:
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._overflowed = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._spool = None
+        self._spool_path: Optional[str] = None
+        self._segment = 0
+        self.boot_id = uuid.uuid4().hex[:12]  # 本次启动的分段前缀
+        self._owner_lock: Optional[IO[str]] = None  # 本进程分段的锁，存活期间一直持有
+        self._adopted: Dict[str, IO[str]] = {}  # 已接管的崩溃进程分段的锁（boot_id -> 句柄）
+        self._retry: List[str] = []  # 待重放的暂存分段（落库失败或其他进程遗留）
+        self._wakeup: Optional[Callable[[], None]] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.failures = 0
+        self.last_flush_seconds = 0.0
+        self.max_batch = 0
+
+    # -- 记录 ----------------------------------------------------------------
+
+    def _lock_path(self, boot_id: str) -> str:
+        return os.path.join(self.spool_dir, f"events-{boot_id}.lock")
+
+    def _open_segment(self) -> None:
+        os.makedirs(self.spool_dir, exist_ok=True)
+        if self._owner_lock is None:  # 先持有锁再创建分段，其他 worker 不会把它当成遗留分段
+            self._owner_lock = _try_lock(self._lock_path(self.boot_id))
+        self._segment += 1
+        self._spool_path = os.path.join(self.spool_dir, f"events-{self.boot_id}-{self._segment}.spool")
+        self._spool = open(self._spool_path, "a", encoding="utf-8")
+
+    def record(
+        self,
+        appliance_id: int,
+        account_id: int,
+        is_on: bool,
+        power_kw: float,
+        source: str,
+        version: Optional[int] = None,
+        occurred_at: Optional[datetime] = None,
+    ) -> None:
+        """记录一次状态变化（在事务提交之后调用）；只做本地写入，不访问数据库。"""
+
+        event = {
+            "event_id": uuid.uuid4().hex,
+            "appliance_id": appliance_id,
+            "account_id": account_id,
+            "occurred_at": occurred_at or datetime.now(),
+            "is_on": is_on,
+            "power_kw": round(float(power_kw), 3),
+            "version": version,
+            "source": source,
+        }
+        with self._lock:
+            if self.spool_dir:
+                if self._spool is None:
+                    self._open_segment()
+                self._spool.write(_encode(event) + "\n")
+                self._spool.flush()
+                if self.fsync:
+                    os.fsync(self._spool.fileno())
+            if len(self._buffer) == self._buffer.maxlen:
+                if self.spool_dir:
+                    self._overflowed = True  # 本批改为从暂存分段读取
+                else:
+                    self.dropped += 1
+            self._buffer.append(event)
+            self.recorded += 1
+            full = len(self._buffer) >= self.batch_size
+        if full and self._wakeup is not None:
+            self._wakeup()
+
+    def pending(self, appliance_id: int) -> List[Dict[str, Any]]:
+        """本进程尚未落库的该电器事件（查询接口合并使用，保证刚写入的事件可见）。"""
+
+        with self._lock:
+            return [event for event in self._buffer if event["appliance_id"] == appliance_id]
+
+    # -- 落库 ----------------------------------------------------------------
+
+    def _take(self) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """取出当前缓冲并切换到新的暂存分段，返回 (事件, 对应分段路径)。"""
+
+        with self._lock:
+            events = list(self._buffer)
+            self._buffer.clear()
+            overflowed, self._overflowed = self._overflowed, False
+            segment = self._spool_path
+            if self._spool is not None:
+                self._spool.close()
+                self._spool, self._spool_path = None, None
+        if overflowed and segment:
+            events = _read_segment(segment)
+        return events, segment
+
+    def _write(self, session_factory: Callable[[], Session], events: Sequence[Dict[str, Any]]) -> None:
+        db = session_factory()
+        try:
+            statement = _insert_ignore_statement(db.get_bind().dialect.name)
+            for start in range(0, len(events), self.batch_size):
+                db.execute(statement, list(events[start:start + self.batch_size]))
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # 其他 worker 已重放并删除
+            pass
+
+    def flush(self, session_factory: Callable[[], Session]) -> int:
+        """把缓冲与待重放分段中的事件写入数据库，返回写入的事件数。"""
+
+        with self._flush_lock:
+            written = 0
+            for path in list(self._retry):
+                try:
+                    events = _read_segment(path) if os.path.exists(path) else []
+                    if events:
+                        self._write(session_factory, events)
+                except Exception:
+                    self.failures += 1
+                    logger.exception("重放电器事件暂存分段失败: %s", path)
+                    return written
+                self._retry.remove(path)
+                self._remove(path)
+                self.replayed += len(events)
+                written += len(events)
+            self._release_adopted()
+
+            events, segment = self._take()
+            if events:
+                started = time.perf_counter()
+                try:
+                    self._write(session_factory, events)
+                except Exception:
+                    self.failures += 1
+                    logger.exception("电器事件落库失败（%d 条）", len(events))
+                    if segment:
+                        self._retry.append(segment)
+                    else:
+                        with self._lock:  # 没有暂存文件：放回缓冲，超出容量的最旧事件被丢弃
+                            room = self._buffer.maxlen - len(self._buffer)
+                            self.dropped += max(len(events) - room, 0)
+                            self._buffer.extendleft(reversed(events[-room:] if room else []))
+                    return written
+                self.last_flush_seconds = time.perf_counter() - started
+                self.flushes += 1
+                self.flushed += len(events)
+                self.max_batch = max(self.max_batch, len(events))
+                written += len(events)
+            if segment:
+                self._remove(segment)
+            return written
+
+    def replay(self, session_factory: Callable[[], Session]) -> int:
+        """接管并重放锁未被持有（所属进程已退出）的暂存分段（启动时调用）。"""
+
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return 0
+        segments: Dict[str, List[str]] = {}
+        for path in glob.glob(os.path.join(self.spool_dir, _SEGMENT_PATTERN)):
+            try:
+                boot_id, _ = _segment_order(path)
+            except ValueError:
+                continue
+            segments.setdefault(boot_id, []).append(path)
+        for path in glob.glob(os.path.join(self.spool_dir, _LOCK_PATTERN)):
+            segments.setdefault(os.path.basename(path)[len("events-"):-len(".lock")], [])
+
+        for boot_id, paths in segments.items():
+            if boot_id == self.boot_id:
+                continue
+            if boot_id not in self._adopted:
+                handle = _try_lock(self._lock_path(boot_id))
+                if handle is None:  # 所属进程仍在运行
+                    continue
+                self._adopted[boot_id] = handle
+            self._retry.extend(path for path in sorted(paths, key=_segment_order) if path not in self._retry)
+        return self.flush(session_factory)
+
+    def _release_adopted(self) -> None:
+        """已接管的分段全部落库后释放并删除对应的锁文件。"""
+
+        for boot_id in list(self._adopted):
+            if any(_segment_order(path)[0] == boot_id for path in self._retry):
+                continue
+            self._adopted.pop(boot_id).close()
+            self._remove(self._lock_path(boot_id))
+
+    def close(self) -> None:
+        """进程退出前调用：没有待重放的本进程分段时释放并删除本进程的锁文件。"""
+
+        with self._lock:
+            if self._spool is not None or self._owner_lock is None:
+                return
+            if any(_segment_order(path)[0] == self.boot_id for path in self._retry):
+                return
+            self._owner_lock.close()
+            self._owner_lock = None
+        self._remove(self._lock_path(self.boot_id))
+
+    async def run(self, session_factory: Callable[[], Session]) -> None:
+        """后台落库循环（在 FastAPI lifespan 中启动，取消时把剩余事件落库）。"""
+
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def _wakeup() -> None:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:  # pragma: no cover - 事件循环已关闭
+                pass
+
+        self._wakeup = _wakeup
+        try:
+            await asyncio.to_thread(self.replay, session_factory)
+            while True:
+                try:
+                    await asyncio.wait_for(wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+                await asyncio.to_thread(self.flush, session_factory)
+        finally:
+            self._wakeup = None
+            self.flush(session_factory)
+            self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "spool_dir": self.spool_dir,
+            "boot_id": self.boot_id,
+            "buffered": len(self._buffer),
+            "capacity": self._buffer.maxlen,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "retry_segments": len(self._retry),
+            "max_batch": self.max_batch,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+        }
+
+
+def usage_between(
+    events: Sequence[Tuple[datetime, bool, float]],
+    initial: Optional[Tuple[bool, float]],
+    start: datetime,
+    end: datetime,
+) -> Tuple[float, float]:
+    """按时间排序的事件 `(时间, 开关状态, 功率)` 计算 `[start, end)` 内的 (开机秒数, 耗电 kWh)。
+
+    `initial` 为窗口开始前最后一个事件的 (状态, 功率)；没有时视为关机。
+    """
+
+    is_on, power = initial or (False, 0.0)
+    cursor = start
+    on_seconds = kwh = 0.0
+    for occurred_at, next_on, next_power in events:
+        occurred_at = min(max(occurred_at, start), end)
+        if is_on:
+            seconds = (occurred_at - cursor).total_seconds()
+            on_seconds += seconds
+            kwh += power * seconds / 3600
+        is_on, power, cursor = next_on, next_power, occurred_at
+    if is_on:
+        seconds = (end - cursor).total_seconds()
+        on_seconds += seconds
+        kwh += power * seconds / 3600
+    return on_seconds, kwh
+
+
+appliance_event_log = ApplianceEventLog(
+    spool_dir=settings.appliance_event_spool_dir,
+    buffer_size=settings.appliance_event_buffer_size,
+    batch_size=settings.appliance_event_batch_size,
+    flush_interval=settings.appliance_event_flush_seconds,
+    fsync=settings.appliance_event_spool_fsync,
+)
@@ -0,0 +1,386 @@
+"""AI 用电顾问：可插拔的模型后端 + 异步生成器流水线 + 聊天记录批量写入。
+
+- 模型后端由 `CHAT_BACKEND` 选择：`stub`（本地确定性回复，按关键词与账户实时状态生成，不访问网络，
+  用于开发 / 测试），或 `包名.模块:类名` 指向实现了 `ChatBackend.stream` 的类；
+- 流水线由三段异步生成器组成：后端逐个产出 token -> `_metered` 计时（首 token 延迟、生成速率）并限制
+  单个 token 的等待时间 -> `sse` 编码为 SSE 事件。各段都是按需拉取的，客户端读得慢时
+  StreamingResponse 的发送会等待，上游也随之暂停，中间没有无界队列；
+- 客户端断开时（发送失败、任务被取消，或两个 token 之间检测到断开）关闭后端生成器，停止生成；
+- 回复结束（含中途断开）后，用户消息与回复交给 `chat_history_writer`，与其他请求的记录合并为多行 INSERT 写入
+  `chat_history`，请求不等待数据库；
+- 每次回复的指标在 `done` 事件中返回，最近的分位数见 `/api/internal/chat`。
+"""
+
+import asyncio
+import importlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.chat_history import ChatHistory
+from app.schemas.chat import ChatMetrics, ChatRequest
+from app.services.live_events import sse_message
+
+logger = logging.getLogger(__name__)
+
+# 汉字逐字，其余按连续的字母数字 / 空白 / 单个符号切分
+_TOKEN_PATTERN = re.compile(r"[一-鿿]|[A-Za-z0-9.]+|\s+|.")
+_PERIOD_NAMES = {"peak": "峰时", "flat": "平时", "valley": "谷时"}
+
+
+# ---------------------------------------------------------------------------
+# 模型后端
+# ---------------------------------------------------------------------------
+
+
+class ChatBackend:
+    """模型后端接口：按消息列表（含 system 上下文）异步产出回复的 token。"""
+
+    name = "base"
+
+    def stream(self, messages: List[Dict[str, str]], context: Dict[str, Any]) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class StubChatBackend(ChatBackend):
+    """本地模拟后端：同样的问题与账户状态总是得到同样的回复，按 token 间隔输出。"""
+
+    name = "stub"
+
+    def __init__(self, token_delay: Optional[float] = None) -> None:
+        self.token_delay = settings.chat_stub_token_delay_seconds if token_delay is None else token_delay
+
+    @staticmethod
+    def reply(message: str, context: Dict[str, Any]) -> str:
+        if not context:
+            return "您好！绑定用电账户后，我可以结合您家的实时用电情况回答电费、节能与电器使用方面的问题。"
+        power, active = context["on_power"], context["active_count"]
+        period = _PERIOD_NAMES.get(context.get("period"), "当前")
+        if "贵" in message or "电费" in message:
+            return (
+                f"现在是{period}电价时段，家中有 {active} 台电器在运行，总功率 {power:.2f} kW。"
+                "电费偏高通常来自峰时段的大功率电器，建议把洗衣、热水等可以延后的用电安排到谷时段。"
+            )
+        if "空调" in message or "暖气" in message or "热水器" in message:
+            running = "有" if context["climate_on"] else "没有"
+            return (
+                f"目前{running}空调或热水器在运行。空调每调高 1°C 大约可以节省 6% 的用电，"
+                "热水器可以设置在谷时段加热，峰时段保温。"
+            )
+        if "省电" in message or "节能" in message or "建议" in message:
+            return (
+                f"当前总功率 {power:.2f} kW，处于{period}电价时段。三条建议：出门前一键关闭不用的电器；"
+                "峰时段避免同时开启多台大功率电器；长期待机的电视与充电器可以断电。"
+            )
+        return (
+            f"您好！家中现在有 {active} 台电器在运行，总功率 {power:.2f} kW，处于{period}电价时段。"
+            "您可以问我电费为什么高、怎样更省电，或者某台电器的使用建议。"
+        )
+
+    async def stream(self, messages: List[Dict[str, str]], context: Dict[str, Any]) -> AsyncIterator[str]:
+        for token in _TOKEN_PATTERN.findall(self.reply(messages[-1]["content"], context)):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
+
+
+_BACKENDS: Dict[str, Callable[[], ChatBackend]] = {"stub": StubChatBackend}
+
+
+def load_backend(spec: str) -> ChatBackend:
+    """按名称（`stub`）或 `包名.模块:类名` 创建模型后端。"""
+
+    if spec in _BACKENDS:
+        return _BACKENDS[spec]()
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"未知的对话模型后端: {spec}")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+# ---------------------------------------------------------------------------
+# 聊天记录批量写入
+# ---------------------------------------------------------------------------
+
+
+class ChatHistoryWriter:
+    """进程内缓冲聊天记录，按条数或时间以多行 INSERT 写入 `chat_history`。"""
+
+    def __init__(self, batch_size: int, flush_interval: float, max_buffered: int) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max_buffered)
+        self._lock = threading.Lock()
+        self._wakeup: Optional[Callable[[], None]] = None
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def submit(self, rows: List[Dict[str, Any]]) -> None:
+        """加入缓冲（不访问数据库）；缓冲已满时丢弃最旧的记录并计数。"""
+
+        with self._lock:
+            self.dropped += max(len(self._buffer) + len(rows) - self._buffer.maxlen, 0)
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.batch_size
+        if full and self._wakeup is not None:
+            self._wakeup()
+
+    def flush(self, session_factory: Callable[[], Session]) -> int:
+        with self._lock:
+            rows = list(self._buffer)
+            self._buffer.clear()
+        if not rows:
+            return 0
+        db = session_factory()
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                db.execute(insert(ChatHistory), rows[start:start + self.batch_size])
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.failures += 1
+            logger.exception("聊天记录写入失败（%d 条），稍后重试", len(rows))
+            with self._lock:  # 放回缓冲头部，超出容量的最旧记录被丢弃
+                room = self._buffer.maxlen - len(self._buffer)
+                self.dropped += max(len(rows) - room, 0)
+                self._buffer.extendleft(reversed(rows[-room:] if room else []))
+            return 0
+        finally:
+            db.close()
+        self.flushes += 1
+        self.written += len(rows)
+        return len(rows)
+
+    async def run(self, session_factory: Callable[[], Session]) -> None:
+        """后台写入循环（在 FastAPI lifespan 中启动，取消时写入剩余记录）。"""
+
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def _wakeup() -> None:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:  # pragma: no cover - 事件循环已关闭
+                pass
+
+        self._wakeup = _wakeup
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+                await asyncio.to_thread(self.flush, session_factory)
+        finally:
+            self._wakeup = None
+            self.flush(session_factory)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+# ---------------------------------------------------------------------------
+# 流水线
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class StreamMetrics:
+    """单次回复的计时。"""
+
+    started: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+    tokens: int = 0
+    status: str = "streaming"
+
+    def token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self, status: Optional[str] = None) -> None:
+        """结束计时；未给出状态且尚未结束时视为客户端断开。"""
+
+        if self.finished is not None:
+            return
+        self.status = status or "cancelled"
+        self.finished = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if self.first_token is None or self.finished is None or self.tokens < 2:
+            return None
+        elapsed = self.finished - self.first_token
+        return (self.tokens - 1) / elapsed if elapsed > 0 else None
+
+    def as_model(self) -> ChatMetrics:
+        end = self.finished or time.perf_counter()
+        return ChatMetrics(
+            status=self.status,
+            tokens=self.tokens,
+            ttft_ms=round(self.ttft * 1000, 2) if self.ttft is not None else None,
+            tokens_per_second=round(self.tokens_per_second, 1) if self.tokens_per_second else None,
+            duration_ms=round((end - self.started) * 1000, 2),
+        )
+
+
+class ChatService:
+    """组装上下文、驱动模型后端，并汇总每次回复的指标。"""
+
+    def __init__(
+        self, backend: ChatBackend, writer: ChatHistoryWriter, token_timeout: float, max_history: int
+    ) -> None:
+        self.backend = backend
+        self.writer = writer
+        self.token_timeout = token_timeout
+        self.max_history = max_history
+        self._ttft: Deque[float] = deque(maxlen=1000)
+        self._rates: Deque[float] = deque(maxlen=1000)
+        self.counts: Dict[str, int] = {}
+
+    def messages(self, request: ChatRequest, context: Dict[str, Any]) -> List[Dict[str, str]]:
+        """system 上下文 + 最近的历史 + 本次消息。"""
+
+        system = "你是家庭用电顾问，根据用户的实时用电情况给出简洁、可执行的建议。"
+        if context:
+            system += f"当前用电情况：{context}"
+        history = request.history[-self.max_history:] if self.max_history else []
+        history = [{"role": item.role, "content": item.content} for item in history]
+        return [{"role": "system", "content": system}, *history, {"role": "user", "content": request.message}]
+
+    async def _metered(
+        self, messages: List[Dict[str, str]], context: Dict[str, Any], metrics: StreamMetrics
+    ) -> AsyncIterator[str]:
+        """逐个拉取后端 token：记录首 token 时间与数量，单个 token 超过 `token_timeout` 秒视为超时。"""
+
+        tokens = self.backend.stream(messages, context)
+        try:
+            while True:
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), self.token_timeout)
+                except StopAsyncIteration:
+                    return
+                metrics.token()
+                yield token
+        finally:
+            await tokens.aclose()
+
+    def _record(self, user_id: int, message: str, reply: str, received_at: datetime, metrics: StreamMetrics) -> None:
+        """回复结束后：汇总指标，并把本轮对话交给批量写入（中途断开时保存已生成的部分）。"""
+
+        self.counts[metrics.status] = self.counts.get(metrics.status, 0) + 1
+        if metrics.ttft is not None:
+            self._ttft.append(metrics.ttft)
+        if metrics.tokens_per_second:
+            self._rates.append(metrics.tokens_per_second)
+        rows = [{"user_id": user_id, "role": "user", "message": message, "timestamp": received_at}]
+        if reply:
+            rows.append({"user_id": user_id, "role": "assistant", "message": reply, "timestamp": datetime.now()})
+        self.writer.submit(rows)
+
+    async def sse(
+        self,
+        user_id: int,
+        request: ChatRequest,
+        context: Dict[str, Any],
+        disconnected: Callable[[], Awaitable[bool]],
+    ) -> AsyncIterator[str]:
+        """SSE 事件流：`token`（逐个 token）-> `done`（指标）；超时或后端出错时为 `error`。"""
+
+        received_at = datetime.now()
+        metrics = StreamMetrics()
+        parts: List[str] = []
+        tokens = self._metered(self.messages(request, context), context, metrics)
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield sse_message("token", {"content": token})
+                if await disconnected():
+                    return  # finally 中记为 cancelled
+            metrics.finish("completed")
+            yield sse_message("done", {"metrics": metrics.as_model().model_dump()})
+        except asyncio.TimeoutError:
+            metrics.finish("timeout")
+            yield sse_message("error", {"detail": "模型响应超时，请稍后重试"})
+        except Exception:
+            metrics.finish("failed")
+            logger.exception("对话生成失败")
+            yield sse_message("error", {"detail": "AI 服务暂时不可用，请稍后重试"})
+        finally:
+            await tokens.aclose()
+            metrics.finish()
+            self._record(user_id, request.message, "".join(parts), received_at, metrics)
+
+    async def complete(self, user_id: int, request: ChatRequest, context: Dict[str, Any]) -> tuple[str, StreamMetrics]:
+        """非流式：收集全部 token 后返回（超时抛出 asyncio.TimeoutError）。"""
+
+        received_at = datetime.now()
+        metrics = StreamMetrics()
+        parts: List[str] = []
+        try:
+            async for token in self._metered(self.messages(request, context), context, metrics):
+                parts.append(token)
+            metrics.finish("completed")
+        except asyncio.TimeoutError:
+            metrics.finish("timeout")
+            raise
+        except Exception:
+            metrics.finish("failed")
+            raise
+        finally:
+            metrics.finish()
+            self._record(user_id, request.message, "".join(parts), received_at, metrics)
+        return "".join(parts), metrics
+
+    def stats(self) -> Dict[str, Any]:
+        ttft = np.array(self._ttft) * 1000
+        rates = np.array(self._rates)
+        return {
+            "backend": self.backend.name,
+            "requests": dict(self.counts),
+            "ttft_ms": {
+                "p50": round(float(np.percentile(ttft, 50)), 2),
+                "p95": round(float(np.percentile(ttft, 95)), 2),
+            }
+            if ttft.size
+            else None,
+            "tokens_per_second": {"avg": round(float(rates.mean()), 1)} if rates.size else None,
+            "history": self.writer.stats(),
+        }
+
+
+chat_history_writer = ChatHistoryWriter(
+    batch_size=settings.chat_history_batch_size,
+    flush_interval=settings.chat_history_flush_seconds,
+    max_buffered=settings.chat_history_max_buffered,
+)
+chat_service = ChatService(
+    load_backend(settings.chat_backend),
+    chat_history_writer,
+    token_timeout=settings.chat_token_timeout_seconds,
+    max_history=settings.chat_max_history_messages,
+)
@@ -0,0 +1,117 @@
+"""用电历史流式导出（CSV / NDJSON，可选 gzip）。
+
+查询使用服务端游标（`stream_results`）+ `yield_per` 按分片读取，
+每个分片格式化、（可选）压缩后立即发送，内存占用与导出时间范围无关。
+生成器自行打开数据库会话：响应体在路由返回之后才开始发送。
+"""
+
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.consumption_data import ConsumptionData
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+# 每次从游标读取的行数
+EXPORT_YIELD_PER = 2000
+_CSV_HEADER = "timestamp,total_kwh\n"
+
+
+def export_statement(account_id: int, start: datetime, end: datetime):
+    return (
+        select(ConsumptionData.timestamp, ConsumptionData.total_kwh)
+        .where(
+            ConsumptionData.account_id == account_id,
+            ConsumptionData.timestamp >= start,
+            ConsumptionData.timestamp < end,
+        )
+        .order_by(ConsumptionData.timestamp)
+        .execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER)
+    )
+
+
+def _format(rows: Sequence, fmt: str) -> str:
+    if fmt == "csv":
+        return "".join(f"{ts.isoformat(sep=' ')},{kwh}\n" for ts, kwh in rows)
+    return "".join(
+        json.dumps({"timestamp": ts.isoformat(), "total_kwh": float(kwh)}) + "\n" for ts, kwh in rows
+    )
+
+
+class _Encoder:
+    """文本 -> 字节，开启压缩时输出 gzip 流。"""
+
+    def __init__(self, compress: bool) -> None:
+        # wbits=31：带 gzip 头尾的 deflate 流
+        self._gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        return self._gzip.compress(data) if self._gzip else data
+
+    def finish(self) -> bytes:
+        return self._gzip.flush() if self._gzip else b""
+
+
+def iter_export(
+    session_factory: Callable[[], Session],
+    account_id: int,
+    start: datetime,
+    end: datetime,
+    fmt: str,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """同步生成器：逐分片产出导出内容。"""
+
+    encoder = _Encoder(compress)
+    db = session_factory()
+    try:
+        if fmt == "csv":
+            yield encoder.encode(_CSV_HEADER)
+        for partition in db.execute(export_statement(account_id, start, end)).partitions():
+            chunk = encoder.encode(_format(partition, fmt))
+            if chunk:
+                yield chunk
+        yield encoder.finish()
+    finally:
+        db.close()
+
+
+async def aiter_export(
+    session_factory: Callable[[], AsyncSession],
+    account_id: int,
+    start: datetime,
+    end: datetime,
+    fmt: str,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """异步生成器版本，使用 `AsyncSession.stream`。"""
+
+    encoder = _Encoder(compress)
+    async with session_factory() as db:
+        if fmt == "csv":
+            yield encoder.encode(_CSV_HEADER)
+        result = await db.stream(export_statement(account_id, start, end))
+        async for partition in result.partitions():
+            chunk = encoder.encode(_format(partition, fmt))
+            if chunk:
+                yield chunk
+        yield encoder.finish()
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """客户端是否接受 gzip（忽略 q=0）。"""
+
+    for item in (accept_encoding or "").lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip() in ("gzip", "*") and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return True
+    return False
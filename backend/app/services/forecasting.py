@@ -0,0 +1,332 @@
+"""账户级 24 小时负荷预测：季节性日曲线 + 指数平滑。
+
+模型（`seasonal_ewma`）对每个账户拟合：
+
+- `profile[2, 48]`：工作日 / 周末及节假日各 48 个半小时时段的典型用电量，
+  按天指数衰减加权平均（越近的日子权重越大，`forecast_smoothing` 为每天的衰减率）；
+- `sigma[48]`：各时段残差的加权标准差，用于给出预测区间；
+- `level`：最近 7 天实际用电 / 曲线预测的比值（0.5~2），反映近期整体水平的变化。
+
+系数合计 145 个 float32（约 600 字节），按行打包成 `[账户数, 145]` 的矩阵。
+拟合是纯 NumPy 的批量运算：主进程按批读取 `[账户, 天, 48]` 数据，交给进程池拟合，
+结果写入 `consumption_forecast_models`；预测接口从进程内缓存读取系数，只做一次查表。
+拟合只在后台定时任务中进行（租约持有者执行），没有可用模型的账户由调用方改用当前功率的恒定投影。
+"""
+
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.consumption_forecast import ConsumptionForecastModel
+from app.models.electricity_account import ElectricityAccount
+from app.services.anomalies import load_matrix
+from app.services.tariffs import (
+    SLOTS_PER_DAY,
+    CompiledTariff,
+    day_kinds,
+    floor_slot,
+    load_holidays,
+    slot_fractions,
+    slot_prices,
+)
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "seasonal_ewma"
+# 没有可用模型时的预测方式：当前开启的电器按额定功率持续运行
+PROJECTION_NAME = "projection"
+# 系数布局：[profile 工作日 48 | profile 节假日 48 | sigma 48 | level 1]
+_PROFILE = slice(0, 2 * SLOTS_PER_DAY)
+_SIGMA = slice(2 * SLOTS_PER_DAY, 3 * SLOTS_PER_DAY)
+_LEVEL = 3 * SLOTS_PER_DAY
+COEFFICIENTS = 3 * SLOTS_PER_DAY + 1
+# 计算近期水平的天数与比值范围
+_LEVEL_DAYS = 7
+_LEVEL_BOUNDS = (0.5, 2.0)
+# 预测区间：约 95%
+_INTERVAL_Z = 1.96
+
+
+def fit_matrix(values: np.ndarray, kinds: np.ndarray, smoothing: float) -> np.ndarray:
+    """批量拟合：`values[账户, 天, 48]`（缺失为 NaN），`kinds[天]` 为日期类型，返回 `[账户, 145]` 系数。
+
+    纯 NumPy 函数，不访问数据库，可在子进程中运行。
+    """
+
+    accounts, days, _ = values.shape
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    # 最后一天权重为 1，每往前一天乘以 (1 - smoothing)
+    weights = (1.0 - smoothing) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+    weighted = present * weights[None, :, None]
+
+    profile = np.empty((accounts, 2, SLOTS_PER_DAY))
+    support = np.empty((accounts, 2, SLOTS_PER_DAY))
+    for kind in (0, 1):
+        rows = kinds == kind
+        support[:, kind] = weighted[:, rows].sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            profile[:, kind] = (filled[:, rows] * weighted[:, rows]).sum(axis=1) / support[:, kind]
+
+    # 缺少某类日期的数据时借用另一类，仍为空的时段用账户整体均值，完全没有数据为 0
+    for kind in (0, 1):
+        missing = support[:, kind] == 0
+        profile[:, kind][missing] = profile[:, 1 - kind][missing]
+    with np.errstate(invalid="ignore"):
+        overall = filled.sum(axis=(1, 2)) / np.maximum(present.sum(axis=(1, 2)), 1)
+    profile = np.where(np.isnan(profile), overall[:, None, None], profile)
+
+    expected = profile[:, kinds]  # [账户, 天, 48]
+    residual = np.where(present, values - expected, 0.0)
+    total_weight = weighted.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma = np.sqrt((residual ** 2 * weighted).sum(axis=1) / total_weight)
+    sigma = np.nan_to_num(sigma)
+
+    recent = slice(max(days - _LEVEL_DAYS, 0), days)
+    actual = filled[:, recent].sum(axis=(1, 2))
+    predicted = np.where(present[:, recent], expected[:, recent], 0.0).sum(axis=(1, 2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        level = np.where(predicted > 0, actual / predicted, 1.0)
+    level = np.clip(level, *_LEVEL_BOUNDS)
+
+    coefficients = np.empty((accounts, COEFFICIENTS), dtype=np.float32)
+    coefficients[:, _PROFILE] = profile.reshape(accounts, -1)
+    coefficients[:, _SIGMA] = sigma
+    coefficients[:, _LEVEL] = level
+    return coefficients
+
+
+@dataclass(frozen=True)
+class ForecastModel:
+    """一个账户的模型系数与元数据。"""
+
+    account_id: int
+    coefficients: np.ndarray
+    samples: int
+    data_until: datetime
+    fitted_at: datetime
+
+    def age_seconds(self, now: datetime) -> float:
+        return (now - self.fitted_at).total_seconds()
+
+    def is_stale(self, now: datetime) -> bool:
+        return self.age_seconds(now) > settings.forecast_max_age_seconds
+
+    def usable(self, now: datetime) -> bool:
+        """有训练数据且未过期；否则调用方改用当前功率的恒定投影。"""
+
+        return self.samples > 0 and not self.is_stale(now)
+
+    def predict(
+        self, start: datetime, slots: int, holidays: FrozenSet[date]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """从 `start`（已对齐到 30 分钟）起 `slots` 个时段的 (预测值, 下限, 上限)，单位 kWh。"""
+
+        offset = (start.hour * 60 + start.minute) // 30
+        absolute = offset + np.arange(slots)
+        kinds = day_kinds(start.date(), int(absolute[-1]) // SLOTS_PER_DAY + 1, holidays)
+        slot = absolute % SLOTS_PER_DAY
+        profile = self.coefficients[_PROFILE].reshape(2, SLOTS_PER_DAY)
+        mean = profile[kinds[absolute // SLOTS_PER_DAY], slot] * self.coefficients[_LEVEL]
+        spread = _INTERVAL_Z * self.coefficients[_SIGMA][slot]
+        return mean, np.maximum(mean - spread, 0.0), mean + spread
+
+
+def _to_model(row: ConsumptionForecastModel) -> ForecastModel:
+    coefficients = np.frombuffer(row.coefficients, dtype=np.float32)
+    return ForecastModel(row.account_id, coefficients, row.samples, row.data_until, row.fitted_at)
+
+
+class ForecastStore:
+    """进程内的模型缓存；未命中时从 `consumption_forecast_models` 读取。
+
+    其他进程完成重新拟合后，本进程最多在 `forecast_cache_ttl_seconds` 后读到新系数。
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._models: TTLCache[ForecastModel] = TTLCache(maxsize, ttl)
+
+    def get(self, db: Session, account_id: int) -> Optional[ForecastModel]:
+        model = self._models.get(account_id)
+        if model is None:
+            row = db.get(ConsumptionForecastModel, account_id)
+            if row is None:
+                return None
+            model = _to_model(row)
+            self._models.set(account_id, model)
+        return model
+
+    def peek(self, account_id: int) -> Optional[ForecastModel]:
+        """只读缓存，不访问数据库。"""
+
+        return self._models.get(account_id)
+
+    def put_many(self, models: Sequence[ForecastModel]) -> None:
+        for model in models:
+            self._models.set(model.account_id, model)
+
+    def evict_many(self, account_ids: Iterable[int]) -> None:
+        """写入新的用电数据后丢弃这些账户的缓存系数，下次读取时重新加载。"""
+
+        for account_id in account_ids:
+            self._models.pop(account_id)
+
+    def stats(self) -> Dict[str, object]:
+        return self._models.stats()
+
+
+forecast_store = ForecastStore(settings.forecast_cache_max_entries, settings.forecast_cache_ttl_seconds)
+
+
+def training_window(now: datetime, history_days: int) -> Tuple[datetime, datetime]:
+    """训练窗口：截至今天零点的 `history_days` 个整天。"""
+
+    end = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return end - timedelta(days=history_days), end
+
+
+def _load_batch(
+    db: Session, account_ids: Sequence[int], start: datetime, end: datetime, days: int
+) -> np.ndarray:
+    return load_matrix(db, account_ids, start, end, days * SLOTS_PER_DAY).reshape(
+        len(account_ids), days, SLOTS_PER_DAY
+    )
+
+
+def _store_models(db: Session, models: Sequence[ForecastModel]) -> None:
+    """替换一批账户的模型（先删后插，一批一个事务）。"""
+
+    db.execute(
+        delete(ConsumptionForecastModel).where(
+            ConsumptionForecastModel.account_id.in_([model.account_id for model in models])
+        )
+    )
+    db.execute(
+        insert(ConsumptionForecastModel),
+        [
+            {
+                "account_id": model.account_id,
+                "model": MODEL_NAME,
+                "coefficients": model.coefficients.tobytes(),
+                "samples": model.samples,
+                "data_until": model.data_until,
+                "fitted_at": model.fitted_at,
+            }
+            for model in models
+        ],
+    )
+    db.commit()
+
+
+def _fit_batch(values: np.ndarray, kinds: np.ndarray, smoothing: float) -> Tuple[np.ndarray, np.ndarray]:
+    """进程池任务：返回 (系数, 每个账户的有效时段数)。"""
+
+    return fit_matrix(values, kinds, smoothing), (~np.isnan(values)).sum(axis=(1, 2))
+
+
+def _account_batches(db: Session, batch_size: int) -> Iterator[List[int]]:
+    account_ids: List[int] = list(db.execute(select(ElectricityAccount.id).order_by(ElectricityAccount.id)).scalars())
+    for index in range(0, len(account_ids), batch_size):
+        yield account_ids[index:index + batch_size]
+
+
+def fit_all_accounts(
+    db: Session,
+    now: Optional[datetime] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, object]:
+    """重新拟合所有账户，返回统计信息。
+
+    `workers > 0` 时拟合交给进程池：主进程读取下一批数据的同时，子进程拟合上一批。
+    """
+
+    now = now or datetime.now()
+    workers = settings.forecast_fit_workers if workers is None else workers
+    history_days = settings.forecast_history_days
+    start, end = training_window(now, history_days)
+    kinds = day_kinds(start.date(), history_days, load_holidays(db))
+    smoothing = settings.forecast_smoothing
+
+    executor: Optional[Executor] = (
+        ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) if workers > 0 else None
+    )
+    started = time.perf_counter()
+    fitted = skipped = 0
+    pending = []
+
+    def collect(batch: List[int], coefficients: np.ndarray, samples: np.ndarray) -> None:
+        nonlocal fitted, skipped
+        # 训练窗口内没有数据的账户不保存全 0 模型，继续使用功率投影
+        models = [
+            ForecastModel(account_id, row, int(count), end, now)
+            for account_id, row, count in zip(batch, coefficients, samples.tolist())
+            if count > 0
+        ]
+        skipped += len(batch) - len(models)
+        if models:
+            _store_models(db, models)
+            forecast_store.put_many(models)
+        fitted += len(models)
+
+    try:
+        for batch in _account_batches(db, settings.forecast_batch_accounts):
+            values = _load_batch(db, batch, start, end, history_days)
+            if executor is None:
+                collect(batch, *_fit_batch(values, kinds, smoothing))
+                continue
+            pending.append((batch, executor.submit(_fit_batch, values, kinds, smoothing)))
+            # 最多保留 workers 个在途批次，限制内存占用
+            while len(pending) > workers:
+                done_batch, future = pending.pop(0)
+                collect(done_batch, *future.result())
+        for done_batch, future in pending:
+            collect(done_batch, *future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "accounts": fitted,
+        "skipped_no_data": skipped,
+        "seconds": round(elapsed, 3),
+        "accounts_per_sec": round(fitted / elapsed, 1) if elapsed > 0 else float(fitted),
+        "data_until": end,
+    }
+
+
+def forecast_slots(now: datetime, hours: int) -> Tuple[datetime, int]:
+    """预测从当前所在的 30 分钟时段开始，共 `hours` 小时。"""
+
+    return floor_slot(now), hours * SLOTS_PER_DAY // 24
+
+
+def forecast_cost(
+    model: ForecastModel, tariff: CompiledTariff, start: datetime, end: datetime, holidays: FrozenSet[date]
+) -> float:
+    """按预测用电量计算 `[start, end)` 的电费；首尾不完整的时段按比例计。"""
+
+    if end <= start:
+        return 0.0
+    first, fractions = slot_fractions(start, end)
+    mean, _, _ = model.predict(first, fractions.size, holidays)
+    return float(np.dot(mean * fractions, slot_prices(tariff, first, fractions.size, holidays)))
+
+
+def refit_job(db: Session, boundary: datetime) -> Dict[str, Any]:
+    """定时任务：重新拟合所有账户（由 `app.services.scheduler` 在租约持有者上执行）。"""
+
+    stats = fit_all_accounts(db, now=boundary)
+    logger.info("负荷预测模型拟合完成: %s", stats)
+    return stats
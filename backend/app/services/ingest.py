@@ -0,0 +1,285 @@
+"""用电数据批量写入：向量化校验 + 分批 upsert。
+
+- 输入为 `(account_id, timestamp, total_kwh)` 记录（JSON 对象或三元数组），
+  先整体转成 numpy 数组，再用数组运算完成校验与去重，不逐行构造 ORM 对象；
+- 写入按 `ingest_chunk_rows` 分批，每批一个事务，使用方言自带的
+  `INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE` 多行写入；
+  `(account_id, timestamp)` 唯一，重试同一批数据是幂等的；
+- 每批提交前刷新受影响账户的汇总表（见 `app.services.rollups`）。
+"""
+
+import json
+import time
+import warnings
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.consumption_data import ConsumptionData
+from app.models.electricity_account import ElectricityAccount
+from app.schemas.ingest import IngestBatchStat, IngestResult, RejectedRow
+from app.services.forecasting import forecast_store
+from app.services.response_cache import response_cache
+from app.services.rollups import refresh_rollups
+
+# 响应中最多列出的拒绝行数
+MAX_LISTED_REJECTIONS = 100
+# 允许的时钟偏差：晚于当前时间超过该值的数据视为无效
+FUTURE_TOLERANCE = timedelta(minutes=5)
+# DECIMAL(10, 3) 的上限
+_KWH_LIMIT = 10_000_000
+# 单条 IN 查询的最大账户数
+_ACCOUNT_LOOKUP_CHUNK = 1000
+
+_REASONS = {
+    1: "account_id 缺失或无效",
+    2: "timestamp 缺失或无效",
+    3: "total_kwh 缺失或无效",
+    4: "total_kwh 不能为负数",
+    5: "total_kwh 超出范围",
+    6: "timestamp 晚于当前时间",
+    7: "用电账户不存在",
+    8: "记录格式错误",
+}
+
+
+class Malformed:
+    """无法解析的一行（NDJSON 中 JSON 语法错误的行）。"""
+
+    __slots__ = ()
+
+
+MALFORMED = Malformed()
+
+
+def parse_json_array(body: bytes) -> List[Any]:
+    """解析 JSON 数组请求体，格式错误时抛出 ValueError。"""
+
+    try:
+        data = json.loads(body)
+    except ValueError as exc:
+        raise ValueError("请求体不是合法的 JSON") from exc
+    if not isinstance(data, list):
+        raise ValueError("请求体必须是 JSON 数组")
+    return data
+
+
+def parse_ndjson_line(line: bytes | str) -> Optional[Any]:
+    """解析 NDJSON 的一行；空行返回 None，语法错误返回 `MALFORMED`。"""
+
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return MALFORMED
+
+
+def iter_ndjson_batches(lines: Iterable[bytes | str], size: int) -> Iterator[Tuple[int, List[Any]]]:
+    """把 NDJSON 行流切成 `(起始序号, 记录列表)` 批次。"""
+
+    batch: List[Any] = []
+    offset = 0
+    for line in lines:
+        record = parse_ndjson_line(line)
+        if record is None:
+            continue
+        batch.append(record)
+        if len(batch) >= size:
+            yield offset, batch
+            offset += len(batch)
+            batch = []
+    if batch:
+        yield offset, batch
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return np.nan
+    return float(value)
+
+
+def _columns(records: Sequence[Any]) -> Tuple[np.ndarray, List[Any], np.ndarray, np.ndarray]:
+    """拆成列：account_id / timestamp 原值 / total_kwh，以及"格式错误"掩码。"""
+
+    accounts, stamps, kwh = [], [], []
+    malformed = np.zeros(len(records), dtype=bool)
+    for position, record in enumerate(records):
+        if isinstance(record, dict):
+            values = (record.get("account_id"), record.get("timestamp"), record.get("total_kwh"))
+        elif isinstance(record, (list, tuple)) and len(record) == 3:
+            values = record
+        else:
+            values = (None, None, None)
+            malformed[position] = True
+        accounts.append(_number(values[0]))
+        stamps.append(values[1])
+        kwh.append(_number(values[2]))
+    return np.array(accounts, dtype=np.float64), stamps, np.array(kwh, dtype=np.float64), malformed
+
+
+def _local_naive(value: datetime) -> datetime:
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+
+def _parse_timestamps(raw: Sequence[Any]) -> np.ndarray:
+    """整列解析 ISO 时间字符串；含非法值或时区时逐个回退解析，失败为 NaT。"""
+
+    result = np.full(len(raw), np.datetime64("NaT"), dtype="datetime64[us]")
+    positions = [i for i, value in enumerate(raw) if isinstance(value, str)]
+    if not positions:
+        return result
+    strings = [raw[i] for i in positions]
+    try:
+        with warnings.catch_warnings():
+            # numpy 对带时区的字符串只给出警告并按 UTC 解析，这里改为逐个处理
+            warnings.simplefilter("error")
+            result[positions] = np.array(strings, dtype="datetime64[us]")
+        return result
+    except (ValueError, UserWarning, DeprecationWarning):
+        pass
+    for position, value in zip(positions, strings):
+        try:
+            result[position] = np.datetime64(_local_naive(datetime.fromisoformat(value)), "us")
+        except ValueError:
+            continue
+    return result
+
+
+def _existing_accounts(db: Session, candidates: np.ndarray) -> np.ndarray:
+    ids = np.unique(candidates).astype(np.int64).tolist()
+    found: List[int] = []
+    for index in range(0, len(ids), _ACCOUNT_LOOKUP_CHUNK):
+        chunk = ids[index:index + _ACCOUNT_LOOKUP_CHUNK]
+        found.extend(db.execute(select(ElectricityAccount.id).where(ElectricityAccount.id.in_(chunk))).scalars())
+    return np.array(found, dtype=np.float64)
+
+
+def validate_records(
+    db: Session, records: Sequence[Any], now: Optional[datetime] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """向量化校验，返回 (account_id, timestamp, total_kwh, 拒绝原因编码)；编码 0 表示通过。"""
+
+    accounts, raw_stamps, kwh, malformed = _columns(records)
+    stamps = _parse_timestamps(raw_stamps)
+    latest = np.datetime64((now or datetime.now()) + FUTURE_TOLERANCE, "us")
+
+    codes = np.zeros(len(records), dtype=np.int8)
+
+    def mark(mask: np.ndarray, code: int) -> None:
+        codes[(codes == 0) & mask] = code
+
+    with np.errstate(invalid="ignore"):
+        mark(malformed, 8)
+        mark(~np.isfinite(accounts) | (accounts <= 0) | (accounts != np.floor(accounts)), 1)
+        mark(np.isnat(stamps), 2)
+        mark(~np.isfinite(kwh), 3)
+        mark(kwh < 0, 4)
+        mark(kwh >= _KWH_LIMIT, 5)
+        mark(stamps > latest, 6)
+
+    candidates = accounts[codes == 0]
+    if candidates.size:
+        mark(~np.isin(accounts, _existing_accounts(db, candidates)), 7)
+    return accounts, stamps, kwh, codes
+
+
+def _dedupe(accounts: np.ndarray, stamps: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """同一 (account_id, timestamp) 只保留最后一条，返回保留行的下标（保持原顺序）。"""
+
+    reversed_rows = valid[::-1]
+    keys = np.empty(reversed_rows.size, dtype=[("account", "i8"), ("ts", "i8")])
+    keys["account"] = accounts[reversed_rows]
+    keys["ts"] = stamps[reversed_rows].astype(np.int64)
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(reversed_rows[first])
+
+
+def _upsert_statement(dialect_name: str):
+    table = ConsumptionData.__table__
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=["account_id", "timestamp"], set_={"total_kwh": stmt.excluded.total_kwh}
+        )
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=["account_id", "timestamp"], set_={"total_kwh": stmt.excluded.total_kwh}
+        )
+    if dialect_name in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(total_kwh=stmt.inserted.total_kwh)
+    raise NotImplementedError(f"不支持的数据库方言: {dialect_name}")
+
+
+def _write_chunk(db: Session, accounts: np.ndarray, stamps: np.ndarray, kwh: np.ndarray) -> None:
+    account_ids = accounts.astype(np.int64).tolist()
+    rows = [
+        {"account_id": account, "timestamp": stamp, "total_kwh": value}
+        for account, stamp, value in zip(account_ids, stamps.tolist(), np.round(kwh, 3).tolist())
+    ]
+    # 一条语句 + 参数列表：驱动按 executemany / 多行 VALUES 发送
+    db.execute(_upsert_statement(db.get_bind().dialect.name), rows)
+    refresh_rollups(db, set(account_ids), stamps.min().item(), stamps.max().item())
+    db.commit()
+    # Core 语句不触发 ORM 事件，需显式递增账户版本号，并丢弃这些账户缓存的预测系数
+    response_cache.versions.bump_many(account_ids)
+    forecast_store.evict_many(set(account_ids))
+
+
+def ingest_records(
+    db: Session,
+    records: Sequence[Any],
+    result: Optional[IngestResult] = None,
+    offset: int = 0,
+    chunk_rows: Optional[int] = None,
+) -> IngestResult:
+    """校验并写入一批记录，统计累加到 `result`（流式写入时多次调用共用一个结果）。
+
+    `offset` 为本批第一条记录在整个请求中的序号，用于报告被拒绝的行。
+    """
+
+    result = result or IngestResult()
+    chunk_rows = chunk_rows or settings.ingest_chunk_rows
+    result.received += len(records)
+    if not records:
+        return result
+
+    accounts, stamps, kwh, codes = validate_records(db, records)
+
+    rejected = np.flatnonzero(codes)
+    result.rejected += int(rejected.size)
+    room = MAX_LISTED_REJECTIONS - len(result.rejected_rows)
+    for position in rejected[:max(room, 0)].tolist():
+        result.rejected_rows.append(RejectedRow(index=offset + position, reason=_REASONS[int(codes[position])]))
+
+    valid = np.flatnonzero(codes == 0)
+    keep = _dedupe(accounts, stamps, valid) if valid.size else valid
+    result.duplicates += int(valid.size - keep.size)
+
+    for index in range(0, keep.size, chunk_rows):
+        rows = keep[index:index + chunk_rows]
+        started = time.perf_counter()
+        _write_chunk(db, accounts[rows], stamps[rows], kwh[rows])
+        elapsed = time.perf_counter() - started
+        result.written += int(rows.size)
+        result.batches.append(
+            IngestBatchStat(
+                rows=int(rows.size),
+                seconds=round(elapsed, 4),
+                rows_per_sec=round(rows.size / elapsed, 1) if elapsed > 0 else float(rows.size),
+            )
+        )
+    return result
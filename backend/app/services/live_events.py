@@ -0,0 +1,131 @@
+"""账户级实时事件：进程内发布 / 订阅，用于 SSE 与 WebSocket 推送。
+
+- 每个连接一个订阅，持有有界队列；发布方可能在线程池或事件循环线程中，
+  统一通过 `loop.call_soon_threadsafe` 投递到订阅者所在的事件循环；
+- 队列满（客户端消费过慢）时不阻塞发布方，而是标记该订阅"已溢出"，
+  推送端随后发送 `resync` 事件并关闭连接，由客户端重连后重新获取快照；
+- 没有订阅者的账户发布事件几乎零开销（`has_subscribers` 可用于跳过事件计算）。
+
+事件只在本进程内分发，多 worker 部署时需配合粘性会话或外部消息总线。
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from app.core.config import settings
+
+
+class Subscription:
+    """一个推送连接的订阅。"""
+
+    def __init__(self, hub: "LiveEventHub", account_id: int, maxsize: int) -> None:
+        self.hub = hub
+        self.account_id = account_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """在订阅者的事件循环中执行：队列满时标记溢出，丢弃后续事件。"""
+
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.hub.dropped += 1
+
+    async def next_event(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """等待下一个事件；超时返回 None（调用方据此发送心跳）。"""
+
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+class LiveEventHub:
+    """按账户分组的扇出（fan-out）。"""
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, account_id: int) -> Subscription:
+        """必须在事件循环中调用。"""
+
+        subscription = Subscription(self, account_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(account_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.account_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.account_id]
+
+    def has_subscribers(self, account_id: int) -> bool:
+        return account_id in self._subscribers
+
+    def publish(self, account_id: int, event: Dict[str, Any]) -> None:
+        """线程安全：可在任意线程调用，不等待订阅者消费。"""
+
+        with self._lock:
+            subscribers = list(self._subscribers.get(account_id, ()))
+        self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:  # 事件循环已关闭
+                self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            connections = sum(len(subscribers) for subscribers in self._subscribers.values())
+            accounts = len(self._subscribers)
+        return {
+            "accounts": accounts,
+            "connections": connections,
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+        }
+
+
+live_events = LiveEventHub(queue_size=settings.live_events_queue_size)
+
+
+def sse_message(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def sse_stream(
+    subscription: Subscription, snapshot: Dict[str, Any], heartbeat: Optional[float] = None
+) -> AsyncIterator[str]:
+    """SSE 消息流：先发送当前快照，之后推送增量事件，空闲时发送心跳注释。"""
+
+    heartbeat = heartbeat or settings.live_events_heartbeat_seconds
+    try:
+        yield sse_message("snapshot", snapshot)
+        while True:
+            if subscription.overflowed:
+                yield sse_message("resync", {"reason": "客户端消费过慢，请重新连接"})
+                return
+            event = await subscription.next_event(heartbeat)
+            if event is None:
+                yield ": heartbeat\n\n"
+                continue
+            yield sse_message(event["type"], event)
+    finally:
+        subscription.close()
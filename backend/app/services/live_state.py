@@ -0,0 +1,384 @@
+"""进程内的实时功率状态：每个账户的开启功率 / 开启数量常驻内存，读取为 O(1)。
+
+- 电器按槽位存放在 NumPy 数组中（所属账户槽位 int32、功率 float32、开关 bool、类别标记 uint8），
+  账户的汇总量（开启功率、开启数量、总功率、开启的空调 / 热水器数、开启的大功率电器功率）另存一组数组；
+- 账户第一次被读取时从数据库加载（一次查询），之后开关操作提交后调用 `set_on` 增量更新汇总；
+  新增电器等其他变化调用 `invalidate`，下次读取时重新加载；
+- 每个账户有一个变更计数：加载期间发生开关时丢弃本次加载结果，不会用旧数据覆盖新状态；
+- 多 worker 之间不共享，后台每 `LIVE_STATE_RECONCILE_SECONDS` 秒按数据库重新加载已缓存的账户并统计偏差，
+  限定了其他 worker 的开关在本进程中的最长延迟（与响应缓存的 TTL 同一思路）；
+- `check` 用一条聚合查询比对内存汇总与数据库，`memory_report` 估算每 10 万台电器的内存占用。
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Sequence
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.appliance import Appliance, ApplianceType
+
+logger = logging.getLogger(__name__)
+
+# 大功率电器阈值（kW），与仪表盘"大功率电器使用"因素一致
+LARGE_POWER_KW = 1.0
+_CLIMATE_TYPES = frozenset({ApplianceType.ac.value, ApplianceType.heater.value})
+_FLAG_CLIMATE = 1
+_FLAG_LARGE = 2
+# 对账 / 一致性检查每条 IN 查询的账户数
+_ACCOUNT_CHUNK = 1000
+# 比较功率汇总时允许的误差（float32 功率累加）
+_TOLERANCE_KW = 1e-3
+
+
+class AccountPower(NamedTuple):
+    """一个账户的实时汇总。"""
+
+    on_power: float  # 开启电器的总功率 (kW)
+    active_count: int  # 开启的电器数量
+    total_power: float  # 全部电器的额定功率之和 (kW)
+    climate_on: int  # 开启的空调 / 热水器数量
+    large_on_power: float  # 开启的大功率电器功率之和 (kW)
+
+
+_EMPTY = AccountPower(0.0, 0, 0.0, 0, 0.0)
+
+
+def _type_value(value: Any) -> str:
+    return value.value if isinstance(value, ApplianceType) else str(value)
+
+
+def _summarize(rows: Sequence[Any]) -> AccountPower:
+    """按 (id, type, power_rating_kw, is_on) 行计算汇总（功率按 float32 取值，与增量更新一致）。"""
+
+    if not rows:
+        return _EMPTY
+    power = np.array([row[2] or 0.0 for row in rows], dtype=np.float32).astype(np.float64)
+    on = np.array([bool(row[3]) for row in rows])
+    climate = np.array([_type_value(row[1]) in _CLIMATE_TYPES for row in rows])
+    large = power > LARGE_POWER_KW
+    return AccountPower(
+        on_power=float(power[on].sum()),
+        active_count=int(on.sum()),
+        total_power=float(power.sum()),
+        climate_on=int((on & climate).sum()),
+        large_on_power=float(power[on & large].sum()),
+    )
+
+
+class LiveState:
+    """数组存储的电器状态与账户汇总；所有读写在一把锁内完成（每次只涉及几个数组元素）。"""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._lock = threading.Lock()
+        # 电器槽位
+        self._owner = np.full(capacity, -1, dtype=np.int32)
+        self._power = np.zeros(capacity, dtype=np.float32)
+        self._on = np.zeros(capacity, dtype=bool)
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._index: Dict[int, int] = {}  # appliance_id -> 电器槽位
+        # 账户槽位
+        self._on_power = np.zeros(capacity, dtype=np.float64)
+        self._total_power = np.zeros(capacity, dtype=np.float64)
+        self._large_on_power = np.zeros(capacity, dtype=np.float64)
+        self._on_count = np.zeros(capacity, dtype=np.int32)
+        self._climate_on = np.zeros(capacity, dtype=np.int32)
+        self._account_free: List[int] = list(range(capacity - 1, -1, -1))
+        self._accounts: Dict[int, int] = {}  # account_id -> 账户槽位
+        self._members: Dict[int, List[int]] = {}  # account_id -> appliance_id 列表
+        self._changes: Dict[int, int] = {}  # account_id -> 变更计数
+        self.hits = 0
+        self.loads = 0
+        self.updates = 0
+        self.discarded_loads = 0
+        self.reconciles = 0
+        self.drifted = 0
+        self.last_reconcile_seconds = 0.0
+
+    # -- 存储 ----------------------------------------------------------------
+
+    def _grow_appliances(self, needed: int) -> None:
+        size = self._owner.size
+        new_size = max(size * 2, size + needed)
+        self._owner = np.concatenate([self._owner, np.full(new_size - size, -1, dtype=np.int32)])
+        self._power = np.concatenate([self._power, np.zeros(new_size - size, dtype=np.float32)])
+        self._on = np.concatenate([self._on, np.zeros(new_size - size, dtype=bool)])
+        self._flags = np.concatenate([self._flags, np.zeros(new_size - size, dtype=np.uint8)])
+        self._free.extend(range(new_size - 1, size - 1, -1))
+
+    def _grow_accounts(self) -> None:
+        size = self._on_power.size
+        for name in ("_on_power", "_total_power", "_large_on_power", "_on_count", "_climate_on"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(size, dtype=array.dtype)]))
+        self._account_free.extend(range(2 * size - 1, size - 1, -1))
+
+    def _release(self, account_id: int) -> None:
+        """释放账户的电器槽位。"""
+
+        for appliance_id in self._members.pop(account_id, ()):
+            member = self._index.pop(appliance_id)
+            self._owner[member] = -1
+            self._free.append(member)
+
+    def _drop(self, account_id: int) -> None:
+        slot = self._accounts.pop(account_id, None)
+        if slot is None:
+            return
+        self._release(account_id)
+        self._account_free.append(slot)
+
+    def _install(self, account_id: int, rows: Sequence[Any], summary: AccountPower) -> None:
+        self._release(account_id)
+        slot = self._accounts.get(account_id)
+        if slot is None:
+            if not self._account_free:
+                self._grow_accounts()
+            slot = self._account_free.pop()
+            self._accounts[account_id] = slot
+        if len(self._free) < len(rows):
+            self._grow_appliances(len(rows) - len(self._free))
+        members = [self._free.pop() for _ in rows]
+        for member, row in zip(members, rows):
+            power = np.float32(row[2] or 0.0)
+            self._index[row[0]] = member
+            self._owner[member] = slot
+            self._power[member] = power
+            self._on[member] = bool(row[3])
+            self._flags[member] = (_FLAG_CLIMATE if _type_value(row[1]) in _CLIMATE_TYPES else 0) | (
+                _FLAG_LARGE if power > LARGE_POWER_KW else 0
+            )
+        self._members[account_id] = [row[0] for row in rows]
+        self._on_power[slot] = summary.on_power
+        self._total_power[slot] = summary.total_power
+        self._large_on_power[slot] = summary.large_on_power
+        self._on_count[slot] = summary.active_count
+        self._climate_on[slot] = summary.climate_on
+
+    def _read(self, slot: int) -> AccountPower:
+        return AccountPower(
+            on_power=float(self._on_power[slot]),
+            active_count=int(self._on_count[slot]),
+            total_power=float(self._total_power[slot]),
+            climate_on=int(self._climate_on[slot]),
+            large_on_power=float(self._large_on_power[slot]),
+        )
+
+    # -- 加载与读取 ----------------------------------------------------------
+
+    @staticmethod
+    def _query(db: Session, account_ids: Iterable[int]):
+        return db.execute(
+            select(Appliance.account_id, Appliance.id, Appliance.type, Appliance.power_rating_kw, Appliance.is_on)
+            .where(Appliance.account_id.in_(list(account_ids)))
+            .order_by(Appliance.account_id, Appliance.id)
+        ).all()
+
+    def _load_many(self, db: Session, account_ids: Sequence[int]) -> Dict[int, AccountPower]:
+        """从数据库加载一批账户；加载期间有开关变化的账户不写入（返回值仍是数据库中的汇总）。"""
+
+        with self._lock:
+            seen = {account_id: self._changes.get(account_id, 0) for account_id in account_ids}
+        grouped: Dict[int, List[Any]] = {account_id: [] for account_id in account_ids}
+        for row in self._query(db, account_ids):
+            grouped[row[0]].append(row[1:])
+        summaries = {account_id: _summarize(rows) for account_id, rows in grouped.items()}
+        with self._lock:
+            for account_id, rows in grouped.items():
+                if self._changes.get(account_id, 0) != seen[account_id]:
+                    self.discarded_loads += 1
+                    continue
+                self._install(account_id, rows, summaries[account_id])
+            self.loads += len(account_ids)
+        return summaries
+
+    def totals(self, db: Session, account_id: int) -> AccountPower:
+        """账户的实时汇总：已缓存时不访问数据库。"""
+
+        with self._lock:
+            slot = self._accounts.get(account_id)
+            if slot is not None:
+                self.hits += 1
+                return self._read(slot)
+        return self._load_many(db, [account_id])[account_id]
+
+    # -- 增量更新 ------------------------------------------------------------
+
+    def set_on(self, account_id: int, appliance_id: int, is_on: bool) -> None:
+        """开关提交后调用：按该电器的功率与类别增量更新账户汇总。"""
+
+        with self._lock:
+            self._changes[account_id] = self._changes.get(account_id, 0) + 1
+            slot = self._accounts.get(account_id)
+            if slot is None:
+                return
+            member = self._index.get(appliance_id)
+            if member is None or self._owner[member] != slot:
+                # 其他 worker 新增的电器：下次读取时重新加载
+                self._drop(account_id)
+                return
+            if bool(self._on[member]) == is_on:
+                return
+            self._on[member] = is_on
+            sign = 1 if is_on else -1
+            power = float(self._power[member])
+            flags = int(self._flags[member])
+            self._on_power[slot] += sign * power
+            self._on_count[slot] += sign
+            if flags & _FLAG_CLIMATE:
+                self._climate_on[slot] += sign
+            if flags & _FLAG_LARGE:
+                self._large_on_power[slot] += sign * power
+            self.updates += 1
+
+    def invalidate(self, account_id: int) -> None:
+        """电器增删、功率修改等结构变化：丢弃账户，下次读取时重新加载。"""
+
+        with self._lock:
+            self._changes[account_id] = self._changes.get(account_id, 0) + 1
+            self._drop(account_id)
+
+    # -- 对账与检查 ----------------------------------------------------------
+
+    def reconcile(self, db: Session) -> Dict[str, Any]:
+        """按数据库重新加载全部已缓存账户，返回与内存汇总不一致的账户数。"""
+
+        started = time.perf_counter()
+        with self._lock:
+            cached = {account_id: self._read(slot) for account_id, slot in self._accounts.items()}
+        drifted = 0
+        account_ids = list(cached)
+        for start in range(0, len(account_ids), _ACCOUNT_CHUNK):
+            chunk = account_ids[start:start + _ACCOUNT_CHUNK]
+            for account_id, summary in self._load_many(db, chunk).items():
+                drifted += not _same(cached[account_id], summary)
+        self.reconciles += 1
+        self.drifted += drifted
+        self.last_reconcile_seconds = time.perf_counter() - started
+        return {"accounts": len(account_ids), "drifted": drifted, "seconds": round(self.last_reconcile_seconds, 4)}
+
+    def check(self, db: Session) -> Dict[str, Any]:
+        """一致性检查（只读）：用聚合查询比对已缓存账户的开启功率与开启数量。"""
+
+        with self._lock:
+            cached = {account_id: self._read(slot) for account_id, slot in self._accounts.items()}
+        mismatches = []
+        account_ids = list(cached)
+        for start in range(0, len(account_ids), _ACCOUNT_CHUNK):
+            chunk = account_ids[start:start + _ACCOUNT_CHUNK]
+            on = Appliance.is_on.is_(True)
+            rows = db.execute(
+                select(
+                    Appliance.account_id,
+                    func.coalesce(func.sum(case((on, Appliance.power_rating_kw), else_=0.0)), 0.0),
+                    func.coalesce(func.sum(case((on, 1), else_=0)), 0),
+                )
+                .where(Appliance.account_id.in_(chunk))
+                .group_by(Appliance.account_id)
+            ).all()
+            actual = {row[0]: (float(row[1]), int(row[2])) for row in rows}
+            for account_id in chunk:
+                memory = cached[account_id]
+                power, count = actual.get(account_id, (0.0, 0))
+                if abs(memory.on_power - power) > _TOLERANCE_KW or memory.active_count != count:
+                    mismatches.append(
+                        {
+                            "account_id": account_id,
+                            "memory": {"on_power": round(memory.on_power, 3), "active_count": memory.active_count},
+                            "database": {"on_power": round(power, 3), "active_count": count},
+                        }
+                    )
+        return {"checked": len(account_ids), "mismatches": mismatches[:100], "mismatch_count": len(mismatches)}
+
+    async def run_reconcile_loop(self, session_factory: Callable[[], Session], interval: float) -> None:
+        """后台定期对账（在 FastAPI lifespan 中启动）。"""
+
+        def _reconcile_once() -> Dict[str, Any]:
+            db = session_factory()
+            try:
+                return self.reconcile(db)
+            finally:
+                db.close()
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await asyncio.to_thread(_reconcile_once)
+                if result["drifted"]:
+                    logger.info("实时功率状态对账：%d 个账户与数据库不一致，已重新加载", result["drifted"])
+            except Exception:  # pragma: no cover - 对账失败时继续使用内存状态
+                logger.exception("实时功率状态对账失败")
+
+    # -- 统计 ----------------------------------------------------------------
+
+    def memory_report(self) -> Dict[str, Any]:
+        """内存占用：数组按已分配容量计算，索引字典与槽位列表按对象大小估算。
+
+        每 10 万台电器的估算只计已使用的槽位（数组容量按倍增预留，小规模时不具代表性），
+        电器数不足 1000 时不给出；实测见 `benchmarks/bench_live_state.py`。
+        """
+        with self._lock:
+            appliance_arrays = self._owner.nbytes + self._power.nbytes + self._on.nbytes + self._flags.nbytes
+            account_arrays = sum(
+                array.nbytes
+                for array in (self._on_power, self._total_power, self._large_on_power, self._on_count, self._climate_on)
+            )
+            # 字典 / 列表本身 + 其中的 int 对象（小整数有缓存，这里按上限估算）
+            int_bytes = sys.getsizeof(2 ** 40)
+            index_bytes = sys.getsizeof(self._index) + 2 * int_bytes * len(self._index)
+            member_bytes = sys.getsizeof(self._members) + sum(
+                sys.getsizeof(members) + int_bytes for members in self._members.values()
+            )
+            bookkeeping = (
+                sys.getsizeof(self._accounts)
+                + sys.getsizeof(self._changes)
+                + sys.getsizeof(self._free)
+                + sys.getsizeof(self._account_free)
+            )
+            appliances, accounts = len(self._index), len(self._accounts)
+            used = (
+                appliances * appliance_arrays // self._owner.size
+                + accounts * account_arrays // self._on_power.size
+                + index_bytes
+                + member_bytes
+            )
+        return {
+            "appliances": appliances,
+            "appliance_capacity": int(self._owner.size),
+            "array_bytes": appliance_arrays + account_arrays,
+            "index_bytes": index_bytes + member_bytes + bookkeeping,
+            "total_bytes": appliance_arrays + account_arrays + index_bytes + member_bytes + bookkeeping,
+            "bytes_per_100k_appliances": round(used / appliances * 100_000) if appliances >= 1000 else None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "accounts": len(self._accounts),
+            "hits": self.hits,
+            "loads": self.loads,
+            "updates": self.updates,
+            "discarded_loads": self.discarded_loads,
+            "reconciles": self.reconciles,
+            "drifted": self.drifted,
+            "last_reconcile_seconds": round(self.last_reconcile_seconds, 4),
+            "memory": self.memory_report(),
+        }
+
+
+def _same(left: AccountPower, right: AccountPower) -> bool:
+    return (
+        left.active_count == right.active_count
+        and left.climate_on == right.climate_on
+        and abs(left.on_power - right.on_power) <= _TOLERANCE_KW
+        and abs(left.total_power - right.total_power) <= _TOLERANCE_KW
+        and abs(left.large_on_power - right.large_on_power) <= _TOLERANCE_KW
+    )
+
+
+live_state = LiveState()
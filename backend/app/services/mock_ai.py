@@ -1,6 +1,7 @@
 """模拟 AI 服务，用于分析电器操作并给出建议。"""
 
 import random
+from typing import List, Tuple
 
 
 def analyze_appliance_action(appliance_name: str, action: str, power: float) -> str:
@@ -28,3 +29,42 @@ def analyze_appliance_action(appliance_name: str, action: str, power: float) ->
 
     return random.choice(tips)
 
+
+
+def analyze_batch_actions(changes: List[Tuple[str, str, float]], power_delta: float, total_power: float) -> str:
+    """模拟 AI 对一次批量操作给出一条汇总建议。
+
+    Args:
+        changes: 实际发生变化的 (电器名称, 操作, 功率 kW)
+        power_delta: 总功率变化 (kW)
+        total_power: 操作后的总功率 (kW)
+
+    Returns:
+        AI 给出的建议消息
+    """
+    if not changes:
+        return "所有电器已处于目标状态，无需调整。"
+
+    def names(action: str) -> str:
+        selected = [name for name, item_action, _ in changes if item_action == action]
+        listed = "、".join(selected[:3])
+        return f"{listed} 等 {len(selected)} 台电器" if len(selected) > 3 else listed
+
+    turned_on = any(action == "ON" for _, action, _ in changes)
+    turned_off = any(action == "OFF" for _, action, _ in changes)
+    parts = []
+    if turned_off:
+        parts.append(f"已关闭 {names('OFF')}")
+    if turned_on:
+        parts.append(f"已开启 {names('ON')}")
+    message = "，".join(parts) + "。"
+
+    if power_delta < 0:
+        message += f"总功率下降 {-power_delta:.2f}kW，每小时可节省 {-power_delta:.2f} 度电。"
+    elif power_delta > 0:
+        message += f"总功率增加 {power_delta:.2f}kW。"
+    if total_power == 0:
+        message += "当前所有电器均已关闭，出门放心！"
+    elif total_power > 3:
+        message += f"当前总负荷 {total_power:.2f}kW 较高，建议错峰使用大功率电器。"
+    return message
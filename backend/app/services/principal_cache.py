@@ -0,0 +1,177 @@
+"""认证主体缓存：缓存 JWT 解码结果与用户 / 用电账户快照。
+
+热路径上命中缓存时既不需要重新校验 JWT 签名，也不需要查询
+`users` / `electricity_accounts` 两张表。用户或账户发生变更时，
+通过 SQLAlchemy ORM 事件自动失效对应条目。
+"""
+
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, object_session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.electricity_account import ElectricityAccount
+from app.models.user import User
+
+
+class PrincipalCache:
+    """两级缓存：token 哈希 -> claims，username -> 脱离会话的 User 快照。"""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.ttl = ttl
+        self.claims: TTLCache[Dict[str, Any]] = TTLCache(maxsize, ttl)
+        self.users: TTLCache[User] = TTLCache(maxsize, ttl, on_remove=self._forget)
+        # 反向索引：用于按 user_id / account_id 失效（例如用户名被修改）；
+        # 快照被淘汰、过期或失效时同步删除，大小不超过 users 的容量
+        self._user_index: Dict[int, str] = {}
+        self._account_index: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def token_key(token: str) -> bytes:
+        """缓存键使用 token 的 SHA-256，避免在内存中长期保留原始 token。"""
+
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        return self.claims.get(self.token_key(token))
+
+    def set_claims(self, token: str, claims: Dict[str, Any]) -> None:
+        """缓存 claims，有效期不超过 token 自身的 `exp`。"""
+
+        ttl = self.ttl
+        exp = claims.get("exp")
+        if exp is not None:
+            ttl = min(ttl, float(exp) - time.time())
+        if ttl > 0:
+            self.claims.set(self.token_key(token), claims, ttl=ttl)
+
+    def get_user(self, username: str) -> Optional[User]:
+        return self.users.get(username)
+
+    def set_user(self, user: User) -> None:
+        """缓存已脱离会话（detached）的用户及其用电账户快照。"""
+
+        with self._lock:
+            self._user_index[user.id] = user.username
+            account = user.electricity_account
+            if account is not None:
+                self._account_index[account.id] = user.username
+        self.users.set(user.username, user)
+
+    def _forget(self, username: str, user: User) -> None:
+        """快照移除后删除指向它的反向索引（索引已指向同名的新快照时保留）。"""
+
+        # 快照已脱离会话，只读取已加载的属性，不触发懒加载
+        user_id, account = user.__dict__.get("id"), user.__dict__.get("electricity_account")
+        with self._lock:
+            if self._user_index.get(user_id) == username:
+                del self._user_index[user_id]
+            if account is not None and self._account_index.get(account.id) == username:
+                del self._account_index[account.id]
+
+    def invalidate_user(self, username: str) -> None:
+        user = self.users.pop(username)
+        if user is not None:
+            self._forget(username, user)
+
+    def invalidate_user_id(self, user_id: Optional[int]) -> None:
+        with self._lock:
+            username = self._user_index.pop(user_id, None)
+        if username is not None:
+            self.invalidate_user(username)
+
+    def invalidate_account_id(self, account_id: Optional[int]) -> None:
+        with self._lock:
+            username = self._account_index.pop(account_id, None)
+        if username is not None:
+            self.invalidate_user(username)
+
+    def clear(self) -> None:
+        self.claims.clear()
+        self.users.clear()
+        with self._lock:
+            self._user_index.clear()
+            self._account_index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "claims": self.claims.stats(),
+            "users": self.users.stats(),
+            "indexed_users": len(self._user_index),
+            "indexed_accounts": len(self._account_index),
+        }
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.principal_cache_max_entries,
+    ttl=settings.principal_cache_ttl_seconds,
+)
+
+
+def load_principal(db: Session, username: str) -> Optional[User]:
+    """用一条 JOIN 查询加载用户及其用电账户，并从会话中脱离作为可缓存的快照。"""
+
+    user = (
+        db.query(User)
+        .options(joinedload(User.electricity_account))
+        .filter(User.username == username)
+        .first()
+    )
+    if user is None:
+        return None
+    account = user.electricity_account
+    db.expunge(user)
+    if account is not None:
+        db.expunge(account)
+    return user
+
+
+def _defer_invalidation(target: Any, invalidate) -> None:
+    """立即失效，并在事务提交后再失效一次，避免提交前被并发请求回填旧值。"""
+
+    invalidate()
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("principal_invalidations", []).append(invalidate)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _on_user_changed(mapper, connection, target: User) -> None:
+    user_id, username = target.id, target.username
+
+    def invalidate() -> None:
+        principal_cache.invalidate_user_id(user_id)
+        principal_cache.invalidate_user(username)
+
+    _defer_invalidation(target, invalidate)
+
+
+@event.listens_for(ElectricityAccount, "after_insert")
+@event.listens_for(ElectricityAccount, "after_update")
+@event.listens_for(ElectricityAccount, "after_delete")
+def _on_account_changed(mapper, connection, target: ElectricityAccount) -> None:
+    account_id, user_id = target.id, target.user_id
+
+    def invalidate() -> None:
+        principal_cache.invalidate_account_id(account_id)
+        principal_cache.invalidate_user_id(user_id)
+
+    _defer_invalidation(target, invalidate)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session) -> None:
+    for invalidate in session.info.pop("principal_invalidations", ()):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop("principal_invalidations", None)
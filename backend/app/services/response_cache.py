@@ -0,0 +1,138 @@
+"""仪表盘响应缓存与条件请求（ETag / If-None-Match）。
+
+- 每个用电账户维护一个版本号：电器增删改、用电数据写入、账户变更时递增
+  （ORM 写入通过会话事件在提交后递增，批量写入等 Core 语句需调用 `bump_many`）；
+- 缓存键为 (账户, 接口, 参数, 版本号)，值为序列化后的 JSON 字节与 ETag，
+  版本号变化后旧条目自然失效；
+- 另设 TTL：部分数据随时间变化（趋势窗口、天气），且多 worker 之间的版本号不共享，
+  TTL 限定了最长的陈旧时间。
+
+数据未变化的轮询只需一次字典查找，客户端带上 ETag 时直接返回 304。
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+from fastapi import Response, status
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.appliance import Appliance
+from app.models.consumption_data import ConsumptionData
+from app.models.electricity_account import ElectricityAccount
+
+
+class AccountVersions:
+    """进程内的账户数据版本号。"""
+
+    def __init__(self) -> None:
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, account_id: int) -> int:
+        return self._versions.get(account_id, 0)
+
+    def bump(self, account_id: int) -> None:
+        with self._lock:
+            self._versions[account_id] = self._versions.get(account_id, 0) + 1
+
+    def bump_many(self, account_ids: Iterable[int]) -> None:
+        with self._lock:
+            for account_id in set(account_ids):
+                self._versions[account_id] = self._versions.get(account_id, 0) + 1
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """按账户版本号分区的 JSON 响应缓存。"""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.entries: TTLCache[CachedResponse] = TTLCache(maxsize, ttl)
+        self.versions = AccountVersions()
+
+    def key(self, account_id: int, endpoint: str, *params: Hashable) -> Tuple[Hashable, ...]:
+        """必须在查询数据之前生成键：先读版本号，再读数据。"""
+
+        return (account_id, endpoint, params, self.versions.get(account_id))
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[CachedResponse]:
+        return self.entries.get(key) if settings.response_cache_enabled else None
+
+    def store(self, key: Tuple[Hashable, ...], model: BaseModel) -> CachedResponse:
+        """序列化一次并缓存；ETag 取响应体的哈希。"""
+
+        body = model.model_dump_json().encode("utf-8")
+        entry = CachedResponse(body=body, etag=f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"')
+        if settings.response_cache_enabled:
+            self.entries.set(key, entry)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return self.entries.stats()
+
+
+response_cache = ResponseCache(
+    maxsize=settings.response_cache_max_entries,
+    ttl=settings.response_cache_ttl_seconds,
+)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = (item.strip() for item in if_none_match.split(","))
+    return any(item == "*" or item.removeprefix("W/") == etag for item in candidates)
+
+
+def conditional_response(entry: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """ETag 匹配时返回 304，否则直接返回缓存的 JSON 字节（跳过再次序列化）。"""
+
+    # no-cache：允许浏览器缓存，但每次都需带 If-None-Match 重新验证
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# ORM 写入后递增版本号
+# ---------------------------------------------------------------------------
+
+_PENDING_KEY = "pending_account_versions"
+
+
+def _account_of(obj: Any) -> Optional[int]:
+    if isinstance(obj, (Appliance, ConsumptionData)):
+        return obj.account_id
+    if isinstance(obj, ElectricityAccount):
+        return obj.id
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_accounts(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        account_id = _account_of(obj)
+        if account_id is not None:
+            session.info.setdefault(_PENDING_KEY, set()).add(account_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_changed_accounts(session: Session) -> None:
+    # 提交后才递增：读取方先取版本号再查数据，不会把旧数据缓存到新版本下
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        response_cache.versions.bump_many(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_accounts(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
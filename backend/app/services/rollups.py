@@ -0,0 +1,343 @@
+"""用电量汇总表（小时 / 日 / 月）的增量维护与查询规划。
+
+写入：
+- 通过 ORM 写入 `ConsumptionData` 时，提交前自动刷新受影响的时间桶；
+- 批量写入（Core executemany）后需显式调用 `refresh_rollups`；
+- `rebuild_rollups` 用于回填或全量重建（见 `scripts/rebuild_rollups.py`）。
+
+刷新只重算受影响账户、受影响时间范围内的桶：小时表由原始数据聚合，
+日表由小时表聚合，月表由日表聚合，因此重复写入 / 覆盖写入都是幂等的。
+`consumption_daily_slots` 由原始数据聚合，每天一行保存 48 个 30 分钟时段的用电量，
+供分时电价计费读取整天部分（电价按 30 分钟时段变化，小时表的粒度不够）。
+
+读取：`usage_between` 把任意时间区间拆成"整月 + 整天 + 整小时 + 零头"，
+整段部分读最粗粒度的汇总表，只有首尾不足一小时的零头回落到原始数据；
+`daily_slot_usage` 读取整天的逐时段用电量。
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, event, func, insert, literal, literal_column, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.consumption_data import ConsumptionData
+from app.models.consumption_rollup import (
+    ConsumptionDaily,
+    ConsumptionDailySlots,
+    ConsumptionHourly,
+    ConsumptionMonthly,
+)
+from app.services.bucketing import DAY_SECONDS, MIN_BUCKET_SECONDS, Bucket, aggregate_buckets, bucket_expression
+
+# 单条 DELETE / INSERT ... SELECT 中 IN 列表的最大账户数
+_ACCOUNT_CHUNK = 500
+# 逐时段日汇总在 Python 端组装，每次最多处理的天数（全量重建时限制内存）
+_SLOT_DAYS_CHUNK = 31
+SLOTS_PER_DAY = DAY_SECONDS // MIN_BUCKET_SECONDS
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def floor_month(value: datetime) -> datetime:
+    return floor_day(value).replace(day=1)
+
+
+def _ceil(floor: Callable[[datetime], datetime], step: Callable[[datetime], datetime]):
+    def ceil(value: datetime) -> datetime:
+        base = floor(value)
+        return base if base == value else step(base)
+
+    return ceil
+
+
+def _next_month(value: datetime) -> datetime:
+    return value.replace(year=value.year + 1, month=1) if value.month == 12 else value.replace(month=value.month + 1)
+
+
+ceil_hour = _ceil(floor_hour, lambda v: v + timedelta(hours=1))
+ceil_day = _ceil(floor_day, lambda v: v + timedelta(days=1))
+ceil_month = _ceil(floor_month, _next_month)
+
+
+# SQL 端的时间截断格式。SQLite 的 DateTime 以带微秒的字符串存储，
+# 截断结果必须保持同一格式，字符串比较才与时间顺序一致。
+_TRUNC_FORMATS = {
+    "hour": ("%Y-%m-%d %H:00:00.000000", "%Y-%m-%d %H:00:00"),
+    "day": ("%Y-%m-%d 00:00:00.000000", "%Y-%m-%d 00:00:00"),
+    "month": ("%Y-%m-01 00:00:00.000000", "%Y-%m-01 00:00:00"),
+}
+
+
+def _truncate(dialect_name: str, column, unit: str):
+    sqlite_format, mysql_format = _TRUNC_FORMATS[unit]
+    if dialect_name == "sqlite":
+        return func.strftime(sqlite_format, column)
+    if dialect_name in ("mysql", "mariadb"):
+        return func.date_format(column, mysql_format)
+    if dialect_name == "postgresql":
+        return func.date_trunc(unit, column)
+    raise NotImplementedError(f"不支持的数据库方言: {dialect_name}")
+
+
+# (汇总表, 数据来源表, 来源时间列, 来源电量列, 来源条数列, 截断单位, floor, ceil)
+_LEVELS = (
+    (ConsumptionHourly, ConsumptionData, ConsumptionData.timestamp, ConsumptionData.total_kwh, None, "hour", floor_hour, ceil_hour),
+    (ConsumptionDaily, ConsumptionHourly, ConsumptionHourly.bucket_start, ConsumptionHourly.total_kwh, ConsumptionHourly.samples, "day", floor_day, ceil_day),
+    (ConsumptionMonthly, ConsumptionDaily, ConsumptionDaily.bucket_start, ConsumptionDaily.total_kwh, ConsumptionDaily.samples, "month", floor_month, ceil_month),
+)
+
+
+def _chunks(values: Sequence[int], size: int) -> Iterable[Sequence[int]]:
+    for index in range(0, len(values), size):
+        yield values[index:index + size]
+
+
+def refresh_rollups(
+    db: Session,
+    account_ids: Optional[Iterable[int]],
+    start: datetime,
+    end: datetime,
+) -> None:
+    """重算 `[start, end]` 涉及的全部汇总桶（不提交事务）。
+
+    `account_ids` 为 None 时处理所有账户（用于全量重建）。
+    """
+
+    dialect_name = db.get_bind().dialect.name
+    ids: Optional[List[int]] = sorted(set(account_ids)) if account_ids is not None else None
+    groups: Iterable[Optional[Sequence[int]]] = _chunks(ids, _ACCOUNT_CHUNK) if ids is not None else [None]
+
+    for chunk in groups:
+        if chunk is not None and not chunk:
+            continue
+        for table, source, ts_col, kwh_col, samples_col, unit, floor, ceil in _LEVELS:
+            lower, upper = floor(start), ceil(end + timedelta(microseconds=1))
+
+            removal = delete(table).where(table.bucket_start >= lower, table.bucket_start < upper)
+            if chunk is not None:
+                removal = removal.where(table.account_id.in_(chunk))
+            db.execute(removal)
+
+            bucket = _truncate(dialect_name, ts_col, unit)
+            samples = func.sum(samples_col) if samples_col is not None else func.count()
+            query = (
+                select(source.account_id, bucket, func.sum(kwh_col), samples)
+                .where(ts_col >= lower, ts_col < upper)
+                .group_by(source.account_id, bucket)
+            )
+            if chunk is not None:
+                query = query.where(source.account_id.in_(chunk))
+            db.execute(
+                insert(table).from_select(
+                    [table.account_id, table.bucket_start, table.total_kwh, table.samples], query
+                )
+            )
+        _refresh_daily_slots(db, chunk, start, end)
+
+
+def _refresh_daily_slots(db: Session, chunk: Optional[Sequence[int]], start: datetime, end: datetime) -> None:
+    """重算 `[start, end]` 涉及的逐时段日汇总：按 (账户, 30 分钟时段) 聚合原始数据，再按天组装成一行。"""
+
+    dialect_name = db.get_bind().dialect.name
+    table = ConsumptionDailySlots
+    lower, upper = floor_day(start), ceil_day(end + timedelta(microseconds=1))
+    removal = delete(table).where(table.bucket_start >= lower, table.bucket_start < upper)
+    if chunk is not None:
+        removal = removal.where(table.account_id.in_(chunk))
+    db.execute(removal)
+
+    window = timedelta(days=_SLOT_DAYS_CHUNK)
+    while lower < upper:
+        window_end = min(lower + window, upper)
+        slot = bucket_expression(dialect_name, ConsumptionData.timestamp, lower, MIN_BUCKET_SECONDS).label("slot")
+        query = (
+            select(ConsumptionData.account_id, slot, func.sum(ConsumptionData.total_kwh), func.count())
+            .where(ConsumptionData.timestamp >= lower, ConsumptionData.timestamp < window_end)
+            .group_by(ConsumptionData.account_id, literal_column("slot"))
+        )
+        if chunk is not None:
+            query = query.where(ConsumptionData.account_id.in_(chunk))
+        usage = {}  # (账户, 第几天) -> 48 个时段的用电量
+        samples = {}
+        for account_id, index, kwh, count in db.execute(query):
+            day, offset = divmod(int(index), SLOTS_PER_DAY)
+            usage.setdefault((account_id, day), np.zeros(SLOTS_PER_DAY))[offset] = float(kwh or 0)
+            samples[account_id, day] = samples.get((account_id, day), 0) + int(count)
+        if usage:
+            db.execute(
+                insert(table),
+                [
+                    {
+                        "account_id": account_id,
+                        "bucket_start": lower + timedelta(days=day),
+                        "total_kwh": round(float(slots.sum()), 3),
+                        "samples": samples[account_id, day],
+                        "slot_kwh": slots.tobytes(),
+                    }
+                    for (account_id, day), slots in usage.items()
+                ],
+            )
+        lower = window_end
+
+
+def rebuild_rollups(db: Session, since: Optional[datetime] = None, account_ids: Optional[Iterable[int]] = None) -> None:
+    """回填 / 重建汇总表（提交事务）。`since` 为空时重建全部历史。"""
+
+    bounds = select(func.min(ConsumptionData.timestamp), func.max(ConsumptionData.timestamp))
+    if account_ids is not None:
+        account_ids = list(account_ids)
+        bounds = bounds.where(ConsumptionData.account_id.in_(account_ids))
+    first, last = db.execute(bounds).one()
+    if first is None:
+        return
+    refresh_rollups(db, account_ids, max(first, since) if since else first, last)
+    db.commit()
+
+
+# ---------------------------------------------------------------------------
+# ORM 写入时自动维护
+# ---------------------------------------------------------------------------
+
+_PENDING_KEY = "pending_rollups"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_consumption_writes(session: Session, flush_context) -> None:
+    touched = [
+        obj for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, ConsumptionData)
+    ]
+    if not touched:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for obj in touched:
+        if obj.account_id is None or obj.timestamp is None:
+            continue
+        low, high = pending.get(obj.account_id, (obj.timestamp, obj.timestamp))
+        pending[obj.account_id] = (min(low, obj.timestamp), max(high, obj.timestamp))
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_pending_rollups(session: Session) -> None:
+    # 先把尚未 flush 的改动写出去，after_flush 会把它们也记入待刷新列表
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    start = min(low for low, _ in pending.values())
+    end = max(high for _, high in pending.values())
+    refresh_rollups(session, pending.keys(), start, end)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_rollups(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ---------------------------------------------------------------------------
+# 查询规划
+# ---------------------------------------------------------------------------
+
+# 由粗到细：(汇总表, floor, ceil)
+_READ_LEVELS = (
+    (ConsumptionMonthly, floor_month, ceil_month),
+    (ConsumptionDaily, floor_day, ceil_day),
+    (ConsumptionHourly, floor_hour, ceil_hour),
+)
+
+
+def plan_segments(start: datetime, end: datetime, level: int = 0) -> List[Tuple[Optional[type], datetime, datetime]]:
+    """把 `[start, end)` 拆成若干段：(汇总表或 None 表示原始数据, 起点, 终点)。"""
+
+    if start >= end:
+        return []
+    if level == len(_READ_LEVELS):
+        return [(None, start, end)]
+    table, floor, ceil = _READ_LEVELS[level]
+    inner_start, inner_end = ceil(start), floor(end)
+    if inner_start >= inner_end:
+        return plan_segments(start, end, level + 1)
+    return [
+        *plan_segments(start, inner_start, level + 1),
+        (table, inner_start, inner_end),
+        *plan_segments(inner_end, end, level + 1),
+    ]
+
+
+def usage_between(db: Session, account_id: int, start: datetime, end: datetime) -> float:
+    """`[start, end)` 内的总用电量（kWh），所有分段合并为一条 UNION ALL 查询。"""
+
+    parts = []
+    for table, seg_start, seg_end in plan_segments(start, end):
+        if table is None:
+            ts_col, kwh_col, owner = ConsumptionData.timestamp, ConsumptionData.total_kwh, ConsumptionData.account_id
+        else:
+            ts_col, kwh_col, owner = table.bucket_start, table.total_kwh, table.account_id
+        parts.append(
+            select(func.coalesce(func.sum(kwh_col), literal(0)).label("kwh"))
+            .where(owner == account_id, ts_col >= seg_start, ts_col < seg_end)
+        )
+    if not parts:
+        return 0.0
+    combined = union_all(*parts).subquery()
+    result = db.execute(select(func.sum(combined.c.kwh))).scalar()
+    return float(result) if result else 0.0
+
+
+def daily_slot_usage(db: Session, account_id: int, first_day: datetime, days: int) -> np.ndarray:
+    """从 `first_day`（零点）起连续 `days` 整天的逐时段用电量，形状 `[days * 48]`，没有数据的天为 0。"""
+
+    usage = np.zeros((max(days, 0), SLOTS_PER_DAY))
+    if days <= 0:
+        return usage.reshape(-1)
+    table = ConsumptionDailySlots
+    rows = db.execute(
+        select(table.bucket_start, table.slot_kwh).where(
+            table.account_id == account_id,
+            table.bucket_start >= first_day,
+            table.bucket_start < first_day + timedelta(days=days),
+        )
+    )
+    for bucket_start, slot_kwh in rows:
+        usage[(bucket_start - first_day).days] = np.frombuffer(slot_kwh, dtype=np.float64)
+    return usage.reshape(-1)
+
+
+def trend_buckets(
+    db: Session, account_id: int, start: datetime, bucket_seconds: int, now: Optional[datetime] = None
+) -> List[Bucket]:
+    """趋势图分桶：整小时 / 整天的桶读汇总表，当前未结束的部分读原始数据。"""
+
+    now = now or datetime.now()
+    if bucket_seconds % DAY_SECONDS == 0:
+        table, cut = ConsumptionDaily, floor_day(now)
+    elif bucket_seconds % 3600 == 0:
+        table, cut = ConsumptionHourly, floor_hour(now)
+    else:
+        return aggregate_buckets(
+            db, ConsumptionData.timestamp, ConsumptionData.total_kwh,
+            [ConsumptionData.account_id == account_id], start, None, bucket_seconds,
+        )
+
+    merged = {}
+    rolled = aggregate_buckets(
+        db, table.bucket_start, table.total_kwh, [table.account_id == account_id],
+        start, cut, bucket_seconds, samples_column=table.samples,
+    ) if cut > start else []
+    recent = aggregate_buckets(
+        db, ConsumptionData.timestamp, ConsumptionData.total_kwh, [ConsumptionData.account_id == account_id],
+        max(start, cut), None, bucket_seconds, origin=start,
+    )
+    for bucket in (*rolled, *recent):
+        previous = merged.get(bucket.start)
+        if previous is not None:
+            bucket = Bucket(bucket.start, previous.total_kwh + bucket.total_kwh, previous.samples + bucket.samples)
+        merged[bucket.start] = bucket
+    return [merged[key] for key in sorted(merged)]
@@ -0,0 +1,259 @@
+"""进程内 asyncio 定时任务调度，多 worker 之间通过数据库租约选主。
+
+- 每个 worker 都在 FastAPI lifespan 中启动同一个 `Scheduler`，定期尝试获取 / 续约
+  `scheduler_leases` 中的同名租约，只有持有者执行任务，多 worker 部署时不会重复写入；
+  持有者退出时释放租约，崩溃时租约在 `scheduler_lease_ttl_seconds` 后过期，由其他 worker 接管；
+- 任务按固定间隔对齐到当天零点起的整数倍边界（如每个 30 分钟时段结束时），
+  可再延迟 `delay` 秒触发，同步函数在线程中执行，参数为本次对应的边界时间；
+- 记录每个任务的执行耗时与触发延迟（实际开始 - 计划时间），见 `/api/internal/scheduler`。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.scheduler_lease import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# 租约
+# ---------------------------------------------------------------------------
+
+
+def acquire_lease(db: Session, name: str, holder: str, ttl: float, now: Optional[datetime] = None) -> bool:
+    """获取或续约租约（提交事务），成功时返回 True。
+
+    一条条件 UPDATE 完成"自己持有或已过期则接管"，并发的 worker 中只有一个能更新成功；
+    租约不存在时插入，主键冲突说明被其他 worker 抢先。
+    """
+
+    now = now or datetime.now()
+    expires_at = now + timedelta(seconds=ttl)
+    result = db.execute(
+        update(SchedulerLease)
+        .where(
+            SchedulerLease.name == name,
+            or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now),
+        )
+        .values(holder=holder, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        db.commit()
+        return True
+    if db.execute(select(SchedulerLease.name).where(SchedulerLease.name == name)).first():
+        db.rollback()
+        return False
+    try:
+        db.execute(insert(SchedulerLease).values(name=name, holder=holder, expires_at=expires_at))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def release_lease(db: Session, name: str, holder: str) -> None:
+    """主动释放自己持有的租约（提交事务），其他 worker 无需等待过期即可接管。"""
+
+    db.execute(delete(SchedulerLease).where(SchedulerLease.name == name, SchedulerLease.holder == holder))
+    db.commit()
+
+
+# ---------------------------------------------------------------------------
+# 任务
+# ---------------------------------------------------------------------------
+
+
+def next_boundary(after: datetime, interval: float) -> datetime:
+    """`after` 之后（不含）的下一个边界：当天零点起每 `interval` 秒一个。"""
+
+    midnight = after.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (after - midnight).total_seconds()
+    return midnight + timedelta(seconds=(elapsed // interval + 1) * interval)
+
+
+@dataclass
+class JobStats:
+    """单个任务的运行统计。"""
+
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0  # 到点时不是主节点
+    missed: int = 0  # 上一次执行过久而错过的边界
+    last_boundary: Optional[datetime] = None
+    last_started: Optional[datetime] = None
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    last_result: Any = None
+    last_error: Optional[str] = None
+
+    def record(self, boundary: datetime, started: datetime, lag: float, duration: float) -> None:
+        self.last_boundary, self.last_started = boundary, started
+        self.last_lag, self.max_lag = lag, max(self.max_lag, lag)
+        self.last_duration, self.max_duration = duration, max(self.max_duration, duration)
+        self.total_duration += duration
+
+    def as_dict(self) -> Dict[str, Any]:
+        executed = self.runs + self.failures
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "missed": self.missed,
+            "last_boundary": self.last_boundary.isoformat() if self.last_boundary else None,
+            "last_started": self.last_started.isoformat() if self.last_started else None,
+            "last_duration_seconds": round(self.last_duration, 4),
+            "avg_duration_seconds": round(self.total_duration / executed, 4) if executed else 0.0,
+            "max_duration_seconds": round(self.max_duration, 4),
+            "last_lag_seconds": round(self.last_lag, 4),
+            "max_lag_seconds": round(self.max_lag, 4),
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+@dataclass
+class Job:
+    """定时任务：`func(db, boundary)` 在每个边界之后 `delay` 秒执行。"""
+
+    name: str
+    interval: float
+    func: Callable[[Session, datetime], Any]
+    delay: float = 0.0
+    stats: JobStats = field(default_factory=JobStats)
+
+
+class Scheduler:
+    """选主 + 定时任务调度；所有 worker 运行同一份任务表，只有租约持有者执行。"""
+
+    def __init__(self, lease_name: str, lease_ttl: float) -> None:
+        self.lease_name = lease_name
+        self.lease_ttl = lease_ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self.leader_since: Optional[datetime] = None
+        self.lease_expires_at: Optional[datetime] = None
+        self.leadership_changes = 0
+        self._session_factory: Optional[Callable[[], Session]] = None
+
+    def add_job(self, name: str, interval: float, func: Callable[[Session, datetime], Any], delay: float = 0.0) -> Job:
+        job = Job(name=name, interval=interval, func=func, delay=delay)
+        self.jobs[name] = job
+        return job
+
+    def leading(self) -> bool:
+        """当前是否持有未过期的租约（续约失败时租约到期前仍可执行）。"""
+
+        return self.is_leader and self.lease_expires_at is not None and datetime.now() < self.lease_expires_at
+
+    # -- 租约维护 ----------------------------------------------------------
+
+    def _renew(self) -> None:
+        db = self._session_factory()
+        try:
+            now = datetime.now()
+            acquired = acquire_lease(db, self.lease_name, self.holder, self.lease_ttl, now)
+        finally:
+            db.close()
+        if acquired != self.is_leader:
+            self.leadership_changes += 1
+            self.leader_since = now if acquired else None
+            logger.info("后台任务租约 %s：%s %s", self.lease_name, self.holder, "成为主节点" if acquired else "失去主节点")
+        self.is_leader = acquired
+        if acquired:
+            self.lease_expires_at = now + timedelta(seconds=self.lease_ttl)
+
+    def _release(self) -> None:
+        if not self.is_leader:
+            return
+        db = self._session_factory()
+        try:
+            release_lease(db, self.lease_name, self.holder)
+        except Exception:  # pragma: no cover - 退出时释放失败只会延迟接管
+            logger.exception("释放后台任务租约失败")
+        finally:
+            db.close()
+        self.is_leader = False
+        self.lease_expires_at = None
+
+    async def _lease_loop(self) -> None:
+        try:
+            while True:
+                try:
+                    await asyncio.to_thread(self._renew)
+                except Exception:  # pragma: no cover - 数据库不可用时等待下次续约
+                    logger.exception("后台任务租约续约失败")
+                await asyncio.sleep(self.lease_ttl / 3)
+        finally:
+            self._release()
+
+    # -- 任务执行 ----------------------------------------------------------
+
+    def _execute(self, job: Job, boundary: datetime) -> Any:
+        db = self._session_factory()
+        try:
+            return job.func(db, boundary)
+        finally:
+            db.close()
+
+    async def _job_loop(self, job: Job) -> None:
+        boundary = next_boundary(datetime.now(), job.interval)
+        while True:
+            planned = boundary + timedelta(seconds=job.delay)
+            await asyncio.sleep(max((planned - datetime.now()).total_seconds(), 0.0))
+            stats = job.stats
+            if not self.leading():
+                stats.skipped += 1
+            else:
+                started = datetime.now()
+                clock = time.perf_counter()
+                try:
+                    stats.last_result = await asyncio.to_thread(self._execute, job, boundary)
+                    stats.runs += 1
+                    stats.last_error = None
+                except Exception as exc:  # pragma: no cover - 单次失败不影响后续调度
+                    stats.failures += 1
+                    stats.last_error = repr(exc)
+                    logger.exception("后台任务 %s 执行失败（边界 %s）", job.name, boundary)
+                stats.record(boundary, started, (started - planned).total_seconds(), time.perf_counter() - clock)
+            following = next_boundary(max(boundary, datetime.now() - timedelta(seconds=job.delay)), job.interval)
+            stats.missed += max(int((following - boundary).total_seconds() // job.interval) - 1, 0)
+            boundary = following
+
+    async def run(self, session_factory: Callable[[], Session]) -> None:
+        """租约维护与全部任务的主循环（在 FastAPI lifespan 中启动，取消时释放租约）。"""
+
+        self._session_factory = session_factory
+        await asyncio.gather(self._lease_loop(), *(self._job_loop(job) for job in self.jobs.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lease": self.lease_name,
+            "holder": self.holder,
+            "is_leader": self.leading(),
+            "leader_since": self.leader_since.isoformat() if self.leader_since else None,
+            "lease_expires_at": self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            "leadership_changes": self.leadership_changes,
+            "jobs": {name: job.stats.as_dict() for name, job in self.jobs.items()},
+        }
+
+
+scheduler = Scheduler("background", settings.scheduler_lease_ttl_seconds)
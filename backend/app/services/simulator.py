@@ -0,0 +1,145 @@
+"""用电模拟器：按电器的开机时长生成每个 30 分钟时段的用电记录。
+
+- 电器开关时（`Appliance.is_on` 变化，ORM 属性事件）记录开机时间 `on_since`，
+  关机时把这次开机的秒数累加到 `on_seconds`；
+- 每个时段结束后由调度器（见 `app.services.scheduler`）调用 `simulate_slot`：
+  一次查询取出全部电器的功率与开机记账，用 NumPy 算出每台电器在该时段内的开机秒数，
+  `np.bincount` 按账户求和得到用电量，再以一条多行 INSERT 写入 `consumption_data`；
+  已有实测数据（批量写入接口）的账户时段不覆盖，同一时段重复执行也不会重复写入；
+- 写入的同一事务内结算：`on_seconds` 扣除已计入的部分，仍在运行的电器 `on_since` 移到时段终点。
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import numpy as np
+from sqlalchemy import bindparam, event, func, literal, literal_column, select, update
+from sqlalchemy.orm import Session
+
+from app.models.appliance import Appliance
+from app.models.consumption_data import ConsumptionData
+from app.services.bucketing import MIN_BUCKET_SECONDS, rows_to_array
+from app.services.response_cache import response_cache
+from app.services.rollups import refresh_rollups
+
+SLOT_SECONDS = MIN_BUCKET_SECONDS
+
+
+@event.listens_for(Appliance.is_on, "set", active_history=True)
+def _track_on_time(target: Appliance, value, oldvalue, initiator) -> None:
+    was_on = oldvalue is True  # 新建对象时 oldvalue 为 NO_VALUE
+    if bool(value) == was_on:
+        return
+    now = datetime.now()
+    target.version = (target.version or 0) + 1
+    if value:
+        target.on_since = now
+        return
+    if target.on_since is not None:
+        target.on_seconds = (target.on_seconds or 0.0) + max((now - target.on_since).total_seconds(), 0.0)
+    target.on_since = None
+
+
+def elapsed_seconds(dialect_name: str, column, now: datetime):
+    """SQL 表达式：`column` 到 `now` 的秒数（供 Core UPDATE 在关机时累加开机时长）。"""
+
+    if dialect_name == "sqlite":
+        return (func.julianday(literal(now)) - func.julianday(column)) * 86400.0
+    if dialect_name in ("mysql", "mariadb"):
+        return func.timestampdiff(literal_column("MICROSECOND"), column, literal(now)) / 1e6
+    if dialect_name == "postgresql":
+        return func.extract("epoch", literal(now) - column)
+    raise NotImplementedError(f"不支持的数据库方言: {dialect_name}")
+
+
+def _insert_missing_statement(dialect_name: str):
+    """多行 INSERT，`(account_id, timestamp)` 已存在时跳过。"""
+
+    table = ConsumptionData.__table__
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+
+        return insert(table).on_conflict_do_nothing(index_elements=["account_id", "timestamp"])
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        return insert(table).on_conflict_do_nothing(index_elements=["account_id", "timestamp"])
+    if dialect_name in ("mysql", "mariadb"):
+        from sqlalchemy import insert
+
+        return insert(table).prefix_with("IGNORE")
+    raise NotImplementedError(f"不支持的数据库方言: {dialect_name}")
+
+
+def slot_on_seconds(
+    since: np.ndarray, pending: np.ndarray, start: datetime, end: datetime
+) -> np.ndarray:
+    """每台电器在 `[start, end)` 内的开机秒数。
+
+    `since` 为开机时间（`datetime64[us]`，关机为 NaT），`pending` 为未结算的已关机秒数；
+    错过的时段（服务停机）无法还原分布，结果截断到一个时段长度。
+    """
+
+    running = ~np.isnat(since)
+    since = np.where(running, since, np.datetime64(end, "us"))
+    seconds = (np.datetime64(end, "us") - np.maximum(since, np.datetime64(start, "us"))) / np.timedelta64(1, "s")
+    return np.clip(pending + np.clip(seconds, 0.0, None), 0.0, (end - start).total_seconds())
+
+
+def simulate_slot(db: Session, end: datetime) -> Dict[str, Any]:
+    """写入以 `end` 结束的时段的用电记录并结算开机时长（提交事务）。"""
+
+    started = time.perf_counter()
+    start = end - timedelta(seconds=SLOT_SECONDS)
+    rows = db.execute(
+        select(Appliance.id, Appliance.account_id, Appliance.power_rating_kw, Appliance.on_seconds, Appliance.on_since)
+        .order_by(Appliance.id)
+        .with_for_update()
+    ).all()
+    if not rows:
+        db.rollback()
+        return {"slot": start.isoformat(), "appliances": 0, "accounts": 0, "kwh": 0.0}
+
+    numeric = rows_to_array([(row[0], row[1], row[2] or 0.0, row[3] or 0.0) for row in rows], 4)
+    appliance_ids, account_ids = numeric[:, 0].astype(np.int64), numeric[:, 1].astype(np.int64)
+    power, pending = numeric[:, 2], numeric[:, 3]
+    since = np.array([row[4] for row in rows], dtype="datetime64[us]")
+
+    seconds = slot_on_seconds(since, pending, start, end)
+    accounts, inverse = np.unique(account_ids, return_inverse=True)
+    kwh = np.round(np.bincount(inverse, weights=power * seconds / 3600, minlength=accounts.size), 3)
+    compute_seconds = time.perf_counter() - started
+
+    accounts_list = accounts.tolist()
+    db.execute(
+        _insert_missing_statement(db.get_bind().dialect.name),
+        [{"account_id": account, "timestamp": start, "total_kwh": value} for account, value in zip(accounts_list, kwh.tolist())],
+    )
+
+    settled = np.flatnonzero(pending > 0)
+    if settled.size:
+        table = Appliance.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("appliance_id"))
+            .values(on_seconds=table.c.on_seconds - bindparam("settled_seconds")),
+            [
+                {"appliance_id": appliance, "settled_seconds": value}
+                for appliance, value in zip(appliance_ids[settled].tolist(), pending[settled].tolist())
+            ],
+        )
+    db.execute(
+        update(Appliance.__table__).where(Appliance.__table__.c.on_since < end).values(on_since=end)
+    )
+    refresh_rollups(db, accounts_list, start, start)
+    db.commit()
+    # Core 语句不触发 ORM 事件，需显式递增账户版本号
+    response_cache.versions.bump_many(accounts_list)
+    return {
+        "slot": start.isoformat(),
+        "appliances": len(rows),
+        "accounts": len(accounts_list),
+        "kwh": round(float(kwh.sum()), 3),
+        "compute_seconds": round(compute_seconds, 4),
+    }
@@ -0,0 +1,151 @@
+"""确定性的模拟用电数据：按电器类型的日负荷曲线合成 30 分钟用电量。
+
+- 每种电器类型有一条 48 个时段的"运行比例"曲线（该时段内平均有多大比例的时间在运行），
+  再叠加季节系数（空调夏季、暖气冬季）、周末系数与随机波动；
+- 账户的用电量 = Σ 电器运行比例 × 额定功率 × 0.5 小时；
+- 随机数以 `(seed, 账户序号)` 为种子，同一参数下结果与分批方式无关，可完全复现。
+
+`scripts/generate_synthetic.py` 用它批量生成压测数据；仪表盘在账户没有真实数据时
+用 `expected_slot_kwh`（不含随机波动）绘制示意曲线。
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.models.appliance import ApplianceType
+from app.services.bucketing import MIN_BUCKET_SECONDS
+
+SLOTS_PER_DAY = 86400 // MIN_BUCKET_SECONDS
+SLOT_HOURS = MIN_BUCKET_SECONDS / 3600
+
+
+def _curve(points: Dict[float, float]) -> np.ndarray:
+    """按小时给出关键点，线性插值成 48 个时段（首尾按 24 小时循环）。"""
+
+    hours = np.array(sorted(points))
+    values = np.array([points[hour] for hour in hours])
+    slot_hours = np.arange(SLOTS_PER_DAY) * SLOT_HOURS + SLOT_HOURS / 2
+    return np.interp(slot_hours, hours, values, period=24)
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """一种电器类型的负荷特征。"""
+
+    name: str
+    power_kw: Tuple[float, float]  # 额定功率范围
+    duty: np.ndarray  # 48 个时段的运行比例
+    summer: float  # 7 月份的季节系数
+    winter: float  # 1 月份的季节系数
+    weekend: float  # 周末系数
+    noise: float  # 对数正态波动的标准差
+
+
+LOAD_PROFILES: Dict[ApplianceType, LoadProfile] = {
+    ApplianceType.ac: LoadProfile(
+        "空调", (1.0, 3.5), _curve({0: 0.35, 6: 0.2, 9: 0.1, 14: 0.35, 19: 0.6, 22: 0.55}), 1.6, 0.1, 1.3, 0.35
+    ),
+    ApplianceType.fridge: LoadProfile(
+        "冰箱", (0.1, 0.3), _curve({0: 0.3, 8: 0.35, 13: 0.4, 19: 0.45, 23: 0.35}), 1.2, 0.9, 1.05, 0.1
+    ),
+    ApplianceType.light: LoadProfile(
+        "照明", (0.05, 0.4), _curve({0: 0.05, 5: 0.02, 7: 0.4, 9: 0.05, 17: 0.3, 20: 0.9, 23: 0.3}), 0.8, 1.2, 1.1, 0.2
+    ),
+    ApplianceType.tv: LoadProfile(
+        "电视", (0.1, 0.3), _curve({0: 0.05, 6: 0.0, 12: 0.2, 18: 0.4, 20: 0.8, 23: 0.2}), 1.0, 1.1, 1.5, 0.3
+    ),
+    ApplianceType.heater: LoadProfile(
+        "热水器", (1.5, 3.0), _curve({0: 0.05, 6: 0.15, 7: 0.5, 9: 0.1, 18: 0.2, 21: 0.6, 23: 0.1}), 0.6, 1.8, 1.2, 0.3
+    ),
+    ApplianceType.other: LoadProfile(
+        "其他", (0.1, 1.0), _curve({0: 0.05, 8: 0.15, 12: 0.2, 18: 0.25, 22: 0.1}), 1.0, 1.0, 1.2, 0.4
+    ),
+}
+_TYPES: List[ApplianceType] = list(LOAD_PROFILES)
+_DUTY = np.stack([LOAD_PROFILES[kind].duty for kind in _TYPES])  # [类型, 48]
+
+
+def _seasonal(kinds: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """`[电器, 天]` 的季节系数：以年内日序做余弦插值，7 月中旬取 summer，1 月中旬取 winter。"""
+
+    day_of_year = (days - days.astype("datetime64[Y]")).astype(np.int64)
+    summerness = (1 - np.cos(2 * np.pi * (day_of_year - 15) / 365.25)) / 2  # 1 月中旬 0，7 月中旬 1
+    summer = np.array([LOAD_PROFILES[_TYPES[kind]].summer for kind in kinds])[:, None]
+    winter = np.array([LOAD_PROFILES[_TYPES[kind]].winter for kind in kinds])[:, None]
+    return winter + (summer - winter) * summerness[None, :]
+
+
+def _weekend(kinds: np.ndarray, days: np.ndarray) -> np.ndarray:
+    is_weekend = ~np.is_busday(days)
+    factor = np.array([LOAD_PROFILES[_TYPES[kind]].weekend for kind in kinds])[:, None]
+    return np.where(is_weekend[None, :], factor, 1.0)
+
+
+def _day_range(start: date, days: int) -> np.ndarray:
+    return np.datetime64(start, "D") + np.arange(days)
+
+
+@dataclass(frozen=True)
+class SyntheticAppliance:
+    type: ApplianceType
+    name: str
+    power_kw: float
+
+
+def draw_appliances(rng: np.random.Generator, count: int) -> List[SyntheticAppliance]:
+    """随机选择电器：每户一台冰箱，其余按常见程度抽取类型与功率。"""
+
+    others = [kind for kind in _TYPES if kind is not ApplianceType.fridge]  # ac, light, tv, heater, other
+    picks = rng.choice(len(others), size=max(count - 1, 0), p=[0.3, 0.25, 0.15, 0.1, 0.2])
+    kinds = [ApplianceType.fridge] + [others[pick] for pick in picks.tolist()]
+    appliances = []
+    for index, kind in enumerate(kinds[:count]):
+        profile = LOAD_PROFILES[kind]
+        power = round(float(rng.uniform(*profile.power_kw)), 2)
+        appliances.append(SyntheticAppliance(kind, f"{profile.name}{index + 1}", power))
+    return appliances
+
+
+def _type_index(appliances: Sequence[SyntheticAppliance]) -> np.ndarray:
+    return np.array([_TYPES.index(ApplianceType(appliance.type)) for appliance in appliances], dtype=np.int64)
+
+
+def synthesize_usage(
+    rng: np.random.Generator, appliances: Sequence[SyntheticAppliance], start: date, days: int
+) -> np.ndarray:
+    """一个账户从 `start` 零点起 `days` 天的 30 分钟用电量（kWh），形状 `[days * 48]`。"""
+
+    if not appliances:
+        return np.zeros(days * SLOTS_PER_DAY)
+    kinds = _type_index(appliances)
+    calendar = _day_range(start, days)
+    daily = _seasonal(kinds, calendar) * _weekend(kinds, calendar)  # [电器, 天]
+    sigma = np.array([LOAD_PROFILES[_TYPES[kind]].noise for kind in kinds])[:, None, None]
+    wobble = rng.lognormal(-sigma ** 2 / 2, sigma, size=(len(kinds), days, SLOTS_PER_DAY))
+    duty = np.clip(_DUTY[kinds][:, None, :] * daily[:, :, None] * wobble, 0.0, 1.0)
+    power = np.array([appliance.power_kw for appliance in appliances])
+    return np.einsum("adt,a->dt", duty, power * SLOT_HOURS).reshape(-1)
+
+
+def expected_slot_kwh(appliances: Sequence[SyntheticAppliance], start: datetime, slots: int) -> np.ndarray:
+    """不含随机波动的期望用电量：从 `start`（已对齐到 30 分钟）起 `slots` 个时段。"""
+
+    if not appliances or slots <= 0:
+        return np.zeros(max(slots, 0))
+    offset = (start.hour * 60 + start.minute) // 30
+    absolute = offset + np.arange(slots)
+    kinds = _type_index(appliances)
+    calendar = _day_range(start.date(), int(absolute[-1]) // SLOTS_PER_DAY + 1)
+    daily = _seasonal(kinds, calendar) * _weekend(kinds, calendar)
+    duty = np.clip(_DUTY[kinds][:, absolute % SLOTS_PER_DAY] * daily[:, absolute // SLOTS_PER_DAY], 0.0, 1.0)
+    power = np.array([appliance.power_kw for appliance in appliances])
+    return (power * SLOT_HOURS) @ duty
+
+
+def account_rng(seed: int, account_index: int) -> np.random.Generator:
+    """每个账户独立的随机数流：与生成顺序、分批大小无关。"""
+
+    return np.random.default_rng([seed, account_index])
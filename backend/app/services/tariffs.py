@@ -0,0 +1,311 @@
+"""分时电价引擎：电价方案编译为半小时价格表，账单计算向量化。
+
+- 方案（峰 / 平 / 谷时段，工作日 / 节假日两套）编译为 `[2, 48]` 的价格表，
+  第 0 行为工作日，第 1 行为周末及节假日，每列对应一天中的一个 30 分钟时段；
+- 计费时读出区间内每个 30 分钟时段的用电量（整天部分读逐时段日汇总表
+  `consumption_daily_slots`，只有不足一天的首尾、通常是今天，才查原始数据），
+  再按日期类型与时段号查表得到每个时段的单价，整段账单就是一次 `np.dot`；
+- 未绑定方案的账户使用默认时段（峰 18:00-22:00，谷 00:00-07:00）与账户自身
+  的 `peak_rate` / `valley_rate`，平段取两者平均；
+- 编译结果与节假日列表缓存在进程内，方案或节假日变更时通过 ORM 事件失效。
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.consumption_data import ConsumptionData
+from app.models.electricity_account import ElectricityAccount
+from app.models.tariff import TariffHoliday, TariffSchedule
+from app.schemas.tariff import TariffTable, parse_window
+from app.services.bucketing import MIN_BUCKET_SECONDS, bucket_expression, rows_to_array
+from app.services.rollups import ceil_day, daily_slot_usage, floor_day
+
+SLOTS_PER_DAY = 86400 // MIN_BUCKET_SECONDS
+_SLOT = timedelta(seconds=MIN_BUCKET_SECONDS)
+
+# 时段编码，即 CompiledTariff.rates 的下标
+VALLEY, FLAT, PEAK = 0, 1, 2
+PERIOD_NAMES = ("valley", "flat", "peak")
+
+# 未绑定方案时的默认时段（与原先硬编码的电价时段一致）
+DEFAULT_WINDOWS: Mapping[str, Tuple[str, ...]] = {"peak": ("18:00-22:00",), "valley": ("00:00-07:00",)}
+DEFAULT_TARIFF_NAME = "默认峰谷电价"
+
+WORKDAY, HOLIDAY = 0, 1
+
+
+@dataclass(frozen=True)
+class CompiledTariff:
+    """编译后的电价方案；`periods` / `prices` 形状均为 `[2, 48]`。"""
+
+    schedule_id: Optional[int]
+    name: str
+    rates: np.ndarray
+    periods: np.ndarray
+    prices: np.ndarray
+
+    def slot_of(self, moment: datetime, holidays: FrozenSet[date]) -> Tuple[int, int]:
+        """某一时刻对应的 (日期类型, 时段号)。"""
+
+        return _day_kind(moment.date(), holidays), (moment.hour * 60 + moment.minute) * 60 // MIN_BUCKET_SECONDS
+
+    def period_at(self, moment: datetime, holidays: FrozenSet[date]) -> str:
+        return PERIOD_NAMES[int(self.periods[self.slot_of(moment, holidays)])]
+
+    def price_at(self, moment: datetime, holidays: FrozenSet[date]) -> float:
+        return float(self.prices[self.slot_of(moment, holidays)])
+
+    def table(self) -> TariffTable:
+        return TariffTable(
+            schedule_id=self.schedule_id,
+            name=self.name,
+            workday=self.prices[WORKDAY].round(4).tolist(),
+            holiday=self.prices[HOLIDAY].round(4).tolist(),
+            workday_periods=[PERIOD_NAMES[code] for code in self.periods[WORKDAY].tolist()],
+            holiday_periods=[PERIOD_NAMES[code] for code in self.periods[HOLIDAY].tolist()],
+            rates={name: round(float(rate), 4) for name, rate in zip(PERIOD_NAMES, self.rates)},
+        )
+
+
+def compile_windows(windows: Optional[Mapping[str, Iterable[str]]]) -> np.ndarray:
+    """`{"peak": [...], "valley": [...]}` -> 48 个时段的编码；未覆盖的时段为平段。
+
+    谷段先写、峰段后写，两者重叠时按峰段计费。
+    """
+
+    periods = np.full(SLOTS_PER_DAY, FLAT, dtype=np.int8)
+    windows = windows or {}
+    for name, code in (("valley", VALLEY), ("peak", PEAK)):
+        for window in windows.get(name) or ():
+            start, end = parse_window(window)
+            if start < end:
+                periods[start:end] = code
+            else:  # 跨零点
+                periods[start:] = code
+                periods[:end] = code
+    return periods
+
+
+def _compile(
+    schedule_id: Optional[int],
+    name: str,
+    rates: Tuple[float, float, float],
+    weekday_windows: Optional[Mapping[str, Iterable[str]]],
+    holiday_windows: Optional[Mapping[str, Iterable[str]]],
+) -> CompiledTariff:
+    workday = compile_windows(weekday_windows)
+    holiday = compile_windows(holiday_windows) if holiday_windows else workday
+    periods = np.stack([workday, holiday])
+    rate_array = np.asarray(rates, dtype=np.float64)
+    for array in (periods, rate_array):
+        array.flags.writeable = False  # 编译结果在线程间共享
+    prices = rate_array[periods]
+    prices.flags.writeable = False
+    return CompiledTariff(schedule_id, name, rate_array, periods, prices)
+
+
+def compile_schedule(schedule: TariffSchedule) -> CompiledTariff:
+    rates = (float(schedule.valley_rate), float(schedule.flat_rate), float(schedule.peak_rate))
+    return _compile(schedule.id, schedule.name, rates, schedule.weekday_windows, schedule.holiday_windows)
+
+
+@lru_cache(maxsize=256)
+def _default_tariff(peak_rate: float, valley_rate: float) -> CompiledTariff:
+    rates = (valley_rate, (peak_rate + valley_rate) / 2, peak_rate)
+    return _compile(None, DEFAULT_TARIFF_NAME, rates, DEFAULT_WINDOWS, None)
+
+
+def default_tariff(account: ElectricityAccount) -> CompiledTariff:
+    """未绑定方案的账户：账户自身的峰 / 谷电价 + 默认时段。"""
+
+    return _default_tariff(float(account.peak_rate or 0), float(account.valley_rate or 0))
+
+
+_compiled: TTLCache[CompiledTariff] = TTLCache(maxsize=256, ttl=settings.tariff_cache_ttl_seconds)
+_holidays: TTLCache[FrozenSet[date]] = TTLCache(maxsize=1, ttl=settings.tariff_cache_ttl_seconds)
+
+
+def tariff_for(db: Session, account: ElectricityAccount) -> CompiledTariff:
+    """账户当前使用的电价方案（编译结果带缓存）。"""
+
+    schedule_id = account.tariff_schedule_id
+    if schedule_id is None:
+        return default_tariff(account)
+    compiled = _compiled.get(schedule_id)
+    if compiled is None:
+        schedule = db.get(TariffSchedule, schedule_id)
+        if schedule is None:
+            return default_tariff(account)
+        compiled = compile_schedule(schedule)
+        _compiled.set(schedule_id, compiled)
+    return compiled
+
+
+def load_holidays(db: Session) -> FrozenSet[date]:
+    """全部登记的节假日（表很小，整表缓存）。"""
+
+    holidays = _holidays.get("all")
+    if holidays is None:
+        holidays = frozenset(db.execute(select(TariffHoliday.day)).scalars())
+        _holidays.set("all", holidays)
+    return holidays
+
+
+def _day_kind(day: date, holidays: FrozenSet[date]) -> int:
+    return HOLIDAY if day.weekday() >= 5 or day in holidays else WORKDAY
+
+
+def day_kinds(first_day: date, days: int, holidays: FrozenSet[date]) -> np.ndarray:
+    """从 `first_day` 起连续 `days` 天的日期类型（WORKDAY / HOLIDAY），周末与节假日均为 HOLIDAY。"""
+
+    dates = np.datetime64(first_day, "D") + np.arange(days)
+    return (~np.is_busday(dates, holidays=sorted(holidays))).astype(np.int8)
+
+
+def slot_prices(
+    tariff: CompiledTariff, start: datetime, slots: int, holidays: FrozenSet[date]
+) -> np.ndarray:
+    """从 `start`（已对齐到 30 分钟）起连续 `slots` 个时段的单价。"""
+
+    if slots <= 0:
+        return np.zeros(0)
+    offset = (start.hour * 60 + start.minute) * 60 // MIN_BUCKET_SECONDS
+    absolute = offset + np.arange(slots)
+    kinds = day_kinds(start.date(), int(absolute[-1]) // SLOTS_PER_DAY + 1, holidays)
+    return tariff.prices[kinds[absolute // SLOTS_PER_DAY], absolute % SLOTS_PER_DAY]
+
+
+def floor_slot(moment: datetime) -> datetime:
+    return moment.replace(minute=moment.minute - moment.minute % 30, second=0, microsecond=0)
+
+
+def _raw_slot_usage(db: Session, account_id: int, start: datetime, end: datetime) -> np.ndarray:
+    """从原始数据按 30 分钟时段聚合 `[start, end)` 的用电量，`start` 需对齐到 30 分钟。"""
+
+    slots = -(-(end - start) // _SLOT)
+    if slots <= 0:
+        return np.zeros(0)
+    slot = bucket_expression(db.get_bind().dialect.name, ConsumptionData.timestamp, start, MIN_BUCKET_SECONDS)
+    rows = db.execute(
+        select(slot, func.sum(ConsumptionData.total_kwh))
+        .where(
+            ConsumptionData.account_id == account_id,
+            ConsumptionData.timestamp >= start,
+            ConsumptionData.timestamp < end,
+        )
+        .group_by(slot)
+    ).all()
+    usage = np.zeros(slots)
+    if rows:
+        data = rows_to_array(rows, 2)
+        usage[data[:, 0].astype(np.int64)] = data[:, 1]
+    return usage
+
+
+def load_slot_usage(db: Session, account_id: int, start: datetime, end: datetime) -> np.ndarray:
+    """`[start, end)` 内每个 30 分钟时段的用电量（kWh），`start` 需对齐到 30 分钟。
+
+    其中的整天读逐时段日汇总表，首尾不足一天的部分读原始数据。
+    """
+
+    first_day, last_day = ceil_day(start), floor_day(end)
+    if first_day >= last_day:
+        return _raw_slot_usage(db, account_id, start, end)
+    return np.concatenate([
+        _raw_slot_usage(db, account_id, start, first_day),
+        daily_slot_usage(db, account_id, first_day, (last_day - first_day).days),
+        _raw_slot_usage(db, account_id, last_day, end),
+    ])
+
+
+@dataclass
+class Bill:
+    """一段时间内逐时段的用电量与单价。"""
+
+    start: datetime
+    usage: np.ndarray
+    prices: np.ndarray
+
+    def _first(self, since: Optional[datetime]) -> int:
+        return 0 if since is None else max(int((floor_slot(since) - self.start) / _SLOT), 0)
+
+    def cost(self, since: Optional[datetime] = None) -> float:
+        """总电费；`since` 给定时只计该时刻（向下取整到 30 分钟）之后的部分。"""
+
+        first = self._first(since)
+        return float(np.dot(self.usage[first:], self.prices[first:]))
+
+    def kwh(self, since: Optional[datetime] = None) -> float:
+        """总用电量；`since` 的含义同 `cost`。"""
+
+        return float(self.usage[self._first(since):].sum())
+
+
+def bill_between(
+    db: Session,
+    account: ElectricityAccount,
+    start: datetime,
+    end: datetime,
+    tariff: Optional[CompiledTariff] = None,
+    holidays: Optional[FrozenSet[date]] = None,
+) -> Bill:
+    """计算 `[start, end)` 的账单（一条查询 + 一次查表）。"""
+
+    tariff = tariff or tariff_for(db, account)
+    holidays = load_holidays(db) if holidays is None else holidays
+    start = floor_slot(start)
+    usage = load_slot_usage(db, account.id, start, end)
+    return Bill(start, usage, slot_prices(tariff, start, usage.size, holidays))
+
+
+def cost_between(db: Session, account: ElectricityAccount, start: datetime, end: datetime) -> float:
+    return bill_between(db, account, start, end).cost()
+
+
+def slot_fractions(start: datetime, end: datetime) -> Tuple[datetime, np.ndarray]:
+    """`[start, end)` 覆盖的时段：返回 (第一个时段起点, 每个时段被覆盖的比例)。"""
+
+    first = floor_slot(start)
+    slots = -(-(end - first) // _SLOT)
+    fractions = np.ones(slots)
+    fractions[0] -= (start - first) / _SLOT
+    fractions[-1] -= (first + slots * _SLOT - end) / _SLOT
+    return first, fractions
+
+
+def projected_cost(
+    tariff: CompiledTariff, power_kw: float, start: datetime, end: datetime, holidays: FrozenSet[date]
+) -> float:
+    """以恒定功率 `power_kw` 从 `start` 用到 `end` 的电费（按时段单价逐段计算）。"""
+
+    if power_kw <= 0 or end <= start:
+        return 0.0
+    first, fractions = slot_fractions(start, end)
+    hours = fractions * (MIN_BUCKET_SECONDS / 3600)
+    return float(power_kw * np.dot(hours, slot_prices(tariff, first, fractions.size, holidays)))
+
+
+# ---------------------------------------------------------------------------
+# 缓存失效
+# ---------------------------------------------------------------------------
+
+
+@event.listens_for(TariffSchedule, "after_update")
+@event.listens_for(TariffSchedule, "after_delete")
+def _on_schedule_changed(mapper, connection, target: TariffSchedule) -> None:
+    _compiled.pop(target.id)
+
+
+@event.listens_for(TariffHoliday, "after_insert")
+@event.listens_for(TariffHoliday, "after_update")
+@event.listens_for(TariffHoliday, "after_delete")
+def _on_holiday_changed(mapper, connection, target: TariffHoliday) -> None:
+    _holidays.pop("all")
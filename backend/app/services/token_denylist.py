@@ -0,0 +1,179 @@
+"""Token 注销名单：Bloom 过滤器 + 精确集合。
+
+- 绝大多数请求携带的 Token 并未注销，Bloom 过滤器一次位运算即可判定"不在名单中"，
+  不访问数据库、不创建容器对象（`hash(str)` 会缓存在字符串对象上）；
+- 命中 Bloom 过滤器时再查精确集合，排除误判；
+- 注销记录持久化在 `revoked_tokens` 表，后台定期增量同步（多 worker 可见），
+  并在 Token 过期后从内存与数据库中清理；
+- 增量同步按 `revoked_at`（数据库时钟）而不是自增 id：多个 worker 并发写入时 id 的提交顺序
+  与大小不一致，按 id 水位会永久漏掉后提交的小 id。每次重新读取上次同步时间之前
+  `token_denylist_sync_overlap_seconds` 秒以来的记录，重复加入是幂等的。
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """基于 bytearray 的 Bloom 过滤器，使用双重哈希生成 k 个位置。"""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.size = bits
+        self.hashes = max(1, round(bits / capacity * math.log(2)))
+        self._bits = bytearray((bits + 7) // 8)
+
+    def add(self, key: str) -> None:
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, ((h >> 32) & 0xFFFFFFFF) | 1
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % self.size
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, ((h >> 32) & 0xFFFFFFFF) | 1
+        bits, size = self._bits, self.size
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+def _to_epoch(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _utc_naive(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+
+class TokenDenylist:
+    """进程内注销名单。"""
+
+    def __init__(self, capacity: int, error_rate: float, sync_overlap: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_overlap = timedelta(seconds=sync_overlap)
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._exact: Dict[str, float] = {}  # jti -> exp（epoch 秒）
+        # 上次同步开始时的数据库时间（与 revoked_at 的默认值同一时钟），None 表示全量加载
+        self._synced_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        """O(1) 判定：先查 Bloom 过滤器，命中后再查精确集合。"""
+
+        if jti not in self._bloom:
+            return False
+        return jti in self._exact
+
+    def add(self, jti: str, exp: float) -> None:
+        """加入内存名单（已过期的 Token 无需记录）。"""
+
+        if exp <= time.time():
+            return
+        with self._lock:
+            self._exact[jti] = exp
+            self._bloom.add(jti)
+            if len(self._exact) > self.capacity:
+                self._rebuild()
+
+    def revoke(self, db: Session, jti: str, exp: float, user_id: Optional[int] = None) -> None:
+        """持久化注销记录并立即在本进程生效。"""
+
+        self.add(jti, exp)
+        db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=_utc_naive(exp)))
+        try:
+            db.commit()
+        except IntegrityError:  # 重复注销同一 Token
+            db.rollback()
+
+    def _rebuild(self) -> None:
+        """重建 Bloom 过滤器（调用方持有锁）；容量不足时自动扩容。"""
+
+        capacity = max(self.capacity, len(self._exact) * 2)
+        self.capacity = capacity
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._exact:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def prune(self) -> int:
+        """移除已过期的条目，返回移除数量。"""
+
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, exp in self._exact.items() if exp <= now]
+            for jti in expired:
+                del self._exact[jti]
+            if expired:
+                self._rebuild()
+        return len(expired)
+
+    def sync(self, db: Session) -> int:
+        """从数据库加载其它 worker 写入的注销记录，并清理过期数据。
+
+        首次全量加载未过期的记录，之后只读取 `revoked_at` 不早于上次同步时间减去重叠窗口的记录。
+        """
+
+        now = _utc_naive(time.time())
+        started_at = db.execute(select(func.now())).scalar_one()
+        with self._lock:
+            since = self._synced_at
+        query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > now)
+        if since is not None:
+            query = query.filter(RevokedToken.revoked_at >= since - self.sync_overlap)
+        rows = query.all()
+        for jti, expires_at in rows:
+            self.add(jti, _to_epoch(expires_at))
+        with self._lock:
+            if self._synced_at is None or started_at > self._synced_at:
+                self._synced_at = started_at
+
+        self.prune()
+        db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+        db.commit()
+        return len(rows)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    async def run_sync_loop(self, session_factory: Callable[[], Session], interval: float) -> None:
+        """后台定期同步（在 FastAPI lifespan 中启动）。"""
+
+        def _sync_once() -> None:
+            db = session_factory()
+            try:
+                self.sync(db)
+            finally:
+                db.close()
+
+        while True:
+            try:
+                await asyncio.to_thread(_sync_once)
+            except Exception:  # pragma: no cover - 同步失败不影响请求处理
+                logger.exception("同步 Token 注销名单失败")
+            await asyncio.sleep(interval)
+
+
+token_denylist = TokenDenylist(
+    capacity=settings.token_denylist_capacity,
+    error_rate=settings.token_denylist_error_rate,
+    sync_overlap=settings.token_denylist_sync_overlap_seconds,
+)
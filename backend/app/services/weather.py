@@ -0,0 +1,299 @@
+"""按地区共享的天气服务：可插拔数据源 + 进程内 TTL 缓存 + 提前刷新 + 请求合并。
+
+- 地区由用户地址归一化得到（`region_of`：取到第一个"市"，如"浙江省杭州市西湖区" -> "杭州市"），
+  同一地区的所有用户共享一条观测；
+- 数据源由 `WEATHER_PROVIDER` 选择：`stub`（本地确定性模拟，不访问网络，用于开发 / 测试），
+  或 `包名.模块:类名` 指向实现了 `WeatherProvider.fetch` 的类；
+- 同一地区同一时刻只有一个拉取在进行，其余请求等待同一个 Future（请求合并），
+  一个城市的上万用户在每个周期只触发一次拉取；
+- 观测拉取后超过 TTL × `weather_refresh_ahead_ratio` 时，读取会在后台提前刷新，请求继续使用当前数据；
+- 拉取结果写入 `weather_data`；缓存未命中时先读该表，其他 worker 刚拉取过的观测直接复用；
+  数据源失败时返回最近一次的观测。
+"""
+
+import asyncio
+import importlib
+import logging
+import math
+import re
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.weather_data import WeatherData
+
+logger = logging.getLogger(__name__)
+
+# 可选的"省 / 自治区"前缀 + 到第一个"市"为止
+_REGION_PATTERN = re.compile(r"^(?:.+?(?:省|自治区))?(.+?市)")
+
+
+def region_of(address: Optional[str]) -> str:
+    """用户地址 -> 地区；无法识别时归入 `weather_default_region`。"""
+
+    match = _REGION_PATTERN.match(re.sub(r"\s+", "", address or ""))
+    return match.group(1)[:64] if match else settings.weather_default_region
+
+
+@dataclass(frozen=True)
+class Observation:
+    """一个地区的天气观测；`fetched_at` 由天气服务在拉取时填写。"""
+
+    region: str
+    observed_at: datetime
+    temperature_c: float
+    condition: str
+    humidity: float
+    fetched_at: Optional[datetime] = None
+
+
+class WeatherUnavailable(RuntimeError):
+    """数据源失败且没有可用的历史观测。"""
+
+
+class WeatherProvider:
+    """天气数据源接口：返回地区的当前观测，失败时抛出异常（会在线程池中调用）。"""
+
+    name = "base"
+
+    def fetch(self, region: str) -> Observation:
+        raise NotImplementedError
+
+
+class StubWeatherProvider(WeatherProvider):
+    """本地模拟数据源：按小时的正弦曲线 + 按地区名的固定温度偏移。"""
+
+    name = "stub"
+
+    def fetch(self, region: str) -> Observation:
+        now = datetime.now().replace(second=0, microsecond=0)
+        hour = now.hour
+        offset = zlib.crc32(region.encode("utf-8")) % 7 - 3
+        if hour > 18 or hour < 6:
+            condition = "晴朗"
+        elif 10 < hour < 16:
+            condition = "炎热"
+        else:
+            condition = "多云"
+        return Observation(
+            region=region,
+            observed_at=now,
+            temperature_c=round(22 + math.sin(hour / 12 * math.pi) * 8 + offset, 1),
+            condition=condition,
+            humidity=round(60 + math.cos(hour / 12 * math.pi) * 15, 0),
+        )
+
+
+_PROVIDERS: Dict[str, Callable[[], WeatherProvider]] = {"stub": StubWeatherProvider}
+
+
+def load_provider(spec: str) -> WeatherProvider:
+    """按名称（`stub`）或 `包名.模块:类名` 创建数据源。"""
+
+    if spec in _PROVIDERS:
+        return _PROVIDERS[spec]()
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"未知的天气数据源: {spec}")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+class WeatherService:
+    """按地区缓存天气观测；拉取在线程池中执行，同一地区的并发请求共享一次拉取。"""
+
+    def __init__(
+        self,
+        provider: WeatherProvider,
+        ttl: float,
+        refresh_ahead_ratio: float,
+        max_regions: int,
+        workers: int,
+        timeout: float,
+    ) -> None:
+        self.provider = provider
+        self.ttl = ttl
+        self.refresh_after = ttl * refresh_ahead_ratio
+        self.timeout = timeout
+        self._cache: TTLCache[Observation] = TTLCache(maxsize=max_regions, ttl=ttl)
+        # 最近一次观测（含已过期的），数据源失败时兜底
+        self._last: TTLCache[Observation] = TTLCache(maxsize=max_regions, ttl=24 * 3600)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weather")
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self.provider_fetches = 0
+        self.store_hits = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def bind(self, session_factory: Callable[[], Session]) -> None:
+        """设置会话工厂后，观测会写入 `weather_data` 并在未命中时从中读取。"""
+
+        self._session_factory = session_factory
+
+    def _age(self, observation: Observation) -> float:
+        return (datetime.now() - observation.fetched_at).total_seconds()
+
+    # -- weather_data --------------------------------------------------------
+
+    def _from_store(self, region: str) -> Optional[Observation]:
+        """其他 worker 最近拉取、尚未到提前刷新时间的观测。"""
+
+        db = self._session_factory()
+        try:
+            row = db.execute(
+                select(WeatherData).where(WeatherData.region == region).order_by(WeatherData.fetched_at.desc()).limit(1)
+            ).scalar_one_or_none()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        observation = Observation(
+            region=row.region,
+            observed_at=row.timestamp,
+            temperature_c=float(row.temperature_c),
+            condition=row.condition,
+            humidity=float(row.humidity),
+            fetched_at=row.fetched_at,
+        )
+        return observation if self._age(observation) < self.refresh_after else None
+
+    def _persist(self, observation: Observation) -> None:
+        db = self._session_factory()
+        try:
+            row = db.execute(
+                select(WeatherData).where(
+                    WeatherData.region == observation.region, WeatherData.timestamp == observation.observed_at
+                )
+            ).scalar_one_or_none()
+            if row is None:
+                db.add(
+                    WeatherData(
+                        region=observation.region,
+                        timestamp=observation.observed_at,
+                        temperature_c=observation.temperature_c,
+                        condition=observation.condition,
+                        humidity=observation.humidity,
+                        fetched_at=observation.fetched_at,
+                    )
+                )
+            else:
+                # 数据源尚未更新观测：只刷新拉取时间
+                row.fetched_at = observation.fetched_at
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # 其他 worker 同时写入了同一条观测
+        finally:
+            db.close()
+
+    # -- 拉取与合并 ----------------------------------------------------------
+
+    def _load(self, region: str, current: Optional[Observation]) -> Observation:
+        observation = self._from_store(region) if self._session_factory else None
+        if observation is not None and (current is None or observation.fetched_at > current.fetched_at):
+            self.store_hits += 1
+        else:
+            observation = replace(self.provider.fetch(region), region=region, fetched_at=datetime.now())
+            self.provider_fetches += 1
+            if self._session_factory:
+                try:
+                    self._persist(observation)
+                except Exception:  # pragma: no cover - 持久化失败不影响返回
+                    logger.exception("写入天气观测失败: %s", region)
+        self._cache.set(region, observation, ttl=max(self.ttl - self._age(observation), 1.0))
+        self._last.set(region, observation)
+        return observation
+
+    def _done(self, region: str, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(region) is future:
+                del self._inflight[region]
+        if not future.cancelled() and future.exception() is not None:
+            self.failures += 1
+            logger.warning("天气数据拉取失败 %s: %r", region, future.exception())
+
+    def _fetch(self, region: str, current: Optional[Observation]) -> Tuple[Future, bool]:
+        """返回该地区进行中的拉取，没有时提交一个；第二项表示是否为新提交。"""
+
+        with self._lock:
+            future = self._inflight.get(region)
+            if future is not None:
+                return future, False
+            future = self._executor.submit(self._load, region, current)
+            self._inflight[region] = future
+        future.add_done_callback(lambda done: self._done(region, done))
+        return future, True
+
+    def _lookup(self, region: str) -> Tuple[Optional[Observation], Optional[Future]]:
+        """命中缓存时返回观测（临近过期时顺带在后台刷新），否则返回需要等待的拉取。"""
+
+        observation = self._cache.get(region)
+        if observation is not None:
+            if self._age(observation) >= self.refresh_after:
+                _, submitted = self._fetch(region, observation)
+                self.refreshes += int(submitted)
+            return observation, None
+        future, submitted = self._fetch(region, self._last.get(region))
+        self.coalesced += int(not submitted)
+        return None, future
+
+    def _fallback(self, region: str, exc: BaseException) -> Observation:
+        stale = self._last.get(region)
+        if stale is None:
+            raise WeatherUnavailable(f"无法获取 {region} 的天气数据") from exc
+        return stale
+
+    def get(self, region: str) -> Observation:
+        """同步读取（在线程池中的路由使用），等待拉取最多 `timeout` 秒。"""
+
+        observation, future = self._lookup(region)
+        if observation is not None:
+            return observation
+        try:
+            return future.result(timeout=self.timeout)
+        except Exception as exc:
+            return self._fallback(region, exc)
+
+    async def aget(self, region: str) -> Observation:
+        """异步读取：等待拉取时不阻塞事件循环。"""
+
+        observation, future = self._lookup(region)
+        if observation is not None:
+            return observation
+        try:
+            # shield：一个请求超时不应取消其他请求共享的拉取
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except Exception as exc:
+            return self._fallback(region, exc)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name,
+            "regions": self._cache.stats(),
+            "inflight": len(self._inflight),
+            "provider_fetches": self.provider_fetches,
+            "store_hits": self.store_hits,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+
+weather_service = WeatherService(
+    load_provider(settings.weather_provider),
+    ttl=settings.weather_ttl_seconds,
+    refresh_ahead_ratio=settings.weather_refresh_ahead_ratio,
+    max_regions=settings.weather_cache_max_regions,
+    workers=settings.weather_fetch_workers,
+    timeout=settings.weather_fetch_timeout_seconds,
+)
@@ -0,0 +1 @@
+"""性能基准脚本（在 backend 目录下通过 `python -m benchmarks.<name>` 运行）。"""
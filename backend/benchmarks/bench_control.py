@@ -0,0 +1,127 @@
+"""电器控制并发基准：多个线程同时开关同一批电器，统计延迟分位数并检查是否丢失更新。
+
+每次实际改变状态的请求都使电器的 `version` 加 1，结束时各电器的 `version`
+应等于成功改变状态的请求数（不重复、不丢失）。默认使用临时 SQLite 文件，
+`--database-url` 可指向 MySQL / PostgreSQL 测试库（会在其中建表并写入测试数据）。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_control --threads 8 --requests 500 --appliances 4
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  注册全部模型
+from app.api.endpoints.appliances import _control_appliance
+from app.db.base import Base
+from app.models.appliance import Appliance, ApplianceType
+from app.models.electricity_account import ElectricityAccount
+from app.models.user import User
+from app.schemas.appliance import ApplianceControl
+
+
+def _setup(session_factory, appliances: int) -> int:
+    db = session_factory()
+    try:
+        user = User(username=f"bench{random.randrange(10 ** 9)}", password="-", address="杭州市")
+        db.add(user)
+        db.flush()
+        account = ElectricityAccount(user_id=user.id, account_number=user.username.upper())
+        db.add(account)
+        db.flush()
+        db.add_all(
+            Appliance(account_id=account.id, name=f"电器{index}", type=ApplianceType.other, power_rating_kw=1.0)
+            for index in range(appliances)
+        )
+        db.commit()
+        return account.id
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("--requests", type=int, default=500, help="每个线程的请求数")
+    parser.add_argument("--appliances", type=int, default=4, help="电器数量（越少冲突越多）")
+    parser.add_argument("--database-url", default=None, help="数据库地址（默认临时 SQLite 文件）")
+    args = parser.parse_args()
+
+    path = None
+    url = args.database_url
+    if url is None:
+        handle, path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        url = f"sqlite:///{path}"
+    engine = create_engine(url, connect_args={"timeout": 30} if url.startswith("sqlite") else {})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    account_id = _setup(session_factory, args.appliances)
+
+    db = session_factory()
+    account = db.get(ElectricityAccount, account_id)
+    appliance_ids = db.execute(select(Appliance.id).where(Appliance.account_id == account_id)).scalars().all()
+    db.expunge(account)
+    db.close()
+
+    latencies = [[] for _ in range(args.threads)]
+    changed: Counter = Counter()
+    outcomes: Counter = Counter()
+    lock = threading.Lock()
+
+    def worker(index: int) -> None:
+        rng = random.Random(index)
+        for _ in range(args.requests):
+            appliance_id = rng.choice(appliance_ids)
+            control = ApplianceControl(action=rng.choice(["ON", "OFF"]))
+            session = session_factory()
+            started = time.perf_counter()
+            try:
+                result = _control_appliance(session, account, appliance_id, control)
+                outcome = "changed" if result.changed else "unchanged"
+            except HTTPException as exc:
+                result, outcome = None, str(exc.status_code)
+            finally:
+                session.close()
+            latencies[index].append(time.perf_counter() - started)
+            with lock:
+                outcomes[outcome] += 1
+                if result is not None and result.changed:
+                    changed[appliance_id] += 1
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db = session_factory()
+    versions = dict(db.execute(select(Appliance.id, Appliance.version).where(Appliance.account_id == account_id)).all())
+    db.close()
+    engine.dispose()
+    if path:
+        os.remove(path)
+
+    samples = np.array([value for values in latencies for value in values]) * 1000
+    total = samples.size
+    print(f"{total} 次请求 / {elapsed:.2f}s = {total / elapsed:,.0f} 次/秒，结果 {dict(outcomes)}")
+    print(f"延迟 p50 {np.percentile(samples, 50):.2f}ms  p99 {np.percentile(samples, 99):.2f}ms  max {samples.max():.2f}ms")
+    lost = {appliance_id: (versions[appliance_id], changed[appliance_id]) for appliance_id in appliance_ids
+            if versions[appliance_id] != changed[appliance_id]}
+    print("版本号与成功改变状态的请求数一致，无丢失更新" if not lost else f"版本号不一致（实际, 期望）: {lost}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""负荷预测基准：批量拟合吞吐（单进程 / 进程池）与从缓存预测的单次耗时（不含数据库读写）。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_forecast --accounts 10000 --workers 4
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.forecasting import ForecastModel, ForecastStore, _fit_batch, fit_matrix
+from app.services.tariffs import SLOTS_PER_DAY, day_kinds
+
+
+def _synthetic(accounts: int, days: int, rng: np.random.Generator) -> np.ndarray:
+    """日周期（晚高峰）+ 周末偏移 + 噪声 + 5% 缺失的模拟数据，形状 [账户, 天, 48]。"""
+
+    hours = np.arange(SLOTS_PER_DAY) / 2
+    daily = 0.2 + 0.3 * ((hours >= 18) & (hours < 22))
+    weekend = (np.arange(days) % 7 >= 5)[:, None] * 0.1
+    scale = rng.uniform(0.5, 2, size=(accounts, 1, 1))
+    values = (daily + weekend) * scale + rng.normal(0, 0.03, size=(accounts, days, SLOTS_PER_DAY))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    return np.clip(values, 0, None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=10_000, help="账户数")
+    parser.add_argument("--days", type=int, default=settings.forecast_history_days, help="训练窗口（天）")
+    parser.add_argument("--batch", type=int, default=settings.forecast_batch_accounts, help="每批账户数")
+    parser.add_argument("--workers", type=int, default=4, help="进程池大小")
+    parser.add_argument("--requests", type=int, default=100_000, help="预测请求次数")
+    args = parser.parse_args()
+
+    values = _synthetic(args.accounts, args.days, np.random.default_rng(42))
+    kinds = day_kinds(datetime(2024, 1, 1).date(), args.days, frozenset())
+    batches = [values[index:index + args.batch] for index in range(0, args.accounts, args.batch)]
+    print(f"账户数 {args.accounts}，每账户 {args.days} 天 × {SLOTS_PER_DAY} 个时段，批大小 {args.batch}")
+
+    started = time.perf_counter()
+    coefficients = np.concatenate([fit_matrix(batch, kinds, settings.forecast_smoothing) for batch in batches])
+    elapsed = time.perf_counter() - started
+    print(f"单进程拟合：{elapsed:.2f}s，{args.accounts / elapsed:,.0f} 账户/秒")
+
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=get_context("spawn")) as pool:
+        list(pool.map(_fit_batch, batches[:args.workers], [kinds] * args.workers, [settings.forecast_smoothing] * args.workers))  # 预热
+        started = time.perf_counter()
+        futures = [pool.submit(_fit_batch, batch, kinds, settings.forecast_smoothing) for batch in batches]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+    print(f"进程池拟合（{args.workers} 进程）：{elapsed:.2f}s，{args.accounts / elapsed:,.0f} 账户/秒")
+    print(f"系数矩阵 {coefficients.shape}，{coefficients.nbytes / 1024 / 1024:.1f} MiB")
+
+    store = ForecastStore(maxsize=args.accounts, ttl=3600)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    store.put_many([ForecastModel(i, row, 0, now, now) for i, row in enumerate(coefficients)])
+    account_ids = np.random.default_rng(7).integers(0, args.accounts, size=args.requests).tolist()
+    started = time.perf_counter()
+    for account_id in account_ids:
+        store.peek(account_id).predict(now, SLOTS_PER_DAY, frozenset())
+    elapsed = time.perf_counter() - started
+    print(f"缓存命中的 24 小时预测：{elapsed / args.requests * 1e6:.1f} µs/次")
+
+
+if __name__ == "__main__":
+    main()
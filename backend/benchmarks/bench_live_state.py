@@ -0,0 +1,79 @@
+"""实时功率状态基准：内存占用（每 10 万台电器）与读取 / 增量更新的耗时。
+
+不访问数据库：直接按模拟的电器行填充 `LiveState`，再与"每次遍历电器列表求和"对比。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_live_state --accounts 20000 --appliances 5
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from app.models.appliance import ApplianceType
+from app.services.live_state import LiveState, _summarize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=20000, help="账户数")
+    parser.add_argument("--appliances", type=int, default=5, help="每户电器数")
+    parser.add_argument("--ops", type=int, default=200_000, help="读取 / 更新次数")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    kinds = list(ApplianceType)
+    accounts = {
+        account_id: [
+            (account_id * 100 + index, rng.choice(kinds), round(rng.uniform(0.05, 3.0), 2), rng.random() < 0.3)
+            for index in range(args.appliances)
+        ]
+        for account_id in range(1, args.accounts + 1)
+    }
+    appliances = args.accounts * args.appliances
+
+    tracemalloc.start()
+    state = LiveState()
+    for account_id, rows in accounts.items():
+        state._install(account_id, rows, _summarize(rows))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report = state.memory_report()
+    print(f"{args.accounts} 个账户 / {appliances} 台电器")
+    print(f"  实测（tracemalloc）：{current / 1024 / 1024:.1f} MiB，每 10 万台 {current / appliances * 100_000 / 1024 / 1024:.2f} MiB")
+    print(f"  memory_report 估算：每 10 万台 {report['bytes_per_100k_appliances'] / 1024 / 1024:.2f} MiB")
+
+    account_ids = [rng.randrange(1, args.accounts + 1) for _ in range(args.ops)]
+    started = time.perf_counter()
+    for account_id in account_ids:
+        state.totals(None, account_id)
+    read = (time.perf_counter() - started) / args.ops
+
+    started = time.perf_counter()
+    for account_id in account_ids:
+        rows = accounts[account_id]
+        sum(row[2] for row in rows if row[3]), sum(1 for row in rows if row[3])
+    scan = (time.perf_counter() - started) / args.ops
+
+    started = time.perf_counter()
+    for account_id in account_ids:
+        appliance_id = account_id * 100 + rng.randrange(args.appliances)
+        state.set_on(account_id, appliance_id, rng.random() < 0.5)
+    update = (time.perf_counter() - started) / args.ops
+
+    print(f"  读取汇总 {read * 1e6:.2f}µs / 次（遍历已加载的电器列表 {scan * 1e6:.2f}µs，且不含查询）")
+    print(f"  增量更新 {update * 1e6:.2f}µs / 次")
+
+    # 增量更新后的汇总应与按当前状态重新计算的结果一致
+    drifted = 0
+    for account_id, slot in state._accounts.items():
+        members = [state._index[row[0]] for row in accounts[account_id]]
+        rows = [(row[0], row[1], row[2], bool(state._on[member])) for row, member in zip(accounts[account_id], members)]
+        expected, actual = _summarize(rows), state._read(slot)
+        drifted += abs(expected.on_power - actual.on_power) > 1e-3 or expected.active_count != actual.active_count
+    print(f"  一致性：{drifted} 个账户与重新计算的结果不一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""密码哈希基准：测量单核与工作池下每秒可完成的登录校验次数。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_password_hashing --seconds 3 --workers 4
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import wait
+
+from app.core.passwords import PasswordContext, PasswordHashPool, Pbkdf2Hasher, ScryptHasher
+
+
+def _bench_single(context: PasswordContext, encoded: str, seconds: float) -> float:
+    count, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        context.verify("benchmark-password", encoded)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def _bench_pool(context: PasswordContext, encoded: str, seconds: float, workers: int) -> float:
+    pool = PasswordHashPool(context, workers=workers, queue_limit=workers * 4)
+    count, started = 0, time.perf_counter()
+    try:
+        while time.perf_counter() - started < seconds:
+            futures = [pool._submit(context.verify, "benchmark-password", encoded) for _ in range(workers * 4)]
+            wait(futures)
+            count += len(futures)
+    finally:
+        pool.shutdown()
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="每项测试持续时间（秒）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="工作池线程数")
+    args = parser.parse_args()
+
+    hashers = [ScryptHasher(), Pbkdf2Hasher()]
+    print(f"{'算法':<16}{'单核 次/秒':>14}{'工作池 次/秒':>16}{'每核 次/秒':>14}")
+    for hasher in hashers:
+        context = PasswordContext(hasher)
+        encoded = context.hash("benchmark-password")
+        single = _bench_single(context, encoded, args.seconds)
+        pooled = _bench_pool(context, encoded, args.seconds, args.workers)
+        print(f"{hasher.algorithm:<16}{single:>14.1f}{pooled:>16.1f}{pooled / args.workers:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""运维脚本（在 backend 目录下以 `python -m scripts.<name>` 运行）。"""
@@ -0,0 +1,38 @@
+"""对所有账户运行一次用电异常检测（与后台定期任务相同）。
+
+用法（在 backend 目录下）：
+    python -m scripts.detect_anomalies
+    python -m scripts.detect_anomalies --end 2024-06-30T00:00:00
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import app.models  # noqa: F401  注册全部模型
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.services.anomalies import detect_all_accounts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None, help="检测窗口终点（默认当前时间）")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        stats = detect_all_accounts(db, end=args.end)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    print(
+        f"检测完成：{stats['accounts']} 个账户，{stats['anomalies']} 个异常时段，"
+        f"耗时 {elapsed:.2f}s（{stats['accounts'] / elapsed:,.0f} 账户/秒）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""重新拟合所有账户的负荷预测模型（与后台定期任务相同）。
+
+用法（在 backend 目录下）：
+    python -m scripts.fit_forecasts
+    python -m scripts.fit_forecasts --workers 8 --now 2024-06-30T00:00:00
+"""
+
+import argparse
+from datetime import datetime
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.config import settings
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.services.forecasting import fit_all_accounts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.forecast_fit_workers, help="拟合进程数（0 为单进程）")
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None, help="以该时间为当前时间（默认当前时间）")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        stats = fit_all_accounts(db, now=args.now, workers=args.workers)
+    finally:
+        db.close()
+    print(
+        f"拟合完成：{stats['accounts']} 个账户，耗时 {stats['seconds']}s"
+        f"（{stats['accounts_per_sec']:,.0f} 账户/秒），训练数据截至 {stats['data_until']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
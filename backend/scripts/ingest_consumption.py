@@ -0,0 +1,69 @@
+"""从文件或标准输入批量导入用电数据（JSON 数组或 NDJSON）。
+
+用法（在 backend 目录下）：
+    python -m scripts.ingest_consumption data.ndjson
+    python -m scripts.ingest_consumption --format json data.json
+    simulator | python -m scripts.ingest_consumption -
+
+按 (account_id, timestamp) 去重写入，重复导入同一文件是幂等的。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import IO, Iterator, List, Tuple
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.config import settings
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.schemas.ingest import IngestResult
+from app.services.ingest import ingest_records, iter_ndjson_batches, parse_json_array
+
+
+def _batches(stream: IO[bytes], fmt: str, chunk_rows: int) -> Iterator[Tuple[int, List]]:
+    if fmt == "json":
+        yield 0, parse_json_array(stream.read())
+    else:
+        yield from iter_ndjson_batches(stream, chunk_rows)
+
+
+def _detect_format(path: str, fmt: str) -> str:
+    if fmt != "auto":
+        return fmt
+    return "json" if Path(path).suffix.lower() == ".json" else "ndjson"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=["-"], help="输入文件，`-` 表示标准输入")
+    parser.add_argument("--format", choices=["auto", "json", "ndjson"], default="auto", help="输入格式")
+    parser.add_argument("--chunk-rows", type=int, default=settings.ingest_chunk_rows, help="每个事务写入的行数")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for path in args.paths:
+            result = IngestResult()
+            stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+            try:
+                for offset, records in _batches(stream, _detect_format(path, args.format), args.chunk_rows):
+                    ingest_records(db, records, result, offset, chunk_rows=args.chunk_rows)
+            finally:
+                if stream is not sys.stdin.buffer:
+                    stream.close()
+            rates = [batch.rows_per_sec for batch in result.batches]
+            print(
+                f"{path}: 收到 {result.received} 行，写入 {result.written} 行，"
+                f"重复 {result.duplicates} 行，拒绝 {result.rejected} 行；"
+                f"{len(rates)} 批，平均 {sum(rates) / len(rates) if rates else 0:.0f} 行/秒"
+            )
+            for row in result.rejected_rows:
+                print(f"  第 {row.index} 行：{row.reason}", file=sys.stderr)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
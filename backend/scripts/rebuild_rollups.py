@@ -0,0 +1,36 @@
+"""回填 / 重建用电量汇总表（consumption_hourly / daily / monthly）。
+
+用法（在 backend 目录下）：
+    python -m scripts.rebuild_rollups                      # 重建全部历史
+    python -m scripts.rebuild_rollups --since 2024-01-01   # 只重建某日之后
+    python -m scripts.rebuild_rollups --account 1 --account 2
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import app.models  # noqa: F401  注册全部模型
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.services.rollups import rebuild_rollups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="起始时间（ISO 格式）")
+    parser.add_argument("--account", type=int, action="append", dest="accounts", help="只处理指定账户，可重复")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db, since=args.since, account_ids=args.accounts)
+    finally:
+        db.close()
+    print(f"汇总表重建完成，耗时 {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
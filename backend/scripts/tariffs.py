@@ -0,0 +1,90 @@
+"""维护分时电价方案与节假日。
+
+用法（在 backend 目录下）：
+    python -m scripts.tariffs list
+    python -m scripts.tariffs add-schedule schedule.json     # 同名方案存在时更新
+    python -m scripts.tariffs add-holiday 2024-10-01 --name 国庆节
+
+schedule.json 示例：
+    {"name": "居民分时", "peak_rate": 0.95, "flat_rate": 0.62, "valley_rate": 0.31,
+     "weekday_windows": {"peak": ["08:00-11:00", "18:00-23:00"], "valley": ["23:00-07:00"]},
+     "holiday_windows": {"valley": ["23:00-08:00"]}}
+
+运行中的服务最多在 TARIFF_CACHE_TTL_SECONDS 后使用新的价格表。
+"""
+
+import argparse
+import json
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import select
+
+import app.models  # noqa: F401  注册全部模型
+from app.db.base import Base
+from app.db.session import SessionLocal, engine
+from app.models.tariff import TariffHoliday, TariffSchedule
+from app.schemas.tariff import TariffScheduleCreate
+from app.services.tariffs import compile_schedule
+
+
+def _list(db) -> None:
+    for schedule in db.execute(select(TariffSchedule).order_by(TariffSchedule.id)).scalars():
+        table = compile_schedule(schedule).table()
+        print(f"[{schedule.id}] {schedule.name}  峰 {table.rates['peak']} / 平 {table.rates['flat']} / 谷 {table.rates['valley']}")
+        print("    工作日:", "".join(period[0].upper() for period in table.workday_periods))
+        print("    节假日:", "".join(period[0].upper() for period in table.holiday_periods))
+    for holiday in db.execute(select(TariffHoliday).order_by(TariffHoliday.day)).scalars():
+        print(f"节假日 {holiday.day} {holiday.name or ''}")
+
+
+def _add_schedule(db, path: Path) -> None:
+    data = TariffScheduleCreate.model_validate(json.loads(path.read_text(encoding="utf-8")))
+    values = data.model_dump(exclude_none=True)
+    values.setdefault("holiday_windows", None)
+    schedule = db.execute(select(TariffSchedule).where(TariffSchedule.name == data.name)).scalar_one_or_none()
+    if schedule is None:
+        schedule = TariffSchedule()
+        db.add(schedule)
+    for field, value in values.items():
+        setattr(schedule, field, value)
+    db.commit()
+    print(f"已保存电价方案 [{schedule.id}] {schedule.name}")
+
+
+def _add_holiday(db, day: date, name: str) -> None:
+    holiday = db.execute(select(TariffHoliday).where(TariffHoliday.day == day)).scalar_one_or_none()
+    if holiday is None:
+        holiday = TariffHoliday(day=day)
+        db.add(holiday)
+    holiday.name = name
+    db.commit()
+    print(f"已登记节假日 {day} {name or ''}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="列出方案与节假日")
+    schedule_parser = commands.add_parser("add-schedule", help="从 JSON 文件新增或更新方案")
+    schedule_parser.add_argument("path", type=Path)
+    holiday_parser = commands.add_parser("add-holiday", help="登记节假日（按节假日时段计费）")
+    holiday_parser.add_argument("day", type=date.fromisoformat)
+    holiday_parser.add_argument("--name", default=None)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.command == "list":
+            _list(db)
+        elif args.command == "add-schedule":
+            _add_schedule(db, args.path)
+        else:
+            _add_holiday(db, args.day, args.name)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""测试公共配置：在导入 `app` 之前把数据库指向临时 SQLite 文件。"""
+
+import importlib
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+from fastapi.testclient import TestClient
+
+_TMP_DIR = tempfile.mkdtemp(prefix="ai-power-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ["ASYNC_DB_ENABLED"] = "false"
+os.environ["WEATHER_PROVIDER"] = "stub"
+os.environ["CHAT_BACKEND"] = "stub"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import models  # noqa: E402,F401  注册全部 ORM 模型
+from app.core.config import settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    """每个测试一个独立会话，结束时关闭。"""
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def make_client(monkeypatch, async_db: bool = False) -> TestClient:
+    """按同步 / 异步模式重新构建应用（路由在导入 `app.main` 时按配置挂载）。"""
+
+    monkeypatch.setattr(settings, "async_db_enabled", async_db)
+    return TestClient(importlib.reload(importlib.import_module("app.main")).app)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """同步模式的测试客户端（运行 lifespan 中的后台任务）。"""
+
+    with make_client(monkeypatch) as test_client:
+        yield test_client
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def any_client(request, monkeypatch):
+    """同步 / 异步两种模式各运行一次的测试客户端。"""
+
+    with make_client(monkeypatch, request.param) as test_client:
+        yield test_client
+
+
+def register(client: TestClient, prefix: str = "user", address: str = "杭州市西湖区") -> Dict[str, str]:
+    """注册一个新用户并登录，返回认证请求头。"""
+
+    username = f"{prefix}_{uuid.uuid4().hex[:8]}"
+    response = client.post(
+        "/api/auth/register", json={"username": username, "password": "secret123", "address": address}
+    )
+    assert response.status_code == 201, response.text
+    response = client.post("/api/auth/token", json={"username": username, "password": "secret123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_appliance(
+    client: TestClient, headers: Dict[str, str], name: str = "空调", type: str = "ac", power: float = 2.0
+) -> Dict[str, Any]:
+    response = client.post(
+        "/api/appliances/", json={"name": name, "type": type, "power_rating": power}, headers=headers
+    )
+    assert response.status_code in (200, 201), response.text
+    return response.json()
@@ -0,0 +1,95 @@
+"""电器控制：条件 UPDATE 的乐观并发（409）、重复开关不写库，以及非法动作的校验。"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import create_appliance, register
+
+
+def _control(client, headers, appliance_id: int, action: str, expected_version=None):
+    body = {"action": action}
+    if expected_version is not None:
+        body["expected_version"] = expected_version
+    return client.post(f"/api/appliances/{appliance_id}/control", json=body, headers=headers)
+
+
+def _version(client, headers, appliance_id: int) -> int:
+    items = client.get("/api/appliances/", headers=headers).json()
+    return next(item["version"] for item in items if item["id"] == appliance_id)
+
+
+@pytest.mark.parametrize("action", ["bogus", "", "TOGGLE"])
+def test_invalid_action_is_rejected(any_client, action):
+    headers = register(any_client, "control")
+    appliance = create_appliance(any_client, headers)
+
+    response = _control(any_client, headers, appliance["id"], action)
+
+    assert response.status_code == 422
+    assert _version(any_client, headers, appliance["id"]) == 0
+
+
+def test_action_is_normalized(any_client):
+    headers = register(any_client, "control")
+    appliance = create_appliance(any_client, headers)
+
+    response = _control(any_client, headers, appliance["id"], " on ")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["new_status"] is True
+
+
+def test_stale_expected_version_conflicts(any_client):
+    headers = register(any_client, "control")
+    appliance = create_appliance(any_client, headers)
+    seen = _version(any_client, headers, appliance["id"])
+
+    # 两个客户端基于同一版本号操作：先到的成功，后到的得到 409
+    first = _control(any_client, headers, appliance["id"], "ON", expected_version=seen)
+    second = _control(any_client, headers, appliance["id"], "OFF", expected_version=seen)
+
+    assert first.status_code == 200 and first.json()["version"] == seen + 1
+    assert second.status_code == 409
+    assert _version(any_client, headers, appliance["id"]) == seen + 1
+    # 目标状态相同但版本号过期，同样是冲突
+    assert _control(any_client, headers, appliance["id"], "ON", expected_version=seen).status_code == 409
+
+
+def test_concurrent_toggles_with_same_version_apply_once(client):
+    headers = register(client, "control")
+    appliance = create_appliance(client, headers)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(
+            pool.map(lambda _: _control(client, headers, appliance["id"], "ON", expected_version=0), range(8))
+        )
+
+    codes = sorted(response.status_code for response in responses)
+    assert codes == [200] + [409] * 7
+    assert _version(client, headers, appliance["id"]) == 1
+
+
+def test_repeated_on_does_not_bump_version(any_client):
+    headers = register(any_client, "control")
+    appliance = create_appliance(any_client, headers)
+    assert _control(any_client, headers, appliance["id"], "ON").json()["version"] == 1
+
+    repeat = _control(any_client, headers, appliance["id"], "ON")
+
+    assert repeat.status_code == 200
+    assert repeat.json()["changed"] is False and repeat.json()["version"] == 1
+    assert _version(any_client, headers, appliance["id"]) == 1
+    # 提供最新版本号的重复操作也不写数据库
+    assert _control(any_client, headers, appliance["id"], "ON", expected_version=1).json()["changed"] is False
+    assert _version(any_client, headers, appliance["id"]) == 1
+
+
+def test_control_of_missing_or_foreign_appliance_is_404(any_client):
+    owner = register(any_client, "control")
+    other = register(any_client, "control")
+    appliance = create_appliance(any_client, owner)
+
+    assert _control(any_client, other, appliance["id"], "ON").status_code == 404
+    assert _control(any_client, owner, 999999, "ON").status_code == 404
+    assert _version(any_client, owner, appliance["id"]) == 0
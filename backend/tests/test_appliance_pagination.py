@@ -0,0 +1,85 @@
+"""电器列表的键集分页：按游标逐页遍历不重不漏，汇总响应头与筛选，非法游标返回 400。"""
+
+import base64
+
+import pytest
+
+from conftest import create_appliance, register
+
+
+def _walk(client, headers, limit: int, **filters):
+    """沿 `X-Next-Cursor` 逐页读取，返回 (每页的电器ID, 最后一页的响应头)。"""
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **filters}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/appliances/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages, response.headers
+        assert len(pages) <= 50, "游标没有前进"
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_cursor_walk_returns_every_appliance_once(any_client, limit):
+    headers = register(any_client, "page")
+    # 名称、类型、功率全部相同：排序只能依赖主键
+    created = [create_appliance(any_client, headers, "插座", "other", 0.1)["id"] for _ in range(7)]
+
+    pages, last_headers = _walk(any_client, headers, limit)
+
+    walked = [appliance_id for page in pages for appliance_id in page]
+    assert walked == sorted(created)
+    assert all(len(page) == limit for page in pages[:-1]) and 0 < len(pages[-1]) <= limit
+    assert last_headers["X-Total-Count"] == "7"
+
+
+def test_cursor_walk_with_filters(any_client):
+    headers = register(any_client, "page")
+    other = register(any_client, "page")
+    lamps = [create_appliance(any_client, headers, f"台灯{i}", "light", 0.05)["id"] for i in range(5)]
+    create_appliance(any_client, headers, "空调", "ac", 2.0)
+    create_appliance(any_client, other, "台灯", "light", 0.05)
+    for appliance_id in lamps[:3]:
+        any_client.post(f"/api/appliances/{appliance_id}/control", json={"action": "ON"}, headers=headers)
+
+    pages, page_headers = _walk(any_client, headers, 2, type="light", name_prefix="台灯")
+    assert [appliance_id for page in pages for appliance_id in page] == lamps
+    assert page_headers["X-Total-Count"] == "5"
+    assert page_headers["X-On-Count"] == "3" and page_headers["X-On-Power-Kw"] == "0.15"
+
+    pages, _ = _walk(any_client, headers, 2, type="light", is_on="false")
+    assert [appliance_id for page in pages for appliance_id in page] == lamps[3:]
+
+
+def test_limit_zero_returns_only_summary_headers(any_client):
+    headers = register(any_client, "page")
+    create_appliance(any_client, headers, power=1.5)
+
+    response = any_client.get("/api/appliances/", params={"limit": 0}, headers=headers)
+
+    assert response.json() == []
+    assert response.headers["X-Total-Count"] == "1" and "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "!!!",
+        "not-a-cursor",
+        base64.urlsafe_b64encode(b"-1").decode(),
+        base64.urlsafe_b64encode(b"1.5").decode(),
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        base64.urlsafe_b64encode(b"9" * 30).decode(),
+    ],
+)
+def test_malformed_cursor_is_400(any_client, cursor):
+    headers = register(any_client, "page")
+
+    response = any_client.get("/api/appliances/", params={"cursor": cursor}, headers=headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+"""异步数据库模式：挂载 `async_router`，认证、概览与电器控制通过 AsyncSession 完成。"""
+
+import pytest
+
+from conftest import create_appliance, make_client, register
+
+
+@pytest.fixture
+def async_client(monkeypatch):
+    with make_client(monkeypatch, async_db=True) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize(
+    "path, method",
+    [
+        ("/api/auth/token", "post"),
+        ("/api/auth/me", "get"),
+        ("/api/data/summary", "get"),
+        ("/api/appliances/{appliance_id}/control", "post"),
+    ],
+)
+def test_async_routers_are_mounted(async_client, path, method):
+    operation = async_client.app.openapi()["paths"][path][method]
+
+    # 操作 ID 以处理函数名开头，异步版本的处理函数以 _async 结尾
+    assert "_async_api_" in operation["operationId"]
+
+
+def test_auth_flow(async_client):
+    headers = register(async_client, "async")
+
+    me = async_client.get("/api/auth/me", headers=headers)
+    assert me.status_code == 200 and me.json()["username"].startswith("async_")
+
+    wrong = async_client.post("/api/auth/token", json={"username": me.json()["username"], "password": "wrong123"})
+    assert wrong.status_code == 401
+
+    assert async_client.post("/api/auth/logout", headers=headers).status_code == 200
+    assert async_client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+def test_control_and_summary(async_client):
+    headers = register(async_client, "async")
+    appliance = create_appliance(async_client, headers, power=1.5)
+    summary = async_client.get("/api/data/summary", headers=headers).json()
+    assert summary["active_appliances_count"] == 0 and summary["total_power_now"] == 0
+
+    response = async_client.post(
+        f"/api/appliances/{appliance['id']}/control", json={"action": "ON"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["new_status"] is True and response.json()["changed"] is True
+
+    summary = async_client.get("/api/data/summary", headers=headers).json()
+    assert summary["active_appliances_count"] == 1 and summary["total_power_now"] == 1.5
+
+    listed = async_client.get("/api/appliances/", headers=headers).json()
+    assert [(item["id"], item["is_on"]) for item in listed] == [(appliance["id"], True)]
+
+    missing = async_client.post("/api/appliances/999999/control", json={"action": "OFF"}, headers=headers)
+    assert missing.status_code == 404
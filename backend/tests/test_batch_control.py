@@ -0,0 +1,126 @@
+"""批量控制与场景：逐个结果、部分失败时其余动作照常提交、功率变化汇总与参数校验。"""
+
+import pytest
+
+from conftest import create_appliance, register
+
+
+def _states(client, headers):
+    return {item["id"]: (item["is_on"], item["version"]) for item in client.get("/api/appliances/", headers=headers).json()}
+
+
+def _batch(client, headers, **body):
+    return client.post("/api/appliances/batch", json=body, headers=headers)
+
+
+def test_batch_reports_per_item_errors_and_commits_the_rest(any_client):
+    headers = register(any_client, "batch")
+    other = register(any_client, "batch")
+    ac = create_appliance(any_client, headers, "空调", "ac", 2.0)
+    tv = create_appliance(any_client, headers, "电视", "tv", 0.15)
+    foreign = create_appliance(any_client, other, "冰箱", "fridge", 0.3)
+
+    response = _batch(
+        any_client,
+        headers,
+        actions=[
+            {"appliance_id": ac["id"], "action": "ON"},
+            {"appliance_id": foreign["id"], "action": "ON"},
+            {"appliance_id": 999999, "action": "OFF"},
+            {"appliance_id": tv["id"], "action": "on"},
+        ],
+    )
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["success"] is False and body["changed_count"] == 2
+    results = {item["appliance_id"]: item for item in body["results"]}
+    assert results[ac["id"]]["success"] and results[ac["id"]]["changed"]
+    assert results[tv["id"]]["success"] and results[tv["id"]]["action"] == "ON"
+    for failed in (foreign["id"], 999999):
+        assert results[failed]["success"] is False and results[failed]["error"]
+
+    assert _states(any_client, headers) == {ac["id"]: (True, 1), tv["id"]: (True, 1)}
+    # 其他账户的电器不受影响
+    assert _states(any_client, other) == {foreign["id"]: (False, 0)}
+
+
+def test_power_delta_counts_only_changed_appliances(any_client):
+    headers = register(any_client, "batch")
+    ac = create_appliance(any_client, headers, "空调", "ac", 2.0)
+    heater = create_appliance(any_client, headers, "取暖器", "heater", 1.25)
+    light = create_appliance(any_client, headers, "台灯", "light", 0.05)
+    _batch(any_client, headers, actions=[{"appliance_id": ac["id"], "action": "ON"}])
+
+    body = _batch(
+        any_client,
+        headers,
+        actions=[
+            {"appliance_id": ac["id"], "action": "ON"},  # 已开启：不计入
+            {"appliance_id": heater["id"], "action": "ON"},
+            {"appliance_id": light["id"], "action": "ON"},
+        ],
+    ).json()
+
+    assert body["success"] is True and body["changed_count"] == 2
+    assert body["power_delta_kw"] == pytest.approx(1.3)
+    assert body["total_power_now"] == pytest.approx(3.3)
+    assert {item["appliance_id"]: item["changed"] for item in body["results"]} == {
+        ac["id"]: False, heater["id"]: True, light["id"]: True,
+    }
+
+    body = _batch(any_client, headers, all_action="OFF").json()
+    assert body["changed_count"] == 3
+    assert body["power_delta_kw"] == pytest.approx(-3.3)
+    assert body["total_power_now"] == 0
+    assert all(not is_on for is_on, _ in _states(any_client, headers).values())
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {},
+        {"actions": []},
+        {"actions": [{"appliance_id": 1, "action": "ON"}], "all_action": "OFF"},
+        {"actions": [{"appliance_id": 1, "action": "ON"}, {"appliance_id": 1, "action": "OFF"}]},
+        {"actions": [{"appliance_id": 1, "action": "bogus"}]},
+        {"all_action": "bogus"},
+    ],
+)
+def test_batch_requires_exactly_one_valid_form(client, body):
+    headers = register(client, "batch")
+
+    assert _batch(client, headers, **body).status_code == 422
+
+
+def test_scene_apply(any_client):
+    headers = register(any_client, "scene")
+    other = register(any_client, "scene")
+    ac = create_appliance(any_client, headers, "空调", "ac", 2.0)
+    light = create_appliance(any_client, headers, "台灯", "light", 0.05)
+    foreign = create_appliance(any_client, other, "冰箱", "fridge", 0.3)
+    _batch(any_client, headers, all_action="ON")
+
+    rejected = any_client.post(
+        "/api/appliances/scenes",
+        json={"name": "离家模式", "actions": [{"appliance_id": foreign["id"], "action": "OFF"}]},
+        headers=headers,
+    )
+    assert rejected.status_code == 400
+
+    scene = any_client.post(
+        "/api/appliances/scenes",
+        json={
+            "name": "离家模式",
+            "actions": [{"appliance_id": ac["id"], "action": "OFF"}, {"appliance_id": light["id"], "action": "ON"}],
+        },
+        headers=headers,
+    ).json()
+
+    body = any_client.post(f"/api/appliances/scenes/{scene['id']}/apply", headers=headers).json()
+
+    assert body["scene_id"] == scene["id"] and body["success"] is True
+    assert body["changed_count"] == 1 and body["power_delta_kw"] == pytest.approx(-2.0)
+    assert _states(any_client, headers) == {ac["id"]: (False, 2), light["id"]: (True, 1)}
+    # 其他账户不能执行该场景
+    assert any_client.post(f"/api/appliances/scenes/{scene['id']}/apply", headers=other).status_code == 404
@@ -0,0 +1,95 @@
+"""时间分桶表达式：各方言的 SQL 渲染，以及在 SQLite 上的实际分桶结果。"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.models import ConsumptionData, ElectricityAccount, User
+from app.services.bucketing import (
+    DAY_SECONDS,
+    MIN_BUCKET_SECONDS,
+    aggregate_buckets,
+    align_start,
+    bucket_expression,
+    choose_bucket_seconds,
+)
+
+ORIGIN = datetime(2024, 1, 1)
+
+
+def _render(dialect_name: str, dialect) -> str:
+    expr = bucket_expression(dialect_name, ConsumptionData.timestamp, ORIGIN, MIN_BUCKET_SECONDS)
+    return str(expr.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def test_sqlite_expression_uses_strftime_epoch_and_integer_division():
+    sql = _render("sqlite", sqlite.dialect())
+
+    assert sql == (
+        "(CAST(strftime('%s', consumption_data.timestamp) AS INTEGER)"
+        " - CAST(strftime('%s', '2024-01-01 00:00:00.000000') AS INTEGER)) / 1800"
+    )
+
+
+@pytest.mark.parametrize("dialect_name", ["mysql", "mariadb"])
+def test_mysql_expression_uses_unix_timestamp_and_floor(dialect_name):
+    sql = _render(dialect_name, mysql.dialect())
+
+    assert sql == (
+        "FLOOR((unix_timestamp(consumption_data.timestamp)"
+        " - unix_timestamp('2024-01-01 00:00:00')) / 1800)"
+    )
+
+
+def test_postgresql_expression_uses_extract_epoch():
+    sql = _render("postgresql", postgresql.dialect())
+
+    assert "EXTRACT(epoch FROM consumption_data.timestamp)" in sql
+
+
+def test_unsupported_dialect_raises():
+    with pytest.raises(NotImplementedError):
+        bucket_expression("oracle", ConsumptionData.timestamp, ORIGIN, MIN_BUCKET_SECONDS)
+
+
+def test_aggregate_buckets_on_sqlite(db):
+    user = User(username="bucket_user", password="x")
+    db.add(user)
+    db.flush()
+    account = ElectricityAccount(user_id=user.id, account_number="ACC-BUCKET")
+    db.add(account)
+    db.flush()
+    # 两小时内每 30 分钟一条，第 0 个小时 1 + 2，第 1 个小时 3 + 4
+    for index, kwh in enumerate([1, 2, 3, 4]):
+        db.add(ConsumptionData(account_id=account.id, timestamp=ORIGIN + timedelta(minutes=30 * index), total_kwh=kwh))
+    db.commit()
+
+    buckets = aggregate_buckets(
+        db,
+        ConsumptionData.timestamp,
+        ConsumptionData.total_kwh,
+        [ConsumptionData.account_id == account.id],
+        start=ORIGIN,
+        end=ORIGIN + timedelta(hours=2),
+        bucket_seconds=3600,
+    )
+
+    assert [(b.start, b.total_kwh, b.samples) for b in buckets] == [
+        (ORIGIN, 3.0, 2),
+        (ORIGIN + timedelta(hours=1), 7.0, 2),
+    ]
+
+
+def test_align_start():
+    start = datetime(2024, 3, 5, 13, 47, 12)
+
+    assert align_start(start, MIN_BUCKET_SECONDS) == datetime(2024, 3, 5, 13, 30)
+    assert align_start(start, 3 * 3600) == datetime(2024, 3, 5, 12, 0)
+    assert align_start(start, DAY_SECONDS) == datetime(2024, 3, 5)
+
+
+def test_choose_bucket_seconds_rounds_up_to_half_hours():
+    assert choose_bucket_seconds(timedelta(hours=2), 100) == MIN_BUCKET_SECONDS
+    assert choose_bucket_seconds(timedelta(days=7), 24) == 7 * 3600
+    assert choose_bucket_seconds(timedelta(days=30), 30) == DAY_SECONDS
@@ -0,0 +1,175 @@
+"""AI 对话流水线：本地模拟后端的 SSE 分帧、断开 / 超时 / 出错时的事件与聊天记录。"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+import pytest
+
+from app.schemas.chat import ChatRequest
+from app.services.chat import ChatBackend, ChatHistoryWriter, ChatService, StubChatBackend, load_backend
+
+CONTEXT = {"on_power": 3.25, "active_count": 2, "period": "peak", "climate_on": True}
+
+
+class _SlowBackend(ChatBackend):
+    """先产出一个 token，之后卡住，用于触发单 token 超时。"""
+
+    name = "slow"
+
+    async def stream(self, messages, context) -> AsyncIterator[str]:
+        yield "稍"
+        await asyncio.sleep(10)
+        yield "等"
+
+
+class _BrokenBackend(ChatBackend):
+    name = "broken"
+
+    async def stream(self, messages, context) -> AsyncIterator[str]:
+        yield "出"
+        raise RuntimeError("模型服务异常")
+
+
+def _service(backend: ChatBackend, token_timeout: float = 1.0) -> Tuple[ChatService, ChatHistoryWriter]:
+    writer = ChatHistoryWriter(batch_size=100, flush_interval=60, max_buffered=100)
+    return ChatService(backend, writer, token_timeout=token_timeout, max_history=10), writer
+
+
+def _parse(frames: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """每个 SSE 帧为 `event: <名称>\\ndata: <JSON>\\n\\n`。"""
+
+    events = []
+    for frame in frames:
+        assert frame.endswith("\n\n")
+        event_line, data_line = frame[:-2].split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def _collect(service: ChatService, message: str, context: Dict[str, Any], disconnect_after: int = 0):
+    async def run() -> List[str]:
+        sent = 0
+
+        async def disconnected() -> bool:
+            return bool(disconnect_after) and sent >= disconnect_after
+
+        frames = []
+        async for frame in service.sse(1, ChatRequest(message=message), context, disconnected):
+            frames.append(frame)
+            sent += 1
+        return frames
+
+    return _parse(asyncio.run(run()))
+
+
+async def _never() -> bool:
+    return False
+
+
+def _buffered(writer: ChatHistoryWriter) -> List[Dict[str, Any]]:
+    return list(writer._buffer)
+
+
+def test_stub_backend_is_deterministic():
+    backend = load_backend("stub")
+    assert isinstance(backend, StubChatBackend)
+
+    reply = StubChatBackend.reply("为什么电费这么贵？", CONTEXT)
+    assert reply == StubChatBackend.reply("为什么电费这么贵？", CONTEXT)
+    assert "峰时" in reply and "3.25 kW" in reply
+    assert "绑定用电账户" in StubChatBackend.reply("你好", {})
+
+
+def test_sse_streams_tokens_then_done():
+    service, writer = _service(StubChatBackend(token_delay=0))
+    message = "怎样更省电？"
+
+    events = _collect(service, message, CONTEXT)
+
+    names = [name for name, _ in events]
+    assert names[-1] == "done" and set(names[:-1]) == {"token"}
+    reply = "".join(data["content"] for name, data in events if name == "token")
+    assert reply == StubChatBackend.reply(message, CONTEXT)
+
+    metrics = events[-1][1]["metrics"]
+    assert metrics["status"] == "completed"
+    assert metrics["tokens"] == len(events) - 1
+    assert metrics["ttft_ms"] is not None
+
+    rows = _buffered(writer)
+    assert [(row["role"], row["message"]) for row in rows] == [("user", message), ("assistant", reply)]
+    assert service.counts == {"completed": 1}
+
+
+def test_sse_frames_keep_non_ascii_and_newlines_escaped():
+    service, _ = _service(StubChatBackend(token_delay=0))
+
+    async def run() -> List[str]:
+        return [frame async for frame in service.sse(1, ChatRequest(message="空调"), CONTEXT, _never)]
+
+    frames = asyncio.run(run())
+    # JSON 中的换行被转义，每帧只有 event / data 两行；中文按原文输出
+    assert all(frame.count("\n") == 3 for frame in frames)
+    assert 'data: {"content": "空"}' in "".join(frames)
+
+
+def test_client_disconnect_stops_generation_and_keeps_partial_reply():
+    service, writer = _service(StubChatBackend(token_delay=0))
+
+    events = _collect(service, "怎样更省电？", CONTEXT, disconnect_after=3)
+
+    assert [name for name, _ in events] == ["token"] * 3
+    partial = "".join(data["content"] for _, data in events)
+    assert _buffered(writer)[-1]["message"] == partial
+    assert service.counts == {"cancelled": 1}
+
+
+def test_token_timeout_emits_error_event():
+    service, writer = _service(_SlowBackend(), token_timeout=0.05)
+
+    events = _collect(service, "你好", CONTEXT)
+
+    assert events[0] == ("token", {"content": "稍"})
+    assert events[-1][0] == "error"
+    assert service.counts == {"timeout": 1}
+    last = _buffered(writer)[-1]
+    assert (last["role"], last["message"]) == ("assistant", "稍")
+
+
+def test_backend_failure_emits_error_event():
+    service, _ = _service(_BrokenBackend())
+
+    events = _collect(service, "你好", CONTEXT)
+
+    assert [name for name, _ in events] == ["token", "error"]
+    assert "detail" in events[-1][1]
+    assert service.counts == {"failed": 1}
+
+
+def test_complete_returns_full_reply():
+    service, writer = _service(StubChatBackend(token_delay=0))
+
+    reply, metrics = asyncio.run(service.complete(1, ChatRequest(message="空调怎么用？"), CONTEXT))
+
+    assert reply == StubChatBackend.reply("空调怎么用？", CONTEXT)
+    assert metrics.status == "completed"
+    assert len(_buffered(writer)) == 2
+
+
+def test_messages_include_context_and_trimmed_history():
+    service, _ = _service(StubChatBackend(token_delay=0))
+    service.max_history = 2
+    history = [{"role": "user", "content": f"问题{i}"} for i in range(5)]
+
+    messages = service.messages(ChatRequest(message="现在呢？", history=history), CONTEXT)
+
+    assert messages[0]["role"] == "system" and "当前用电情况" in messages[0]["content"]
+    assert [m["content"] for m in messages[1:]] == ["问题3", "问题4", "现在呢？"]
+
+
+@pytest.mark.parametrize("spec", ["unknown", "no_colon.module"])
+def test_load_backend_rejects_unknown_spec(spec):
+    with pytest.raises(ValueError):
+        load_backend(spec)
@@ -0,0 +1,105 @@
+"""负荷预测：没有训练数据时不保存模型、预测接口不做拟合、写入数据后丢弃缓存系数。"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import ConsumptionForecastModel, ElectricityAccount, User
+from app.services.forecasting import (
+    COEFFICIENTS,
+    PROJECTION_NAME,
+    ForecastModel,
+    fit_all_accounts,
+    forecast_store,
+)
+from app.services.ingest import ingest_records
+from app.services.scheduler import scheduler
+from conftest import create_appliance, register
+
+
+def _account_id(client, db, headers) -> int:
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    return db.execute(select(ElectricityAccount.id).where(ElectricityAccount.user_id == user_id)).scalar_one()
+
+
+def _stored(db, account_id: int):
+    return db.execute(
+        select(ConsumptionForecastModel).where(ConsumptionForecastModel.account_id == account_id)
+    ).scalar_one_or_none()
+
+
+def test_forecast_without_model_uses_projection_and_keeps_summary(any_client, db):
+    headers = register(any_client, "forecast")
+    appliance = create_appliance(any_client, headers, power=0.1)
+    any_client.post(f"/api/appliances/{appliance['id']}/control", json={"action": "ON"}, headers=headers)
+    before = any_client.get("/api/data/summary", headers=headers).json()
+    assert before["daily_cost_estimate"] > 0
+
+    forecast = any_client.get("/api/data/consumption/forecast?hours=2", headers=headers).json()
+
+    assert forecast["model"] == PROJECTION_NAME
+    assert forecast["fitted_at"] is None and forecast["stale"] is False
+    assert [point["kwh"] for point in forecast["points"]] == [0.05] * 4
+    # GET 请求不拟合、不写入模型，今日预计电费仍按功率投影
+    assert _stored(db, _account_id(any_client, db, headers)) is None
+    assert any_client.get("/api/data/summary", headers=headers).json() == before
+
+
+def test_fit_skips_accounts_without_history(db):
+    user = User(username="forecast_empty", password="x")
+    db.add(user)
+    db.flush()
+    account = ElectricityAccount(user_id=user.id, account_number="ACC-FORECAST-EMPTY")
+    db.add(account)
+    db.commit()
+
+    stats = fit_all_accounts(db, workers=0)
+
+    assert stats["skipped_no_data"] >= 1
+    assert _stored(db, account.id) is None
+    assert forecast_store.peek(account.id) is None
+
+
+def test_fit_stores_model_for_account_with_history(db):
+    user = User(username="forecast_history", password="x")
+    db.add(user)
+    db.flush()
+    account = ElectricityAccount(user_id=user.id, account_number="ACC-FORECAST-HISTORY")
+    db.add(account)
+    db.commit()
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    records = [
+        {"account_id": account.id, "timestamp": (midnight - timedelta(minutes=30 * i)).isoformat(), "total_kwh": 0.2}
+        for i in range(1, 97)
+    ]
+    ingest_records(db, records)
+
+    fit_all_accounts(db, workers=0)
+
+    row = _stored(db, account.id)
+    assert row is not None and row.samples == 96
+    assert forecast_store.peek(account.id).samples == 96
+
+    # 新数据写入后丢弃缓存的系数，下次读取时从数据库重新加载
+    ingest_records(db, [{"account_id": account.id, "timestamp": midnight.isoformat(), "total_kwh": 0.3}])
+    assert forecast_store.peek(account.id) is None
+    assert forecast_store.get(db, account.id).samples == 96
+
+
+def test_model_without_samples_is_not_usable():
+    now = datetime.now()
+    coefficients = np.zeros(COEFFICIENTS, dtype=np.float32)
+
+    assert not ForecastModel(1, coefficients, 0, now, now).usable(now)
+    assert ForecastModel(1, coefficients, 10, now, now).usable(now)
+    assert not ForecastModel(1, coefficients, 10, now, now - timedelta(days=30)).usable(now)
+
+
+def test_refit_runs_as_leased_scheduler_job(client):
+    job = scheduler.jobs["forecast_refit"]
+
+    # 只在租约持有者上按整数倍边界执行，启动时不运行
+    assert job.interval == settings.forecast_refit_interval_seconds
+    assert job.stats.runs == 0 and job.stats.last_started is None
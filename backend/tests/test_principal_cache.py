@@ -0,0 +1,177 @@
+"""认证主体缓存：用户 / 账户变更后的失效，以及反向索引的清理。"""
+
+import itertools
+import time
+
+import pytest
+
+from app.db.session import SessionLocal
+from app.models import ElectricityAccount, User
+from app.services.principal_cache import PrincipalCache, load_principal, principal_cache
+
+_counter = itertools.count(1)
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+def _create_user(db, with_account: bool = True) -> User:
+    n = next(_counter)
+    user = User(username=f"cache_user{n}", password="x", address="杭州市西湖区")
+    db.add(user)
+    db.flush()
+    if with_account:
+        db.add(ElectricityAccount(user_id=user.id, account_number=f"ACC-CACHE-{n}"))
+    db.commit()
+    return user
+
+
+def _load(username: str) -> User:
+    """在独立会话中加载快照（与请求中的认证依赖一样），不影响测试会话中的实例。"""
+
+    session = SessionLocal()
+    try:
+        return load_principal(session, username)
+    finally:
+        session.close()
+
+
+def _cache_snapshot(username: str) -> User:
+    snapshot = _load(username)
+    principal_cache.set_user(snapshot)
+    assert principal_cache.get_user(username) is snapshot
+    return snapshot
+
+
+def test_load_principal_returns_detached_snapshot_with_account(db):
+    user = _create_user(db)
+    snapshot = load_principal(db, user.username)
+    db.close()
+
+    # 会话关闭后仍可读取用户与账户属性
+    assert snapshot.username == user.username
+    assert snapshot.electricity_account.account_number.startswith("ACC-CACHE-")
+
+
+def test_user_update_invalidates_cached_snapshot(db):
+    user = _create_user(db)
+    _cache_snapshot(user.username)
+
+    user.address = "宁波市鄞州区"
+    db.commit()
+
+    assert principal_cache.get_user(user.username) is None
+    assert principal_cache.stats()["indexed_users"] == 0
+
+
+def test_username_change_invalidates_old_key(db):
+    user = _create_user(db)
+    old_name = user.username
+    _cache_snapshot(old_name)
+
+    user.username = f"{old_name}_renamed"
+    db.commit()
+
+    assert principal_cache.get_user(old_name) is None
+
+
+def test_account_update_invalidates_owner_snapshot(db):
+    user = _create_user(db)
+    _cache_snapshot(user.username)
+
+    account = db.query(ElectricityAccount).filter_by(user_id=user.id).one()
+    account.peak_rate = 1.2
+    db.commit()
+
+    assert principal_cache.get_user(user.username) is None
+    assert principal_cache.stats()["indexed_accounts"] == 0
+
+
+def test_account_insert_invalidates_snapshot_without_account(db):
+    user = _create_user(db, with_account=False)
+    snapshot = _cache_snapshot(user.username)
+    assert snapshot.electricity_account is None
+
+    db.add(ElectricityAccount(user_id=user.id, account_number=f"ACC-LATE-{user.id}"))
+    db.commit()
+
+    assert principal_cache.get_user(user.username) is None
+
+
+def test_invalidation_is_repeated_after_commit(db):
+    """提交前被回填的旧快照，在提交后再次失效。"""
+
+    user = _create_user(db)
+    user.address = "温州市鹿城区"
+    db.flush()  # after_update：立即失效一次，并登记提交后的失效
+
+    stale = _load(user.username)
+    principal_cache.set_user(stale)
+    assert principal_cache.get_user(user.username) is stale
+
+    db.commit()
+
+    assert principal_cache.get_user(user.username) is None
+
+
+def test_rollback_discards_pending_invalidations(db):
+    user = _create_user(db)
+    user.address = "湖州市吴兴区"
+    db.flush()
+    assert db.info.get("principal_invalidations")
+
+    db.rollback()
+
+    assert "principal_invalidations" not in db.info
+
+
+def test_eviction_prunes_reverse_indexes(db):
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    users = [_create_user(db) for _ in range(5)]
+    for user in users:
+        cache.set_user(_load(user.username))
+
+    stats = cache.stats()
+    assert stats["users"]["size"] == 2
+    assert stats["indexed_users"] == 2
+    assert stats["indexed_accounts"] == 2
+
+    # 被淘汰用户的 id 不再指向任何快照，失效调用是空操作
+    cache.invalidate_user_id(users[0].id)
+    assert cache.get_user(users[-1].username) is not None
+
+
+def test_expiry_prunes_reverse_indexes(db):
+    cache = PrincipalCache(maxsize=10, ttl=0.01)
+    user = _create_user(db)
+    cache.set_user(_load(user.username))
+    time.sleep(0.02)
+
+    assert cache.get_user(user.username) is None
+    assert cache.stats()["indexed_users"] == 0
+    assert cache.stats()["indexed_accounts"] == 0
+
+
+def test_stale_snapshot_removal_keeps_index_of_renamed_user(db):
+    """改名后旧用户名的快照再被移除时，不应删除指向新用户名快照的索引。"""
+
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    user = _create_user(db)
+    old_name = user.username
+    stale = _load(old_name)
+    cache.set_user(stale)
+
+    user.username = f"{old_name}_new"
+    db.commit()
+    cache.set_user(_load(user.username))
+
+    cache._forget(old_name, stale)
+    assert cache.stats()["indexed_users"] == 1
+    assert cache.stats()["indexed_accounts"] == 1
+
+    cache.invalidate_user_id(user.id)
+    assert cache.get_user(user.username) is None
@@ -0,0 +1,122 @@
+"""每请求 SQL 计数：认证依赖与路由共享一个会话，用户 + 账户只用一条查询加载。"""
+
+import pytest
+from sqlalchemy import text
+
+from app.api import deps
+from app.core.config import settings
+from app.db.async_session import get_async_db
+from app.db.query_counter import MAX_RECORDED_STATEMENTS, QueryCountMiddleware, assert_max_queries, count_queries
+from app.db.session import SessionLocal, engine, get_db
+from app.models import ElectricityAccount, User
+from app.services.principal_cache import load_principal, principal_cache
+from conftest import make_client, register
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def counted_client(request, monkeypatch):
+    """开启 `X-Query-Count` 响应头的测试客户端（同步 / 异步两种模式）。"""
+
+    monkeypatch.setattr(settings, "query_count_header", True)
+    with make_client(monkeypatch, request.param) as test_client:
+        test_client.async_db = request.param
+        yield test_client
+
+
+def _track_sessions(client, monkeypatch):
+    """记录请求级会话依赖创建的会话，以及认证依赖加载用户时使用的会话。"""
+
+    opened, used = [], []
+
+    def tracking_get_db():
+        db = SessionLocal()
+        opened.append(db)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def tracking_get_async_db():
+        async for db in get_async_db():
+            opened.append(db.sync_session)
+            yield db
+
+    def tracking_load_principal(db, username):
+        used.append(db)
+        return load_principal(db, username)
+
+    dependency = get_async_db if client.async_db else get_db
+    client.app.dependency_overrides[dependency] = tracking_get_async_db if client.async_db else tracking_get_db
+    monkeypatch.setattr(deps, "load_principal", tracking_load_principal)
+    return opened, used
+
+
+def _query_count(client, headers) -> int:
+    response = client.get("/api/appliances/", headers=headers)
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-Query-Count"])
+
+
+def test_principal_is_loaded_with_one_query(db):
+    user = User(username="counter_user", password="x")
+    db.add(user)
+    db.flush()
+    db.add(ElectricityAccount(user_id=user.id, account_number="ACC-COUNTER"))
+    db.commit()
+    db.expunge_all()
+
+    with assert_max_queries(1):
+        loaded = load_principal(db, "counter_user")
+        # 账户随用户一起加载，访问时不会再发起懒加载查询
+        assert loaded.electricity_account.account_number == "ACC-COUNTER"
+
+
+def test_auth_and_endpoint_share_one_session(counted_client, monkeypatch):
+    headers = register(counted_client, "counter")
+    opened, used = _track_sessions(counted_client, monkeypatch)
+    principal_cache.clear()
+
+    _query_count(counted_client, headers)
+
+    assert len(opened) == 1
+    assert used == opened
+
+
+def test_principal_cache_miss_costs_at_most_one_query(counted_client):
+    headers = register(counted_client, "counter")
+
+    principal_cache.clear()
+    miss = _query_count(counted_client, headers)
+    hit = _query_count(counted_client, headers)
+
+    # 未命中时只多一条 JOIN 查询，命中时认证不访问数据库
+    assert miss == hit + 1
+    assert hit == _query_count(counted_client, headers)
+    principal_cache.clear()
+    assert _query_count(counted_client, headers) == miss
+
+
+def test_header_is_only_added_when_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "max_queries_per_request", 100)
+    with make_client(monkeypatch) as client:
+        response = client.get("/api/appliances/", headers=register(client, "counter"))
+        assert response.status_code == 200
+        assert "X-Query-Count" not in response.headers
+        assert any(
+            middleware.cls is QueryCountMiddleware and middleware.kwargs["header"] is False
+            for middleware in client.app.user_middleware
+        )
+
+
+def test_recorded_statements_are_capped():
+    with count_queries() as counter, engine.connect() as connection:
+        for _ in range(MAX_RECORDED_STATEMENTS + 10):
+            connection.execute(text("SELECT 1"))
+
+    assert counter.count == MAX_RECORDED_STATEMENTS + 10
+    assert len(counter.statements) == MAX_RECORDED_STATEMENTS
+
+    with pytest.raises(AssertionError, match="另有 10 条未记录"):
+        with assert_max_queries(0), engine.connect() as connection:
+            for _ in range(MAX_RECORDED_STATEMENTS + 10):
+                connection.execute(text("SELECT 1"))
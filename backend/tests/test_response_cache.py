@@ -0,0 +1,113 @@
+"""仪表盘条件请求：ETag / If-None-Match 返回 304，电器控制与用电数据写入后产生新的 ETag。"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import ElectricityAccount
+from app.schemas.dashboard import DashboardSummary
+from app.services.response_cache import ResponseCache
+from conftest import create_appliance, register
+
+ENDPOINTS = ["/api/data/summary", "/api/data/consumption/trend", "/api/data/consumption/factors"]
+
+
+def _account_id(client, db, headers) -> int:
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    return db.execute(select(ElectricityAccount.id).where(ElectricityAccount.user_id == user_id)).scalar_one()
+
+
+def _etag(client, headers, path: str = "/api/data/summary") -> str:
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.headers["ETag"]
+
+
+def _revalidate(client, headers, etag: str, path: str = "/api/data/summary"):
+    return client.get(path, headers={**headers, "If-None-Match": etag})
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_matching_etag_returns_304(any_client, path):
+    headers = register(any_client, "etag")
+    first = any_client.get(path, headers=headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    response = _revalidate(any_client, headers, etag, path)
+
+    assert response.status_code == 304
+    assert response.content == b"" and response.headers["ETag"] == etag
+    assert _revalidate(any_client, headers, '"other"', path).json() == first.json()
+
+
+@pytest.mark.parametrize("header", ['W/{etag}', '"other", {etag}', "*"])
+def test_if_none_match_forms(client, header):
+    headers = register(client, "etag")
+    etag = _etag(client, headers)
+
+    assert _revalidate(client, headers, header.format(etag=etag)).status_code == 304
+
+
+def test_control_action_changes_etag(any_client):
+    headers = register(any_client, "etag")
+    appliance = create_appliance(any_client, headers, power=1.5)
+    etag = _etag(any_client, headers)
+
+    any_client.post(f"/api/appliances/{appliance['id']}/control", json={"action": "ON"}, headers=headers)
+
+    response = _revalidate(any_client, headers, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag and response.json()["total_power_now"] == 1.5
+    assert _revalidate(any_client, headers, response.headers["ETag"]).status_code == 304
+
+
+def test_ingest_changes_etag(any_client, db, monkeypatch):
+    monkeypatch.setattr(settings, "ingest_api_key", "test-ingest-key")
+    headers = register(any_client, "etag")
+    account_id = _account_id(any_client, db, headers)
+    etags = {path: _etag(any_client, headers, path) for path in ENDPOINTS[:2]}
+
+    response = any_client.post(
+        "/api/ingest/consumption",
+        json=[{"account_id": account_id, "timestamp": datetime.now().replace(microsecond=0).isoformat(), "total_kwh": 1.2}],
+        headers={"X-Ingest-Key": "test-ingest-key"},
+    )
+    assert response.status_code == 200 and response.json()["written"] == 1, response.text
+
+    # 批量写入走 Core 语句，通过 bump_many 使该账户的缓存条目失效
+    for path, etag in etags.items():
+        fresh = _revalidate(any_client, headers, etag, path)
+        assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+    assert any_client.get("/api/data/summary", headers=headers).json()["today_cost"] > 0
+
+
+def test_other_accounts_keep_their_etag(client):
+    owner = register(client, "etag")
+    other = register(client, "etag")
+    appliance = create_appliance(client, owner)
+    etag = _etag(client, other)
+
+    client.post(f"/api/appliances/{appliance['id']}/control", json={"action": "ON"}, headers=owner)
+
+    assert _revalidate(client, other, etag).status_code == 304
+
+
+def test_version_bump_invalidates_key_but_etag_follows_body():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    summary = DashboardSummary(
+        total_power_now=0, daily_cost_estimate=0, today_cost=0, month_cost=0, month_usage_kwh=0,
+        active_appliances_count=0,
+    )
+    key = cache.key(1, "summary")
+    entry = cache.store(key, summary)
+    assert cache.get(key) == entry
+
+    cache.versions.bump_many([1, 1, 2])
+
+    assert cache.key(1, "summary") != key and cache.get(cache.key(1, "summary")) is None
+    assert cache.versions.get(1) == 1 and cache.versions.get(2) == 1
+    # ETag 取响应体哈希：数据未变化时重新生成的 ETag 不变，客户端仍可得到 304
+    assert cache.store(cache.key(1, "summary"), summary).etag == entry.etag
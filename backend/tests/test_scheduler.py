@@ -0,0 +1,58 @@
+"""后台任务调度：批量检测 / 拟合任务只在租约持有者上执行，启动时不运行。"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from app.db.session import SessionLocal
+from app.services.anomalies import detection_job
+from app.services.scheduler import Scheduler, acquire_lease, release_lease, scheduler
+
+
+def test_batch_jobs_are_registered_on_the_scheduler(client):
+    assert {"anomaly_detection", "forecast_refit"} <= set(scheduler.jobs)
+    for name in ("anomaly_detection", "forecast_refit"):
+        assert scheduler.jobs[name].stats.runs == 0
+
+
+def test_only_one_holder_acquires_the_lease(db):
+    now = datetime.now()
+    assert acquire_lease(db, "test-lease", "worker-a", ttl=30, now=now)
+    assert not acquire_lease(db, "test-lease", "worker-b", ttl=30, now=now)
+    # 过期后由其他 worker 接管
+    assert acquire_lease(db, "test-lease", "worker-b", ttl=30, now=now + timedelta(seconds=31))
+    release_lease(db, "test-lease", "worker-b")
+    assert acquire_lease(db, "test-lease", "worker-a", ttl=30, now=now)
+    release_lease(db, "test-lease", "worker-a")
+
+
+def test_job_runs_only_on_the_leader():
+    calls = []
+    leader, follower = Scheduler("test-jobs", lease_ttl=30), Scheduler("test-jobs", lease_ttl=30)
+    for instance in (leader, follower):
+        instance.add_job("detect", 0.2, lambda db, boundary, who=instance.holder: calls.append(who))
+
+    async def run_both():
+        leader_task = asyncio.create_task(leader.run(SessionLocal))
+        for _ in range(100):  # 先启动的实例取得租约
+            if leader.is_leader:
+                break
+            await asyncio.sleep(0.02)
+        follower_task = asyncio.create_task(follower.run(SessionLocal))
+        await asyncio.sleep(0.7)
+        for task in (leader_task, follower_task):
+            task.cancel()
+        await asyncio.gather(leader_task, follower_task, return_exceptions=True)
+
+    asyncio.run(run_both())
+
+    assert calls and set(calls) == {leader.holder}
+    assert follower.jobs["detect"].stats.runs == 0
+    assert follower.jobs["detect"].stats.skipped >= 1
+
+
+def test_detection_job_returns_stats(db):
+    boundary = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    stats = detection_job(db, boundary)
+
+    assert stats["end"] <= boundary and stats["accounts"] >= 0
@@ -0,0 +1,109 @@
+"""Token 注销名单：Bloom 过滤器判定，以及多 worker 间按注销时间的增量同步。"""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.models import RevokedToken
+from app.services.token_denylist import BloomFilter, TokenDenylist, _utc_naive
+
+
+@pytest.fixture(autouse=True)
+def _empty_table(db):
+    db.execute(delete(RevokedToken))
+    db.commit()
+
+
+def _denylist() -> TokenDenylist:
+    return TokenDenylist(capacity=100, error_rate=0.01, sync_overlap=60)
+
+
+def _insert(db, id: int, revoked_at=None, ttl: float = 3600) -> str:
+    """模拟其他 worker 写入的注销记录（可指定 id 与注销时间）。"""
+
+    jti = uuid.uuid4().hex
+    values = {"id": id, "jti": jti, "expires_at": _utc_naive(time.time() + ttl)}
+    if revoked_at is not None:
+        values["revoked_at"] = revoked_at
+    db.add(RevokedToken(**values))
+    db.commit()
+    return jti
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [uuid.uuid4().hex for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(2000))
+    assert false_positives < 100
+
+
+def test_revoke_is_visible_locally_and_to_other_workers(db):
+    local, remote = _denylist(), _denylist()
+    jti = uuid.uuid4().hex
+
+    local.revoke(db, jti, time.time() + 3600)
+
+    assert local.is_revoked(jti)
+    assert not remote.is_revoked(jti)
+    remote.sync(db)
+    assert remote.is_revoked(jti)
+
+
+def test_lower_id_committed_after_sync_is_not_skipped(db):
+    """多 worker 并发写入时，小 id 可能在大 id 之后提交；按 id 水位同步会永久漏掉它。"""
+
+    denylist = _denylist()
+    later = _insert(db, id=1000)
+    denylist.sync(db)
+    assert denylist.is_revoked(later)
+
+    # 另一个 worker 的事务更早开始（注销时间更早、id 更小），在上次同步之后才提交
+    db_now = db.execute(select(func.now())).scalar_one()
+    earlier = _insert(db, id=500, revoked_at=db_now - timedelta(seconds=5))
+    denylist.sync(db)
+
+    assert denylist.is_revoked(earlier)
+
+
+def test_incremental_sync_skips_rows_older_than_the_overlap(db):
+    denylist = _denylist()
+    denylist.sync(db)
+
+    db_now = db.execute(select(func.now())).scalar_one()
+    recent = _insert(db, id=1, revoked_at=db_now - timedelta(seconds=30))
+    old = _insert(db, id=2, revoked_at=db_now - timedelta(hours=1))
+
+    assert denylist.sync(db) == 1
+    assert denylist.is_revoked(recent) and not denylist.is_revoked(old)
+    # 新进程的首次同步是全量的
+    assert _denylist().sync(db) == 2
+
+
+def test_sync_purges_expired_rows(db):
+    denylist = _denylist()
+    expired = _insert(db, id=1, ttl=-60)
+    active = _insert(db, id=2)
+
+    denylist.sync(db)
+
+    assert not denylist.is_revoked(expired) and denylist.is_revoked(active)
+    remaining = db.execute(select(RevokedToken.jti)).scalars().all()
+    assert remaining == [active]
+
+
+def test_expired_entries_are_pruned_from_memory():
+    denylist = _denylist()
+    denylist.add("soon", time.time() + 0.05)
+    denylist.add("later", time.time() + 3600)
+    time.sleep(0.06)
+
+    assert denylist.prune() == 1
+    assert not denylist.is_revoked("soon") and denylist.is_revoked("later")
+    assert len(denylist) == 1
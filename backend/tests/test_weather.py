@@ -0,0 +1,144 @@
+"""天气服务：地区归一化、本地模拟数据源、请求合并、weather_data 共享与失败兜底。"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.weather import (
+    Observation,
+    StubWeatherProvider,
+    WeatherProvider,
+    WeatherService,
+    WeatherUnavailable,
+    load_provider,
+    region_of,
+)
+
+
+class _CountingProvider(WeatherProvider):
+    """包装模拟数据源：统计调用次数，可阻塞到放行或直接失败。"""
+
+    name = "counting"
+
+    def __init__(self, fail: bool = False) -> None:
+        self.calls = 0
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def fetch(self, region: str) -> Observation:
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("数据源不可用")
+        return StubWeatherProvider().fetch(region)
+
+
+def _service(provider: WeatherProvider, ttl: float = 60) -> WeatherService:
+    return WeatherService(provider, ttl=ttl, refresh_ahead_ratio=0.8, max_regions=16, workers=4, timeout=5)
+
+
+@pytest.mark.parametrize(
+    "address, region",
+    [
+        ("浙江省杭州市西湖区文三路", "杭州市"),
+        ("上海市 浦东新区", "上海市"),
+        ("广西壮族自治区南宁市青秀区", "南宁市"),
+        ("某个无法识别的地址", settings.weather_default_region),
+        (None, settings.weather_default_region),
+    ],
+)
+def test_region_of(address, region):
+    assert region_of(address) == region
+
+
+def test_stub_provider_is_deterministic_per_region():
+    provider = load_provider("stub")
+    assert isinstance(provider, StubWeatherProvider)
+
+    first, second = provider.fetch("杭州市"), provider.fetch("杭州市")
+    assert first.region == "杭州市"
+    assert (first.temperature_c, first.condition, first.humidity) == (
+        second.temperature_c,
+        second.condition,
+        second.humidity,
+    )
+    assert first.observed_at.second == 0 and first.observed_at.microsecond == 0
+    assert first.fetched_at is None  # 由天气服务在拉取时填写
+
+
+def test_load_provider_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        load_provider("no-such-provider")
+
+
+def test_concurrent_requests_share_one_fetch():
+    provider = _CountingProvider()
+    provider.release.clear()
+    service = _service(provider)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(service.get, "杭州市") for _ in range(8)]
+        assert provider.started.wait(5)
+        provider.release.set()
+        results = [future.result() for future in futures]
+
+    assert provider.calls == 1
+    assert len({id(result) for result in results}) == 1
+    assert results[0].fetched_at is not None
+
+    # 之后的读取直接命中缓存
+    assert service.get("杭州市") is results[0]
+    assert provider.calls == 1
+
+
+def test_async_get_returns_cached_observation():
+    provider = _CountingProvider()
+    service = _service(provider)
+
+    async def fetch_twice():
+        return await service.aget("宁波市"), await service.aget("宁波市")
+
+    first, second = asyncio.run(fetch_twice())
+    assert first is second
+    assert provider.calls == 1
+
+
+def test_failed_fetch_falls_back_to_last_observation():
+    provider = _CountingProvider()
+    service = _service(provider, ttl=0.01)
+    observation = service.get("温州市")
+
+    provider.fail = True
+    service._cache.clear()
+    assert service.get("温州市") is observation
+
+    with pytest.raises(WeatherUnavailable):
+        service.get("湖州市")
+
+
+def test_workers_share_observations_through_weather_data():
+    first_provider, second_provider = _CountingProvider(), _CountingProvider()
+    first, second = _service(first_provider), _service(second_provider)
+    first.bind(SessionLocal)
+    second.bind(SessionLocal)
+
+    stored = first.get("绍兴市")
+    shared = second.get("绍兴市")
+
+    assert first_provider.calls == 1
+    assert second_provider.calls == 0
+    assert second.store_hits == 1
+    assert (shared.region, shared.observed_at, shared.temperature_c) == (
+        stored.region,
+        stored.observed_at,
+        stored.temperature_c,
+    )
+    assert isinstance(shared.fetched_at, datetime)
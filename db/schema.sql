@@ -5,7 +5,7 @@ USE ai_power_db;
 CREATE TABLE `users` (
   `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '用户ID',
   `username` VARCHAR(50) NOT NULL UNIQUE COMMENT '登录用户名',
-  `password` VARCHAR(30) NOT NULL COMMENT '加密后的密码（≤30字符）',
+  `password` VARCHAR(255) NOT NULL COMMENT '密码哈希（格式: 算法$参数$salt$hash）',
   -- address 字段：新增，用于AI判断天气区域，匹配注册接口需求
   `address` VARCHAR(255) COMMENT '家庭住址/区域 (用于天气和电价判断)',
   `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -13,6 +13,27 @@ CREATE TABLE `users` (
   PRIMARY KEY (`id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户表';
 
+-- 分时电价方案表 (峰 / 平 / 谷时段以 JSON 存储，编译为每天 48 个半小时时段的价格表)
+CREATE TABLE `tariff_schedules` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '方案ID',
+  `name` VARCHAR(100) NOT NULL UNIQUE COMMENT '方案名称',
+  `peak_rate` DECIMAL(10, 4) NOT NULL COMMENT '峰段电价 (元/kWh)',
+  `flat_rate` DECIMAL(10, 4) NOT NULL COMMENT '平段电价 (元/kWh)',
+  `valley_rate` DECIMAL(10, 4) NOT NULL COMMENT '谷段电价 (元/kWh)',
+  `weekday_windows` JSON NOT NULL COMMENT '工作日峰 / 谷时段',
+  `holiday_windows` JSON NULL COMMENT '周末及节假日峰 / 谷时段',
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='分时电价方案表';
+
+-- 电价节假日表 (按节假日时段计费的日期，周末无需登记)
+CREATE TABLE `tariff_holidays` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `day` DATE NOT NULL UNIQUE COMMENT '日期',
+  `name` VARCHAR(50) COMMENT '节日名称',
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='电价节假日表';
+
 -- 2. 用电账户表 (electricity_accounts)
 -- 包含费率等信息。与 users 表保持 1:1 关联。
 CREATE TABLE `electricity_accounts` (
@@ -21,8 +42,10 @@ CREATE TABLE `electricity_accounts` (
   `account_number` VARCHAR(50) UNIQUE COMMENT '账户编号',
   `peak_rate` DECIMAL(10, 4) DEFAULT 0.8 COMMENT '峰值电价 (元/kWh)',
   `valley_rate` DECIMAL(10, 4) DEFAULT 0.3 COMMENT '谷值电价 (元/kWh)',
+  `tariff_schedule_id` BIGINT NULL COMMENT '分时电价方案ID (为空时使用 peak_rate / valley_rate 默认时段)',
   PRIMARY KEY (`id`),
   FOREIGN KEY (`user_id`) REFERENCES `users`(`id`),
+  FOREIGN KEY (`tariff_schedule_id`) REFERENCES `tariff_schedules`(`id`),
   -- 新增索引方便通过用户快速查找账户
   INDEX `idx_user_id` (`user_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电账户表';
@@ -41,18 +64,95 @@ CREATE TABLE `consumption_data` (
   `total_kwh` DECIMAL(10, 3) NOT NULL COMMENT '该时间片内的总耗电量 (kWh)',
   PRIMARY KEY (`id`),
   FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
-  INDEX `idx_account_time` (`account_id`, `timestamp`)
+  UNIQUE INDEX `idx_account_time` (`account_id`, `timestamp`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='总用电数据表';
 
--- 天气数据表
+-- 用电量小时汇总表 (写入 consumption_data 时增量维护，可用 scripts/rebuild_rollups.py 重建)
+CREATE TABLE `consumption_hourly` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点',
+  `total_kwh` DECIMAL(14, 3) NOT NULL DEFAULT 0 COMMENT '桶内总耗电量 (kWh)',
+  `samples` INT NOT NULL DEFAULT 0 COMMENT '桶内原始记录条数',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE KEY `uq_consumption_hourly_account_bucket` (`account_id`, `bucket_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电量小时汇总表';
+
+-- 用电量日汇总表 (写入 consumption_data 时增量维护，可用 scripts/rebuild_rollups.py 重建)
+CREATE TABLE `consumption_daily` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点',
+  `total_kwh` DECIMAL(14, 3) NOT NULL DEFAULT 0 COMMENT '桶内总耗电量 (kWh)',
+  `samples` INT NOT NULL DEFAULT 0 COMMENT '桶内原始记录条数',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE KEY `uq_consumption_daily_account_bucket` (`account_id`, `bucket_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电量日汇总表';
+
+-- 用电量逐时段日汇总表 (每天一行，48 个 30 分钟时段的用电量，分时计费读取；与其他汇总表一同维护)
+CREATE TABLE `consumption_daily_slots` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点',
+  `total_kwh` DECIMAL(14, 3) NOT NULL DEFAULT 0 COMMENT '桶内总耗电量 (kWh)',
+  `samples` INT NOT NULL DEFAULT 0 COMMENT '桶内原始记录条数',
+  `slot_kwh` BLOB NOT NULL COMMENT '当天 48 个 30 分钟时段的耗电量（float64 字节）',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE KEY `uq_consumption_daily_slots_account_bucket` (`account_id`, `bucket_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电量逐时段日汇总表';
+
+-- 用电量月汇总表 (写入 consumption_data 时增量维护，可用 scripts/rebuild_rollups.py 重建)
+CREATE TABLE `consumption_monthly` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点',
+  `total_kwh` DECIMAL(14, 3) NOT NULL DEFAULT 0 COMMENT '桶内总耗电量 (kWh)',
+  `samples` INT NOT NULL DEFAULT 0 COMMENT '桶内原始记录条数',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE KEY `uq_consumption_monthly_account_bucket` (`account_id`, `bucket_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电量月汇总表';
+
+-- 用电异常表 (批量异常检测结果，每行一个异常的 30 分钟时段)
+CREATE TABLE `consumption_anomalies` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `timestamp` DATETIME NOT NULL COMMENT '异常时段起点',
+  `observed_kwh` DECIMAL(10, 3) NOT NULL COMMENT '实际用电量 (kWh)',
+  `expected_kwh` DECIMAL(10, 3) NOT NULL COMMENT '基线用电量 (kWh)',
+  `score` DOUBLE NOT NULL COMMENT '稳健 z 分数',
+  `detected_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '检测时间',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE INDEX `idx_anomaly_account_time` (`account_id`, `timestamp`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电异常表';
+
+-- 负荷预测模型表 (批量拟合任务写入，每个账户一行；系数为 float32 数组的原始字节)
+CREATE TABLE `consumption_forecast_models` (
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `model` VARCHAR(20) NOT NULL COMMENT '模型类型',
+  `coefficients` BLOB NOT NULL COMMENT '模型系数',
+  `samples` INT NOT NULL COMMENT '参与拟合的 30 分钟时段数',
+  `data_until` DATETIME NOT NULL COMMENT '训练数据截止时间',
+  `fitted_at` DATETIME NOT NULL COMMENT '拟合时间',
+  PRIMARY KEY (`account_id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='负荷预测模型表';
+
+-- 天气数据表 (天气服务按地区拉取后写入，多个 worker 共享)
 CREATE TABLE `weather_data` (
   `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
-  `timestamp` TIMESTAMP NOT NULL UNIQUE COMMENT '时间点',
+  `region` VARCHAR(64) NOT NULL COMMENT '地区 (由用户地址归一化，如: 杭州市)',
+  `timestamp` DATETIME NOT NULL COMMENT '观测时间',
   `temperature_c` DECIMAL(5, 2) COMMENT '温度 (°C)',
   `condition` VARCHAR(50) COMMENT '天气状况 (如: 晴, 多云)',
   `humidity` DECIMAL(5, 2) COMMENT '湿度 (%)',
+  `fetched_at` DATETIME NOT NULL COMMENT '最近一次从数据源拉取到该观测的时间',
   PRIMARY KEY (`id`),
-  INDEX `idx_timestamp` (`timestamp`)
+  UNIQUE INDEX `idx_weather_region_time` (`region`, `timestamp`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='天气数据表';
 
 
@@ -65,12 +165,42 @@ CREATE TABLE `appliances` (
   `type` ENUM('ac', 'fridge', 'light', 'tv', 'heater', 'other') NOT NULL COMMENT '电器类型',
   `is_on` BOOLEAN DEFAULT FALSE COMMENT '当前状态 (由模拟器更新)',
   `power_rating_kw` DECIMAL(10, 3) COMMENT '电器额定功率 (kW)',
+  `on_since` DATETIME NULL COMMENT '本次开机时间，关机时为空 (模拟器按此计算开机时长)',
+  `on_seconds` DOUBLE NOT NULL DEFAULT 0 COMMENT '未结算的已关机开机秒数',
+  `version` INT NOT NULL DEFAULT 0 COMMENT '状态版本号 (每次开关加 1，控制接口据此做乐观并发检查)',
   `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  -- 电器列表按 (account_id, id) 键集分页；按类型 / 开关状态 / 名称前缀筛选各有复合索引
+  INDEX `idx_appliance_account_id` (`account_id`, `id`),
+  INDEX `idx_appliance_account_type` (`account_id`, `type`, `id`),
+  INDEX `idx_appliance_account_on` (`account_id`, `is_on`, `id`),
   INDEX `idx_account_name` (`account_id`, `name`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='电器表';
 
+-- 电器场景表 (保存的一组电器开关动作，如"离家模式"，执行时一个事务内批量更新)
+CREATE TABLE `appliance_scenes` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '场景ID',
+  `account_id` BIGINT NOT NULL COMMENT '所属用电账户ID',
+  `name` VARCHAR(50) NOT NULL COMMENT '场景名称',
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE INDEX `idx_scene_account_name` (`account_id`, `name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='电器场景表';
+
+-- 场景动作表
+CREATE TABLE `appliance_scene_actions` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `scene_id` BIGINT NOT NULL COMMENT '所属场景ID',
+  `appliance_id` BIGINT NOT NULL COMMENT '电器ID',
+  `action` VARCHAR(3) NOT NULL COMMENT '动作: ON / OFF',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`scene_id`) REFERENCES `appliance_scenes`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`appliance_id`) REFERENCES `appliances`(`id`),
+  INDEX `idx_scene_id` (`scene_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='场景动作表';
+
 -- 6. 电器模拟日志表 (appliance_simulation_log)
 -- 此表用于预置模拟数据，模拟电器的固定运行模式
 CREATE TABLE `appliance_simulation_log` (
@@ -84,6 +214,23 @@ CREATE TABLE `appliance_simulation_log` (
   INDEX `idx_appliance_time` (`appliance_id`, `simulation_time`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='电器模拟日志表';
 
+-- 7. 电器事件表 (appliance_events)
+-- 每次开关一条，只追加；由后端先写本地暂存文件、再批量写入，电器删除后历史仍保留，因此不加外键
+CREATE TABLE `appliance_events` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '事件主键',
+  `event_id` VARCHAR(32) NOT NULL COMMENT '事件ID (生成时分配，用于重放去重)',
+  `appliance_id` BIGINT NOT NULL COMMENT '电器ID',
+  `account_id` BIGINT NOT NULL COMMENT '所属用电账户ID',
+  `occurred_at` DATETIME NOT NULL COMMENT '状态变化时间',
+  `is_on` BOOLEAN NOT NULL COMMENT '变化后的开关状态',
+  `power_kw` DECIMAL(10, 3) NOT NULL COMMENT '变化时的额定功率 (kW)，用于能耗归因',
+  `version` INT NULL COMMENT '变化后的电器状态版本号',
+  `source` VARCHAR(16) NOT NULL COMMENT '来源: control / batch / scene',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `idx_appliance_event_id` (`event_id`),
+  INDEX `idx_appliance_event_time` (`appliance_id`, `occurred_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='电器事件表';
+
 
 -- 4. AI 助手相关数据
 
@@ -99,4 +246,25 @@ CREATE TABLE `chat_history` (
   INDEX `idx_user_id` (`user_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='聊天记录表';
 
+-- 已注销 Token 表 (退出登录后写入，过期后自动清理)
+CREATE TABLE `revoked_tokens` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `jti` VARCHAR(64) NOT NULL UNIQUE COMMENT 'Token 唯一标识 (JWT jti)',
+  `user_id` BIGINT COMMENT 'Token 所属用户ID',
+  `expires_at` DATETIME NOT NULL COMMENT 'Token 过期时间 (UTC)',
+  `revoked_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '注销时间',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`),
+  INDEX `idx_expires_at` (`expires_at`),
+  INDEX `idx_revoked_at` (`revoked_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='已注销 Token 表';
+
+-- 后台任务租约表 (多 worker 选主：持有者执行模拟器等定时任务，过期后由其他 worker 接管)
+CREATE TABLE `scheduler_leases` (
+  `name` VARCHAR(64) NOT NULL COMMENT '租约名称',
+  `holder` VARCHAR(128) NOT NULL COMMENT '当前持有者 (主机名:进程号:随机串)',
+  `expires_at` DATETIME NOT NULL COMMENT '租约到期时间',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='后台任务租约表';
+
 DROP TABLE IF EXISTS users;
\ No newline at end of file
@@ -0,0 +1,194 @@
+-- 已有数据库升级脚本 (MySQL)
+-- 把按旧版 schema.sql 建好的库升级到当前结构；新建库直接执行 schema.sql 即可，无需执行本脚本。
+-- 执行完成后运行 `python -m scripts.rebuild_rollups` 回填各汇总表（含逐时段日汇总）。
+
+USE ai_power_db;
+
+-- 1. 用户表：密码列改存 KDF 哈希（旧的短哈希在登录成功后自动重新生成）
+ALTER TABLE `users`
+  MODIFY `password` VARCHAR(255) NOT NULL COMMENT '密码哈希（格式: 算法$参数$salt$hash）';
+
+-- 2. 分时电价方案与节假日
+CREATE TABLE IF NOT EXISTS `tariff_schedules` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '方案ID',
+  `name` VARCHAR(100) NOT NULL UNIQUE COMMENT '方案名称',
+  `peak_rate` DECIMAL(10, 4) NOT NULL COMMENT '峰段电价 (元/kWh)',
+  `flat_rate` DECIMAL(10, 4) NOT NULL COMMENT '平段电价 (元/kWh)',
+  `valley_rate` DECIMAL(10, 4) NOT NULL COMMENT '谷段电价 (元/kWh)',
+  `weekday_windows` JSON NOT NULL COMMENT '工作日峰 / 谷时段',
+  `holiday_windows` JSON NULL COMMENT '周末及节假日峰 / 谷时段',
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='分时电价方案表';
+
+CREATE TABLE IF NOT EXISTS `tariff_holidays` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `day` DATE NOT NULL UNIQUE COMMENT '日期',
+  `name` VARCHAR(50) COMMENT '节日名称',
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='电价节假日表';
+
+ALTER TABLE `electricity_accounts`
+  ADD COLUMN `tariff_schedule_id` BIGINT NULL COMMENT '分时电价方案ID (为空时使用 peak_rate / valley_rate 默认时段)' AFTER `valley_rate`,
+  ADD FOREIGN KEY (`tariff_schedule_id`) REFERENCES `tariff_schedules`(`id`);
+
+-- 3. 用电数据：(account_id, timestamp) 改为唯一索引，批量导入按此做幂等 upsert
+-- 若已有重复时段，需先合并重复行再执行
+ALTER TABLE `consumption_data`
+  DROP INDEX `idx_account_time`,
+  ADD UNIQUE INDEX `idx_account_time` (`account_id`, `timestamp`);
+
+-- 4. 用电量汇总表 (建好后用 scripts/rebuild_rollups.py 回填)
+CREATE TABLE IF NOT EXISTS `consumption_hourly` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点',
+  `total_kwh` DECIMAL(14, 3) NOT NULL DEFAULT 0 COMMENT '桶内总耗电量 (kWh)',
+  `samples` INT NOT NULL DEFAULT 0 COMMENT '桶内原始记录条数',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE KEY `uq_consumption_hourly_account_bucket` (`account_id`, `bucket_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电量小时汇总表';
+
+CREATE TABLE IF NOT EXISTS `consumption_daily` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点',
+  `total_kwh` DECIMAL(14, 3) NOT NULL DEFAULT 0 COMMENT '桶内总耗电量 (kWh)',
+  `samples` INT NOT NULL DEFAULT 0 COMMENT '桶内原始记录条数',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE KEY `uq_consumption_daily_account_bucket` (`account_id`, `bucket_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电量日汇总表';
+
+CREATE TABLE IF NOT EXISTS `consumption_daily_slots` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点',
+  `total_kwh` DECIMAL(14, 3) NOT NULL DEFAULT 0 COMMENT '桶内总耗电量 (kWh)',
+  `samples` INT NOT NULL DEFAULT 0 COMMENT '桶内原始记录条数',
+  `slot_kwh` BLOB NOT NULL COMMENT '当天 48 个 30 分钟时段的耗电量（float64 字节）',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE KEY `uq_consumption_daily_slots_account_bucket` (`account_id`, `bucket_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电量逐时段日汇总表';
+
+CREATE TABLE IF NOT EXISTS `consumption_monthly` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点',
+  `total_kwh` DECIMAL(14, 3) NOT NULL DEFAULT 0 COMMENT '桶内总耗电量 (kWh)',
+  `samples` INT NOT NULL DEFAULT 0 COMMENT '桶内原始记录条数',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE KEY `uq_consumption_monthly_account_bucket` (`account_id`, `bucket_start`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电量月汇总表';
+
+-- 5. 异常检测与负荷预测 (批量任务写入)
+CREATE TABLE IF NOT EXISTS `consumption_anomalies` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `timestamp` DATETIME NOT NULL COMMENT '异常时段起点',
+  `observed_kwh` DECIMAL(10, 3) NOT NULL COMMENT '实际用电量 (kWh)',
+  `expected_kwh` DECIMAL(10, 3) NOT NULL COMMENT '基线用电量 (kWh)',
+  `score` DOUBLE NOT NULL COMMENT '稳健 z 分数',
+  `detected_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '检测时间',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE INDEX `idx_anomaly_account_time` (`account_id`, `timestamp`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用电异常表';
+
+CREATE TABLE IF NOT EXISTS `consumption_forecast_models` (
+  `account_id` BIGINT NOT NULL COMMENT '关联的用电账户ID',
+  `model` VARCHAR(20) NOT NULL COMMENT '模型类型',
+  `coefficients` BLOB NOT NULL COMMENT '模型系数',
+  `samples` INT NOT NULL COMMENT '参与拟合的 30 分钟时段数',
+  `data_until` DATETIME NOT NULL COMMENT '训练数据截止时间',
+  `fitted_at` DATETIME NOT NULL COMMENT '拟合时间',
+  PRIMARY KEY (`account_id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='负荷预测模型表';
+
+-- 6. 天气数据表：旧表没有地区列且按时间唯一，只是缓存，直接重建（天气服务会重新拉取）
+DROP TABLE IF EXISTS `weather_data`;
+CREATE TABLE `weather_data` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `region` VARCHAR(64) NOT NULL COMMENT '地区 (由用户地址归一化，如: 杭州市)',
+  `timestamp` DATETIME NOT NULL COMMENT '观测时间',
+  `temperature_c` DECIMAL(5, 2) COMMENT '温度 (°C)',
+  `condition` VARCHAR(50) COMMENT '天气状况 (如: 晴, 多云)',
+  `humidity` DECIMAL(5, 2) COMMENT '湿度 (%)',
+  `fetched_at` DATETIME NOT NULL COMMENT '最近一次从数据源拉取到该观测的时间',
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `idx_weather_region_time` (`region`, `timestamp`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='天气数据表';
+
+-- 7. 电器表：开机时长、状态版本号与分页 / 筛选索引
+-- 已开着的电器以升级时间作为本次开机时间
+ALTER TABLE `appliances`
+  ADD COLUMN `on_since` DATETIME NULL COMMENT '本次开机时间，关机时为空 (模拟器按此计算开机时长)' AFTER `power_rating_kw`,
+  ADD COLUMN `on_seconds` DOUBLE NOT NULL DEFAULT 0 COMMENT '未结算的已关机开机秒数' AFTER `on_since`,
+  ADD COLUMN `version` INT NOT NULL DEFAULT 0 COMMENT '状态版本号 (每次开关加 1，控制接口据此做乐观并发检查)' AFTER `on_seconds`,
+  ADD INDEX `idx_appliance_account_id` (`account_id`, `id`),
+  ADD INDEX `idx_appliance_account_type` (`account_id`, `type`, `id`),
+  ADD INDEX `idx_appliance_account_on` (`account_id`, `is_on`, `id`);
+
+UPDATE `appliances` SET `on_since` = NOW() WHERE `is_on` = TRUE;
+
+-- 8. 电器场景
+CREATE TABLE IF NOT EXISTS `appliance_scenes` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '场景ID',
+  `account_id` BIGINT NOT NULL COMMENT '所属用电账户ID',
+  `name` VARCHAR(50) NOT NULL COMMENT '场景名称',
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`account_id`) REFERENCES `electricity_accounts`(`id`),
+  UNIQUE INDEX `idx_scene_account_name` (`account_id`, `name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='电器场景表';
+
+CREATE TABLE IF NOT EXISTS `appliance_scene_actions` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `scene_id` BIGINT NOT NULL COMMENT '所属场景ID',
+  `appliance_id` BIGINT NOT NULL COMMENT '电器ID',
+  `action` VARCHAR(3) NOT NULL COMMENT '动作: ON / OFF',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`scene_id`) REFERENCES `appliance_scenes`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`appliance_id`) REFERENCES `appliances`(`id`),
+  INDEX `idx_scene_id` (`scene_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='场景动作表';
+
+-- 9. 电器事件表 (只追加，不加外键)
+CREATE TABLE IF NOT EXISTS `appliance_events` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '事件主键',
+  `event_id` VARCHAR(32) NOT NULL COMMENT '事件ID (生成时分配，用于重放去重)',
+  `appliance_id` BIGINT NOT NULL COMMENT '电器ID',
+  `account_id` BIGINT NOT NULL COMMENT '所属用电账户ID',
+  `occurred_at` DATETIME NOT NULL COMMENT '状态变化时间',
+  `is_on` BOOLEAN NOT NULL COMMENT '变化后的开关状态',
+  `power_kw` DECIMAL(10, 3) NOT NULL COMMENT '变化时的额定功率 (kW)，用于能耗归因',
+  `version` INT NULL COMMENT '变化后的电器状态版本号',
+  `source` VARCHAR(16) NOT NULL COMMENT '来源: control / batch / scene',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `idx_appliance_event_id` (`event_id`),
+  INDEX `idx_appliance_event_time` (`appliance_id`, `occurred_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='电器事件表';
+
+-- 10. 已注销 Token 与后台任务租约
+CREATE TABLE IF NOT EXISTS `revoked_tokens` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `jti` VARCHAR(64) NOT NULL UNIQUE COMMENT 'Token 唯一标识 (JWT jti)',
+  `user_id` BIGINT COMMENT 'Token 所属用户ID',
+  `expires_at` DATETIME NOT NULL COMMENT 'Token 过期时间 (UTC)',
+  `revoked_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '注销时间',
+  PRIMARY KEY (`id`),
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`),
+  INDEX `idx_expires_at` (`expires_at`),
+  INDEX `idx_revoked_at` (`revoked_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='已注销 Token 表';
+
+CREATE TABLE IF NOT EXISTS `scheduler_leases` (
+  `name` VARCHAR(64) NOT NULL COMMENT '租约名称',
+  `holder` VARCHAR(128) NOT NULL COMMENT '当前持有者 (主机名:进程号:随机串)',
+  `expires_at` DATETIME NOT NULL COMMENT '租约到期时间',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='后台任务租约表';